@@ -13,7 +13,8 @@ ROOT_DIR = Path(__file__).parent
 sys.path.insert(0, str(ROOT_DIR))
 
 import config
-from utils.data_loader import load_all_data, check_gcs_connection
+from utils.data_loader import check_gcs_connection
+from utils.data_store import get_dataset_store, attach_session, format_memory_report
 
 # ========== PAGE CONFIGURATION ==========
 st.set_page_config(
@@ -29,23 +30,18 @@ st.set_page_config(
 #     check_gcs_connection()
 
 # ========== LOAD DATA FROM GCS ==========
-@st.cache_data(ttl=3600)
-def load_data():
-    """Load tất cả dữ liệu từ GCS và cache"""
-    return load_all_data()
-
-# Load data globally
+# Load data globally - kho dữ liệu dùng chung cho mọi session (st.cache_resource)
 try:
     with st.spinner("⏳ Đang tải dữ liệu từ Google Cloud Storage..."):
-        market_df, industry_df, ticker_df = load_data()
+        store = get_dataset_store('gcs')
+    
+    market_df = store.market_df
+    industry_df = store.industry_df
+    ticker_df = store.ticker_df
     
-    # Store in session state
-    if 'market_df' not in st.session_state:
-        st.session_state.market_df = market_df
-    if 'industry_df' not in st.session_state:
-        st.session_state.industry_df = industry_df
-    if 'ticker_df' not in st.session_state:
-        st.session_state.ticker_df = ticker_df
+    # Session chỉ lưu tên nguồn dữ liệu, các trang lấy frame từ kho chung
+    st.session_state.data_source = 'gcs'
+    attach_session(store)
     
     # Show success message (will disappear after first load due to cache)
     if 'data_loaded' not in st.session_state:
@@ -128,10 +124,15 @@ with st.sidebar:
     
     st.markdown("---")
     
+    # Memory usage
+    with st.expander("🧠 Bộ nhớ"):
+        st.markdown(format_memory_report(store.memory_report()))
+    
     # Data refresh button
     if st.button("🔄 Refresh Data from GCS"):
-        # Clear cache
+        # Kiểm tra generation ngay, chỉ tải lại các file đã thay đổi
         st.cache_data.clear()
+        get_dataset_store('gcs', force_refresh=True)
         st.rerun()
     
     st.markdown("---")
@@ -295,13 +296,13 @@ with st.expander("ℹ️ Thông tin về Data Source"):
     **Cách hoạt động:**
     1. App connect đến GCS bucket khi khởi động
     2. Load các file parquet vào memory
-    3. Cache data trong 1 giờ (3600 giây)
-    4. Tự động refresh sau khi cache hết hạn
+    3. Định kỳ (5 phút) kiểm tra generation của các file trên GCS
+    4. Chỉ tải lại file nào đã thay đổi
     
     **Để cập nhật dữ liệu:**
     1. Upload files mới lên GCS bucket
     2. Click "🔄 Refresh Data" ở sidebar
-    3. Hoặc đợi cache tự động refresh sau 1 giờ
+    3. Hoặc đợi lần kiểm tra tự động tiếp theo (tối đa 5 phút)
     """)
 
 st.markdown("---")
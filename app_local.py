@@ -12,7 +12,7 @@ ROOT_DIR = Path(__file__).parent
 sys.path.insert(0, str(ROOT_DIR))
 
 import config
-from utils.data_loader_local import load_all_data
+from utils.data_store import get_dataset_store, attach_session, format_memory_report
 
 # ========== PAGE CONFIGURATION ==========
 st.set_page_config(
@@ -23,22 +23,17 @@ st.set_page_config(
 )
 
 # ========== LOAD DATA ==========
-@st.cache_data(ttl=3600)
-def load_data():
-    """Load tất cả dữ liệu và cache"""
-    return load_all_data()
-
-# Load data globally
+# Load data globally - kho dữ liệu dùng chung cho mọi session (st.cache_resource)
 try:
-    market_df, industry_df, ticker_df = load_data()
+    store = get_dataset_store('local')
+    
+    market_df = store.market_df
+    industry_df = store.industry_df
+    ticker_df = store.ticker_df
     
-    # Store in session state
-    if 'market_df' not in st.session_state:
-        st.session_state.market_df = market_df
-    if 'industry_df' not in st.session_state:
-        st.session_state.industry_df = industry_df
-    if 'ticker_df' not in st.session_state:
-        st.session_state.ticker_df = ticker_df
+    # Session chỉ lưu tên nguồn dữ liệu, các trang lấy frame từ kho chung
+    st.session_state.data_source = 'local'
+    attach_session(store)
         
 except Exception as e:
     st.error(f"""
@@ -84,6 +79,10 @@ with st.sidebar:
     latest_year = market_df.iloc[-1]['YEAR']
     st.success(f"📅 Quý mới nhất: **{latest_quarter} {latest_year}**")
     
+    # Memory usage
+    with st.expander("🧠 Bộ nhớ"):
+        st.markdown(format_memory_report(store.memory_report()))
+    
     st.markdown("---")
     st.caption("Dashboard v1.0 | BSC Research")
 
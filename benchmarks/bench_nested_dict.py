@@ -0,0 +1,122 @@
+"""
+Benchmark: dựng nested dict từ sheet mapping bằng duyệt records so với gom nhóm NumPy
+
+Sheet giả lập 100.000 dòng (4 CAL_GROUP x 4 CATEGORY x 6.250 COL), cột ALGO
+có công thức dạng tuple string như Map_Complete.xlsx.
+
+Chạy: python benchmarks/bench_nested_dict.py
+"""
+
+import ast
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from components.excel_processor import build_nested_dict  # noqa: E402
+
+N_ROWS = 100_000
+N_FORMULAS = 500
+REPEAT = 5
+
+KEY_HIERARCHY = ['CAL_GROUP', 'CATEGORY', 'COL']
+VALUE_COLUMNS = ['VN_NAME', 'ORDER', 'ALGO']
+
+
+def make_sheet(n_rows=N_ROWS, n_formulas=N_FORMULAS, seed=0):
+    """Sheet mapping giả lập: key không trùng, ALGO lặp lại trong n_formulas công thức"""
+    rng = np.random.default_rng(seed)
+    groups = np.array(['company', 'bank', 'security', 'insurance'])
+    categories = np.array(['BS', 'IS', 'CF', 'ratio'])
+    n_cols = n_rows // (len(groups) * len(categories))
+    formulas = np.array([f"('M{i}', 'M{i + 1}', '/')" for i in range(n_formulas)])
+
+    return pd.DataFrame({
+        'CAL_GROUP': np.repeat(groups, n_rows // len(groups)),
+        'CATEGORY': np.tile(np.repeat(categories, n_cols), len(groups)),
+        'COL': np.tile([f"C{i:05d}" for i in range(n_cols)], len(groups) * len(categories)),
+        'VN_NAME': [f"Chỉ tiêu {i}" for i in range(n_rows)],
+        'ORDER': rng.integers(0, 1000, n_rows),
+        'ALGO': formulas[rng.integers(0, n_formulas, n_rows)],
+    })
+
+
+def _legacy_parse(value):
+    """_parse_tuple_string trước khi có cache theo giá trị"""
+    if not isinstance(value, str):
+        return value
+    stripped = value.strip()
+    if stripped.startswith('(') and stripped.endswith(')') and ',' in stripped:
+        try:
+            parsed = ast.literal_eval(stripped)
+            if isinstance(parsed, tuple):
+                return parsed
+        except (ValueError, SyntaxError):
+            pass
+    return value
+
+
+def _legacy_parse_nested(d):
+    if isinstance(d, dict):
+        return {k: _legacy_parse_nested(v) for k, v in d.items()}
+    if isinstance(d, list):
+        return [_legacy_parse(item) for item in d]
+    return _legacy_parse(d)
+
+
+def legacy_nested_dict(df, key_hierarchy, value_cols):
+    """to_nested_dict trước đây: to_dict('records') + setdefault + literal_eval từng ô"""
+    result = {}
+    for record in df[key_hierarchy + value_cols].to_dict('records'):
+        current = result
+        for key in key_hierarchy[:-1]:
+            current = current.setdefault(record[key], {})
+        current[record[key_hierarchy[-1]]] = {col: record[col] for col in value_cols}
+    return _legacy_parse_nested(result)
+
+
+def legacy_aggregate(df, key_hierarchy, value_col):
+    """Nhánh aggregate trước đây: duyệt từng group bằng Python"""
+    result = {}
+    for keys, group in df.groupby(key_hierarchy, sort=False):
+        current = result
+        for key in keys[:-1]:
+            current = current.setdefault(key, {})
+        current[keys[-1]] = group[value_col].agg('sum')
+    return result
+
+
+def best_ms(func, repeat=REPEAT):
+    """Thời gian nhỏ nhất (ms) của một lần gọi"""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    df = make_sheet()
+    # Key (CAL_GROUP, COL) trùng qua 4 CATEGORY -> 25.000 group cần tổng hợp
+    by_group = ['CAL_GROUP', 'COL']
+
+    assert build_nested_dict(df, KEY_HIERARCHY, VALUE_COLUMNS) == legacy_nested_dict(df, KEY_HIERARCHY, VALUE_COLUMNS)
+    assert build_nested_dict(df, by_group, ['ORDER'], aggregate={'ORDER': 'sum'}) == \
+        legacy_aggregate(df, by_group, 'ORDER')
+
+    rows = [
+        ('Nested dict (records + setdefault)', best_ms(lambda: legacy_nested_dict(df, KEY_HIERARCHY, VALUE_COLUMNS))),
+        ('Nested dict (build_nested_dict)', best_ms(lambda: build_nested_dict(df, KEY_HIERARCHY, VALUE_COLUMNS))),
+        ('Aggregate sum (duyệt group)', best_ms(lambda: legacy_aggregate(df, by_group, 'ORDER'))),
+        ('Aggregate sum (build_nested_dict)',
+         best_ms(lambda: build_nested_dict(df, by_group, ['ORDER'], aggregate={'ORDER': 'sum'}))),
+    ]
+
+    print(f"Sheet: {len(df):,} dòng, {N_FORMULAS} công thức ALGO khác nhau")
+    width = max(len(name) for name, _ in rows)
+    for name, ms in rows:
+        print(f"{name:<{width}}  {ms:10.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
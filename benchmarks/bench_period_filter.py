@@ -0,0 +1,103 @@
+"""
+Benchmark: lọc theo kỳ bằng chuỗi QUARTER so với key số nguyên PERIOD_ID
+
+Frame giả lập 10 năm x 2.000 mã (80.000 dòng), sắp xếp như loader.
+
+Chạy: python benchmarks/bench_period_filter.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.data_index import (  # noqa: E402
+    QuarterIndex, add_period_id, filter_period_range, parse_period
+)
+
+N_YEARS = 10
+N_TICKERS = 2000
+N_METRICS = 20
+REPEAT = 20
+
+
+def make_frame(n_years=N_YEARS, n_tickers=N_TICKERS, n_metrics=N_METRICS, seed=0):
+    """Frame giả lập có SYMBOL/YEAR/QUARTER và các cột chỉ số"""
+    rng = np.random.default_rng(seed)
+    symbols = np.array([f"T{i:04d}" for i in range(n_tickers)])
+    years = np.arange(2015, 2015 + n_years)
+    quarters = np.array(['Q1', 'Q2', 'Q3', 'Q4'])
+
+    n_periods = n_years * 4
+    df = pd.DataFrame({
+        'SYMBOL': np.repeat(symbols, n_periods),
+        'YEAR': np.tile(np.repeat(years, 4), n_tickers),
+        'QUARTER': np.tile(quarters, n_years * n_tickers),
+    })
+    for i in range(n_metrics):
+        df[f'M{i}'] = rng.standard_normal(len(df))
+    return df
+
+
+def legacy_filter(df, start_quarter, end_quarter):
+    """filter_data_by_date_range trước khi có PERIOD_ID"""
+    start_year = int(start_quarter[:4])
+    start_q = int(start_quarter[-1])
+    end_year = int(end_quarter[:4])
+    end_q = int(end_quarter[-1])
+
+    mask = (
+        ((df['YEAR'] > start_year) | ((df['YEAR'] == start_year) & (df['QUARTER'].str[-1].astype(int) >= start_q))) &
+        ((df['YEAR'] < end_year) | ((df['YEAR'] == end_year) & (df['QUARTER'].str[-1].astype(int) <= end_q)))
+    )
+    return df[mask]
+
+
+def legacy_latest(df):
+    """Kỳ gần nhất bằng apply theo từng dòng"""
+    return df.loc[df[['YEAR', 'QUARTER']].apply(lambda x: (x['YEAR'], x['QUARTER']), axis=1).idxmax()]
+
+
+def best_ms(func, repeat=REPEAT):
+    """Thời gian nhỏ nhất (ms) của một lần gọi"""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    raw = make_frame()
+    df = add_period_id(raw.copy())
+    index = QuarterIndex(df)
+    market = df.sort_values('PERIOD_ID', kind='stable')
+
+    start, end = '2018Q2', '2021Q3'
+    start_key, end_key = parse_period(start), parse_period(end)
+
+    expected = legacy_filter(raw, start, end)
+    for frame in (df, market):
+        result = filter_period_range(frame, start_key, end_key)
+        assert len(result) == len(expected)
+    assert filter_period_range(df, start_key, end_key).index.equals(expected.index)
+
+    rows = [
+        ('Lọc khoảng kỳ (chuỗi QUARTER)', best_ms(lambda: legacy_filter(raw, start, end))),
+        ('Lọc khoảng kỳ (mask PERIOD_ID)', best_ms(lambda: filter_period_range(df, start_key, end_key))),
+        ('Lọc khoảng kỳ (sort theo PERIOD_ID, tìm nhị phân)', best_ms(lambda: filter_period_range(market, start_key, end_key))),
+        ('Sort (SYMBOL, YEAR, QUARTER)', best_ms(lambda: raw.sort_values(['SYMBOL', 'YEAR', 'QUARTER']), repeat=5)),
+        ('Sort (SYMBOL, PERIOD_ID)', best_ms(lambda: df.sort_values(['SYMBOL', 'PERIOD_ID'], kind='stable'), repeat=5)),
+        ('Kỳ gần nhất (apply + idxmax)', best_ms(lambda: legacy_latest(raw), repeat=3)),
+        ('Kỳ gần nhất (argmax PERIOD_ID)', best_ms(lambda: df.iloc[int(np.argmax(df['PERIOD_ID'].to_numpy()))])),
+        ('Kỳ gần nhất (QuarterIndex)', best_ms(index.latest_period)),
+    ]
+
+    print(f"Frame: {len(raw):,} dòng ({N_YEARS} năm x {N_TICKERS:,} mã x 4 quý), {N_METRICS} cột chỉ số")
+    width = max(len(name) for name, _ in rows)
+    for name, ms in rows:
+        print(f"{name:<{width}}  {ms:10.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
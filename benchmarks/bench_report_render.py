@@ -0,0 +1,89 @@
+"""
+Benchmark: render bảng báo cáo tài chính bằng pandas Styler so với renderer vectorized
+
+Báo cáo giả lập của một ngân hàng: 150 chỉ tiêu x 40 quý, ~10% ô NaN, ~20% ô âm.
+
+Chạy: python benchmarks/bench_report_render.py
+"""
+
+import re
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from components.financial_table_renderer import render_table_html  # noqa: E402
+from components.financial_report_style_config import get_table_styles  # noqa: E402
+
+N_METRICS = 150
+N_QUARTERS = 40
+REPEAT = 5
+
+NEGATIVE_STYLE = 'color: #D32F2F; font-weight: 600'
+
+
+def make_report(n_metrics=N_METRICS, n_quarters=N_QUARTERS, seed=0):
+    """Ma trận giá trị (tỷ đồng) + tên chỉ tiêu + nhãn kỳ mới nhất trước"""
+    rng = np.random.default_rng(seed)
+    values = rng.normal(5_000, 20_000, (n_metrics, n_quarters))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    names = [f"Chỉ tiêu {i}" for i in range(n_metrics)]
+    periods = [f"{2024 - q // 4}Q{4 - q % 4}" for q in range(n_quarters)]
+    return names, periods, values
+
+
+def styler_html(names, periods, values):
+    """Đường render trước đây: Styler + style từng ô + to_html()"""
+    df = pd.DataFrame(values, index=pd.Index(names, name='Chỉ số'), columns=periods).reset_index()
+    numeric = [col for col in df.columns if col != 'Chỉ số']
+
+    def highlight_negative(val):
+        return NEGATIVE_STYLE if isinstance(val, (int, float)) and val < 0 else ''
+
+    styler = df.style.hide(axis='index')
+    # applymap được đổi tên thành map từ pandas 2.1
+    style_cells = getattr(styler, 'map', None) or styler.applymap
+    return style_cells(highlight_negative, subset=numeric)\
+        .format('{:,.2f}', subset=numeric, na_rep='-')\
+        .set_properties(**{'text-align': 'right', 'font-size': '13px', 'padding': '8px'}, subset=numeric)\
+        .set_table_styles(get_table_styles())\
+        .to_html(escape=False, index=False)
+
+
+def _numeric_cells(rendered):
+    """Text các ô số theo thứ tự (bỏ cột tên chỉ tiêu)"""
+    rows = re.findall(r'<tr>(.*?)</tr>', rendered, flags=re.S)[1:]
+    return [re.findall(r'<td[^>]*>\s*([^<]*?)\s*</td>', row)[1:] for row in rows]
+
+
+def best_ms(func, repeat=REPEAT):
+    """Thời gian nhỏ nhất (ms) của một lần gọi"""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    names, periods, values = make_report()
+
+    # Cùng nội dung ô và cùng số ô được tô màu âm
+    legacy = styler_html(names, periods, values)
+    rendered = render_table_html(names, periods, values)
+    assert _numeric_cells(legacy) == _numeric_cells(rendered)
+    assert rendered.count('class="neg"') == int(np.sum(values < 0))
+
+    rows = [
+        ('Styler (applymap + to_html)', best_ms(lambda: styler_html(names, periods, values))),
+        ('render_table_html', best_ms(lambda: render_table_html(names, periods, values))),
+    ]
+
+    print(f"Báo cáo: {N_METRICS} chỉ tiêu x {N_QUARTERS} quý")
+    width = max(len(name) for name, _ in rows)
+    for name, ms in rows:
+        print(f"{name:<{width}}  {ms:10.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
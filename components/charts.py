@@ -662,7 +662,7 @@ def plot_distribution_by_industry(
             st.markdown(f"### 📋 Thống Kê {y_label} Theo Ngành")
             
             # Tạo bảng thống kê
-            stats_by_industry = plot_data.groupby(x_column)[plot_column].agg([
+            stats_by_industry = plot_data.groupby(x_column, observed=True)[plot_column].agg([
                 ('Số lượng', 'count'),
                 ('Trung bình', 'mean'),
                 ('Trung vị', 'median'),
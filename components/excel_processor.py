@@ -3,13 +3,159 @@ Excel Processor - Phiên bản nâng cấp với khả năng tùy chỉnh dictio
 Hỗ trợ: chọn key-value tùy ý, nested dictionary, group by, mapping
 """
 
+import numpy as np
 import pandas as pd
 from typing import Union, List, Dict, Any, Optional, Callable
 import ast
 import warnings
+from utils.filter_engine import apply_filters
 warnings.filterwarnings('ignore')
 
 
+def _parse_tuple_string(value):
+    """
+    Chuyển string dạng tuple thành tuple thực sự
+    VD: "('A', 'B', 'C')" → ('A', 'B', 'C')
+    """
+    if not isinstance(value, str):
+        return value
+    
+    stripped = value.strip()
+    # Kiểm tra có phải dạng tuple không: bắt đầu '(', kết thúc ')', có dấu ','
+    if stripped.startswith('(') and stripped.endswith(')') and ',' in stripped:
+        try:
+            parsed = ast.literal_eval(stripped)
+            # Chỉ trả về nếu kết quả là tuple
+            if isinstance(parsed, tuple):
+                return parsed
+        except (ValueError, SyntaxError):
+            # Nếu parse lỗi thì giữ nguyên string
+            pass
+    
+    return value
+
+
+def _parse_column(values: list) -> list:
+    """
+    Parse string → tuple cho một cột giá trị (mỗi string khác nhau chỉ literal_eval một lần)
+    
+    Phần tử list (aggregate 'list') được parse từng item như trước.
+    """
+    parsed = {}
+    
+    def parse(value):
+        if not isinstance(value, str):
+            return value
+        if value not in parsed:
+            parsed[value] = _parse_tuple_string(value)
+        return parsed[value]
+    
+    return [[parse(item) for item in v] if isinstance(v, list) else parse(v) for v in values]
+
+
+def _leaf_frame(df: pd.DataFrame, key_hierarchy: List[str], value_cols: List[str],
+                aggregate: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Một dòng cho mỗi key đầy đủ, theo thứ tự xuất hiện đầu tiên của key
+    
+    - Không aggregate: giá trị lấy từ dòng cuối cùng của key (dòng sau ghi đè dòng trước)
+    - Có aggregate: groupby một lần cho tất cả các cột giá trị
+    """
+    if aggregate:
+        funcs = {}
+        for col in value_cols:
+            func = aggregate.get(col, 'first')
+            if func == 'list':
+                funcs[col] = list
+            elif func in ['sum', 'mean', 'first', 'last', 'min', 'max']:
+                funcs[col] = func
+            else:
+                funcs[col] = 'first'
+        grouped = df.groupby(key_hierarchy, sort=False)[value_cols].agg(funcs)
+        return grouped.reset_index()
+    
+    if df.empty:
+        return df
+    
+    # Id của key đầy đủ cho từng dòng (NaN cũng là một key như khi duyệt records)
+    codes = [pd.factorize(df[col], use_na_sentinel=False)[0] for col in key_hierarchy]
+    full_key = _combine_codes(codes)
+    
+    # Dòng đầu tiên (thứ tự) và dòng cuối cùng (giá trị) của mỗi key
+    _, first_pos = np.unique(full_key, return_index=True)
+    _, last_from_end = np.unique(full_key[::-1], return_index=True)
+    last_pos = len(full_key) - 1 - last_from_end
+    rows = last_pos[np.argsort(first_pos, kind='stable')]
+    return df.iloc[rows]
+
+
+def _combine_codes(codes: List[np.ndarray]) -> np.ndarray:
+    """Ghép mã các cột thành id prefix (theo thứ tự xuất hiện đầu tiên) của cột cuối"""
+    combined = codes[0].astype(np.int64)
+    for code in codes[1:]:
+        combined = pd.factorize(combined * (int(code.max()) + 1) + code)[0].astype(np.int64)
+    return combined
+
+
+def build_nested_dict(df: pd.DataFrame, key_hierarchy: List[str], value_cols: List[str],
+                      aggregate: Optional[Dict[str, str]] = None) -> Dict:
+    """
+    Dựng nested dictionary {key_1: {key_2: ... {key_n: value}}} từ DataFrame
+    
+    Gom nhóm bằng NumPy: mỗi key đầy đủ thành một lá, các lá được sắp theo thứ
+    tự xuất hiện đầu tiên của từng prefix nên mỗi node con là một đoạn liên
+    tiếp (ranh giới tìm bằng searchsorted). Dict chỉ được tạo cho từng node,
+    không duyệt từng dòng bằng Python. Thứ tự key giống khi duyệt records.
+    
+    Args:
+        df: DataFrame chứa key_hierarchy và value_cols
+        key_hierarchy: Các cột làm key (từ ngoài vào trong)
+        value_cols: Cột làm value ở level cuối (1 cột -> giá trị, nhiều cột -> dict)
+        aggregate: {'value_col': 'sum'/'mean'/'first'/'last'/'min'/'max'/'list'}
+                   khi key bị trùng (mặc định dòng sau ghi đè dòng trước)
+    
+    Returns:
+        Nested dictionary (string dạng tuple trong value đã được parse thành tuple)
+    """
+    leaves = _leaf_frame(df, key_hierarchy, value_cols, aggregate)
+    if leaves.empty:
+        return {}
+    
+    # Id prefix ở mỗi level, theo thứ tự xuất hiện đầu tiên trong các lá
+    codes = [pd.factorize(leaves[col], use_na_sentinel=False)[0] for col in key_hierarchy]
+    prefix_ids = [_combine_codes(codes[:level + 1]) for level in range(len(key_hierarchy))]
+    order = np.lexsort(prefix_ids[::-1])
+    
+    # Vị trí bắt đầu của mỗi node ở từng level (trên các lá đã sắp xếp)
+    run_starts = []
+    for ids in prefix_ids:
+        sorted_ids = ids[order]
+        run_starts.append(np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]]))
+    
+    keys = [leaves[col].iloc[order].tolist() for col in key_hierarchy]
+    columns = {col: _parse_column(leaves[col].iloc[order].tolist()) for col in value_cols}
+    if len(value_cols) == 1:
+        values = columns[value_cols[0]]
+    else:
+        values = [dict(zip(value_cols, row)) for row in zip(*(columns[col] for col in value_cols))]
+    
+    last_level = len(key_hierarchy) - 1
+    
+    def build(level, lo, hi):
+        starts = run_starts[level]
+        bounds = starts[np.searchsorted(starts, lo):np.searchsorted(starts, hi)].tolist()
+        level_keys = keys[level]
+        if level == last_level:
+            return {level_keys[i]: values[i] for i in bounds}
+        bounds.append(hi)
+        return {
+            level_keys[start]: build(level + 1, start, end)
+            for start, end in zip(bounds[:-1], bounds[1:])
+        }
+    
+    return build(0, 0, len(leaves))
+
+
 class ExcelProcessorAdvanced:
     """Class xử lý file Excel với khả năng tùy chỉnh cao"""
     
@@ -22,7 +168,46 @@ class ExcelProcessorAdvanced:
         """
         self.file_path = file_path
         self.excel_file = pd.ExcelFile(file_path)
-        self.sheet_names = self.excel_file.sheet_names    
+        self.sheet_names = self.excel_file.sheet_names
+        
+        # Cache các sheet đã parse: nhiều lần build dictionary chỉ parse workbook một lần
+        self._sheet_cache: Dict[str, pd.DataFrame] = {}
+    
+    def read_sheets(self, sheet_names: List[str]) -> Dict[str, pd.DataFrame]:
+        """
+        Đọc nhiều sheet, các sheet chưa có trong cache được đọc trong một lần gọi read_excel
+        
+        Args:
+            sheet_names: Danh sách tên sheet
+        
+        Returns:
+            Dict {tên sheet: DataFrame} (frame dùng chung với cache, không sửa trực tiếp)
+        """
+        missing = [sheet for sheet in dict.fromkeys(sheet_names) if sheet not in self._sheet_cache]
+        if missing:
+            self._sheet_cache.update(pd.read_excel(self.excel_file, sheet_name=missing))
+        return {sheet: self._sheet_cache[sheet] for sheet in sheet_names}
+    
+    def _load_frame(self, sheet_name: Union[str, List[str]], add_sheet_column: bool = False) -> pd.DataFrame:
+        """
+        Ghép các sheet cần dùng thành một DataFrame
+        
+        Args:
+            sheet_name: Tên sheet hoặc danh sách các tên sheet
+            add_sheet_column: Thêm cột '_sheet_name' (chỉ áp dụng khi truyền list)
+        
+        Returns:
+            DataFrame mới (không dùng chung với cache)
+        """
+        if isinstance(sheet_name, str):
+            return self.read_sheets([sheet_name])[sheet_name].copy()
+        
+        sheets = self.read_sheets(list(sheet_name))
+        dfs = [
+            sheets[sheet].assign(_sheet_name=sheet) if add_sheet_column else sheets[sheet]
+            for sheet in sheet_name
+        ]
+        return pd.concat(dfs, ignore_index=True)
     
     def _apply_filters(self, df: pd.DataFrame, filters: Dict[str, Any]) -> pd.DataFrame:
         """
@@ -39,58 +224,8 @@ class ExcelProcessorAdvanced:
         Returns:
             DataFrame đã được lọc
         """
-        mask = pd.Series([True] * len(df))
-        
-        for col, condition in filters.items():
-            if col not in df.columns:
-                print(f"Cảnh báo: Cột '{col}' không tồn tại")
-                continue
-            
-            # Callable function
-            if callable(condition):
-                mask &= df[col].apply(condition)
-            
-            # List/tuple/set - isin
-            elif isinstance(condition, (list, tuple, set)):
-                mask &= df[col].isin(condition)
-            
-            # Dict với operators
-            elif isinstance(condition, dict):
-                for operator, value in condition.items():
-                    if operator == '==':
-                        mask &= (df[col] == value)
-                    elif operator == '!=':
-                        mask &= (df[col] != value)
-                    elif operator == '>':
-                        mask &= (df[col] > value)
-                    elif operator == '>=':
-                        mask &= (df[col] >= value)
-                    elif operator == '<':
-                        mask &= (df[col] < value)
-                    elif operator == '<=':
-                        mask &= (df[col] <= value)
-                    elif operator == 'in':
-                        mask &= df[col].isin(value)
-                    elif operator == 'not_in':
-                        mask &= ~df[col].isin(value)
-                    elif operator == 'contains':
-                        mask &= df[col].astype(str).str.contains(value, na=False)
-                    elif operator == 'startswith':
-                        mask &= df[col].astype(str).str.startswith(value, na=False)
-                    elif operator == 'endswith':
-                        mask &= df[col].astype(str).str.endswith(value, na=False)
-                    elif operator == 'between':
-                        mask &= df[col].between(value[0], value[1])
-                    elif operator == 'isnull':
-                        mask &= df[col].isnull() if value else df[col].notnull()
-                    else:
-                        print(f"Cảnh báo: Operator '{operator}' không được hỗ trợ")
-            
-            # Giá trị đơn - so sánh bằng
-            else:
-                mask &= (df[col] == condition)
-        
-        return df[mask]
+        # Biên dịch một lần (có cache) rồi tính mask NumPy theo vị trí dòng
+        return apply_filters(df, filters)
     
     def to_nested_dict(
         self,
@@ -113,52 +248,8 @@ class ExcelProcessorAdvanced:
         Returns:
             Nested dictionary
         """
-        # ====== HÀM HELPER ĐỂ PARSE STRING → TUPLE ======
-        def _parse_tuple_string(value):
-            """
-            Chuyển string dạng tuple thành tuple thực sự
-            VD: "('A', 'B', 'C')" → ('A', 'B', 'C')
-            """
-            if not isinstance(value, str):
-                return value
-            
-            stripped = value.strip()
-            # Kiểm tra có phải dạng tuple không: bắt đầu '(', kết thúc ')', có dấu ','
-            if stripped.startswith('(') and stripped.endswith(')') and ',' in stripped:
-                try:
-                    parsed = ast.literal_eval(stripped)
-                    # Chỉ trả về nếu kết quả là tuple
-                    if isinstance(parsed, tuple):
-                        return parsed
-                except (ValueError, SyntaxError):
-                    # Nếu parse lỗi thì giữ nguyên string
-                    pass
-            
-            return value
-        
-        def _parse_nested_dict(d):
-            """
-            Duyệt đệ quy qua nested dict và parse tất cả string values thành tuple
-            """
-            if isinstance(d, dict):
-                return {k: _parse_nested_dict(v) for k, v in d.items()}
-            elif isinstance(d, list):
-                return [_parse_tuple_string(item) for item in d]
-            else:
-                return _parse_tuple_string(d)
-
-        
-        # Đọc DataFrame
-        if isinstance(sheet_name, str):
-            df = pd.read_excel(self.excel_file, sheet_name=sheet_name)
-        else:
-            dfs = []
-            for sheet in sheet_name:
-                temp_df = pd.read_excel(self.excel_file, sheet_name=sheet)
-                if add_sheet_column:
-                    temp_df['_sheet_name'] = sheet
-                dfs.append(temp_df)
-            df = pd.concat(dfs, ignore_index=True)
+        # Đọc DataFrame (một lượt cho tất cả các sheet, dùng lại cache của instance)
+        df = self._load_frame(sheet_name, add_sheet_column)
         
         # Áp dụng filters
         if filters:
@@ -181,40 +272,7 @@ class ExcelProcessorAdvanced:
         needed_cols = key_hierarchy + value_cols
         df = df[needed_cols]
         
-        # Tối ưu: Convert sang records một lần duy nhất
-        # Nhanh hơn iterrows() rất nhiều
-        records = df.to_dict('records')
-        
-        # Tối ưu: Pre-calculate một số giá trị
-        hierarchy_len = len(key_hierarchy)
-        single_value = len(value_cols) == 1
-        value_col_name = value_cols[0] if single_value else None
-        
-        # Tạo nested dict với optimized logic
-        result = {}
-        
-        for record in records:
-            current = result
-            
-            # Traverse hierarchy (unrolled last iteration)
-            for i in range(hierarchy_len - 1):
-                key = record[key_hierarchy[i]]
-                # Tối ưu: Sử dụng setdefault thay vì if-check
-                current = current.setdefault(key, {})
-            
-            # Level cuối cùng
-            last_key = record[key_hierarchy[-1]]
-            if single_value:
-                current[last_key] = record[value_col_name]
-            else:
-                # Tối ưu: Dictionary comprehension nhanh hơn loop
-                current[last_key] = {col: record[col] for col in value_cols}
-        
-        
-        # ====== BƯỚC MỚI: PARSE TẤT CẢ STRING → TUPLE ======
-        result = _parse_nested_dict(result)
-        
-        return result
+        return build_nested_dict(df, key_hierarchy, value_cols)
     
     def to_nested_dict_advanced(
         self,
@@ -244,52 +302,8 @@ class ExcelProcessorAdvanced:
         Returns:
             Nested dictionary
         """
-        # ====== HÀM HELPER ĐỂ PARSE STRING → TUPLE ======
-        def _parse_tuple_string(value):
-            """
-            Chuyển string dạng tuple thành tuple thực sự
-            VD: "('A', 'B', 'C')" → ('A', 'B', 'C')
-            """
-            if not isinstance(value, str):
-                return value
-            
-            stripped = value.strip()
-            # Kiểm tra có phải dạng tuple không: bắt đầu '(', kết thúc ')', có dấu ','
-            if stripped.startswith('(') and stripped.endswith(')') and ',' in stripped:
-                try:
-                    parsed = ast.literal_eval(stripped)
-                    # Chỉ trả về nếu kết quả là tuple
-                    if isinstance(parsed, tuple):
-                        return parsed
-                except (ValueError, SyntaxError):
-                    # Nếu parse lỗi thì giữ nguyên string
-                    pass
-            
-            return value
-        
-        def _parse_nested_dict(d):
-            """
-            Duyệt đệ quy qua nested dict và parse tất cả string values thành tuple
-            """
-            if isinstance(d, dict):
-                return {k: _parse_nested_dict(v) for k, v in d.items()}
-            elif isinstance(d, list):
-                return [_parse_tuple_string(item) for item in d]
-            else:
-                return _parse_tuple_string(d)
-
-        
-        # Đọc DataFrame
-        if isinstance(sheet_name, str):
-            df = pd.read_excel(self.excel_file, sheet_name=sheet_name)
-        else:
-            dfs = []
-            for sheet in sheet_name:
-                temp_df = pd.read_excel(self.excel_file, sheet_name=sheet)
-                if add_sheet_column:
-                    temp_df['_sheet_name'] = sheet
-                dfs.append(temp_df)
-            df = pd.concat(dfs, ignore_index=True)
+        # Đọc DataFrame (một lượt cho tất cả các sheet, dùng lại cache của instance)
+        df = self._load_frame(sheet_name, add_sheet_column)
         
         # Áp dụng filters
         if filters:
@@ -320,79 +334,7 @@ class ExcelProcessorAdvanced:
         needed_cols = key_hierarchy + value_cols
         df = df[needed_cols]
         
-        # Pre-calculate constants
-        hierarchy_len = len(key_hierarchy)
-        single_value = len(value_cols) == 1
-        value_col_name = value_cols[0] if single_value else None
-        
-        # Tạo nested dict
-        result = {}
-        
-        if aggregate:
-            # Path với aggregation - sử dụng groupby (đã tối ưu)
-            grouped = df.groupby(key_hierarchy, sort=False)
-            
-            # Tối ưu: Pre-process aggregation functions
-            agg_funcs = {}
-            for col in value_cols:
-                func = aggregate.get(col, 'first')
-                if func == 'list':
-                    agg_funcs[col] = ('list', lambda x: x.tolist())
-                elif func in ['sum', 'mean', 'first', 'last', 'min', 'max']:
-                    agg_funcs[col] = (func, func)
-                else:
-                    agg_funcs[col] = ('first', 'first')
-            
-            for keys, group in grouped:
-                current = result
-                keys_list = keys if isinstance(keys, tuple) else (keys,)
-                
-                # Traverse hierarchy (optimized with setdefault)
-                for i in range(hierarchy_len - 1):
-                    current = current.setdefault(keys_list[i], {})
-                
-                # Level cuối cùng - áp dụng aggregation
-                last_key = keys_list[-1]
-                
-                if single_value:
-                    func_name, func = agg_funcs[value_col_name]
-                    if func_name == 'list':
-                        current[last_key] = func(group[value_col_name])
-                    else:
-                        current[last_key] = group[value_col_name].agg(func)
-                else:
-                    current[last_key] = {}
-                    for col in value_cols:
-                        func_name, func = agg_funcs[col]
-                        if func_name == 'list':
-                            current[last_key][col] = func(group[col])
-                        else:
-                            current[last_key][col] = group[col].agg(func)
-        
-        else:
-            # Path không aggregation - tối ưu với to_dict('records')
-            records = df.to_dict('records')
-            
-            for record in records:
-                current = result
-                
-                # Traverse hierarchy (unrolled last iteration)
-                for i in range(hierarchy_len - 1):
-                    key = record[key_hierarchy[i]]
-                    current = current.setdefault(key, {})
-                
-                # Level cuối cùng
-                last_key = record[key_hierarchy[-1]]
-                if single_value:
-                    current[last_key] = record[value_col_name]
-                else:
-                    current[last_key] = {col: record[col] for col in value_cols}
-        
-        
-        # ====== BƯỚC MỚI: PARSE TẤT CẢ STRING → TUPLE ======
-        result = _parse_nested_dict(result)
-        
-        return result
+        return build_nested_dict(df, key_hierarchy, value_cols, aggregate=aggregate)
     
     def get_keys_from_key(self, data, target_key, level=1):
         """
@@ -0,0 +1,125 @@
+"""
+Financial Export - Tạo file Excel/CSV cho báo cáo tài chính (lazy, có cache)
+
+- Payload chỉ được tạo khi cần (người dùng bấm tải nếu Streamlit hỗ trợ
+  data dạng callable) và được cache theo (mã, loại báo cáo, phiên bản dữ liệu).
+- Excel ưu tiên xlsxwriter ở chế độ constant_memory (ghi từng dòng, không giữ
+  cả sheet trong bộ nhớ), không có xlsxwriter thì dùng openpyxl qua pandas.
+- Workbook "tất cả báo cáo" ghi IS/BS/CF/ratio của một mã thành 4 sheet trong
+  một lần mở file.
+"""
+
+import io
+import math
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+import pandas as pd
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+# Số payload export được giữ lại
+EXPORT_CACHE_SIZE = 64
+
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+_export_cache = OrderedDict()
+_export_lock = threading.Lock()
+
+
+def _cell(value):
+    """Giá trị ô cho xlsxwriter (NaN/inf -> ô trống)"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _write_sheet_rows(workbook, sheet_name: str, df: pd.DataFrame):
+    """Ghi một DataFrame (có index) theo từng dòng, đúng thứ tự constant_memory yêu cầu"""
+    worksheet = workbook.add_worksheet(sheet_name[:31])
+    bold = workbook.add_format({'bold': True})
+    index_name = df.index.name or ''
+    worksheet.write_row(0, 0, [index_name] + [str(col) for col in df.columns], bold)
+    for row, (label, values) in enumerate(zip(df.index.tolist(), df.itertuples(index=False, name=None)), start=1):
+        worksheet.write(row, 0, label, bold)
+        worksheet.write_row(row, 1, [_cell(value) for value in values])
+
+
+def write_excel(sheets: Dict[str, pd.DataFrame]) -> bytes:
+    """
+    Ghi nhiều DataFrame thành một file xlsx
+
+    Args:
+        sheets: Dict {tên sheet: DataFrame}, giữ thứ tự sheet
+
+    Returns:
+        bytes: Nội dung file xlsx
+    """
+    output = io.BytesIO()
+
+    if xlsxwriter is not None:
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'in_memory': False})
+        for sheet_name, df in sheets.items():
+            _write_sheet_rows(workbook, sheet_name, df)
+        workbook.close()
+    else:
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            for sheet_name, df in sheets.items():
+                df.to_excel(writer, sheet_name=sheet_name[:31], index=True)
+
+    return output.getvalue()
+
+
+def write_csv(df: pd.DataFrame) -> bytes:
+    """CSV (utf-8, có index) của một DataFrame"""
+    return df.to_csv(index=True).encode('utf-8')
+
+
+def cached_export(key: Hashable, source, build: Callable[[], bytes]) -> bytes:
+    """
+    Payload export có cache
+
+    Args:
+        key: VD (mã, loại báo cáo, phiên bản dữ liệu, 'xlsx')
+        source: Object dữ liệu được export (frame/bundle); payload chỉ dùng lại
+                khi source vẫn là cùng object (đổi chỉ tiêu -> tạo lại)
+        build: Hàm không tham số tạo payload
+
+    Returns:
+        bytes
+    """
+    with _export_lock:
+        entry = _export_cache.get(key)
+        if entry is not None and entry[0]() is source:
+            _export_cache.move_to_end(key)
+            return entry[1]
+
+    payload = build()
+
+    with _export_lock:
+        _export_cache[key] = (weakref.ref(source), payload)
+        _export_cache.move_to_end(key)
+        while len(_export_cache) > EXPORT_CACHE_SIZE:
+            _export_cache.popitem(last=False)
+    return payload
+
+
+def statement_workbook(bundle) -> bytes:
+    """
+    Workbook 4 sheet (IS/BS/CF/ratio) của một mã, đơn vị gốc
+
+    Args:
+        bundle: StatementBundle (components/financial_statement.py)
+
+    Returns:
+        bytes: Nội dung file xlsx (bỏ qua báo cáo rỗng)
+    """
+    return write_excel({
+        report_type: statement.to_frame()
+        for report_type, statement in bundle.items()
+        if not statement.empty
+    })
@@ -1,18 +1,10 @@
 
-from components.excel_processor import ExcelProcessorAdvanced
-# from excel_processor import ExcelProcessorAdvanced
-map_path = "D:/aifinance_project/data/raw/Map_Complete.xlsx"
-processor = ExcelProcessorAdvanced(map_path)   
+# Đọc từ artifact đã biên dịch của Map_Complete.xlsx (components/metric_dictionary.py),
+# load lười khi FINANCIAL_METRICS được truy cập lần đầu
+from components.metric_dictionary import get_financial_metrics, LEVEL_MAP
 
-LEVEL_MAP = 3
 
-FINANCIAL_METRICS = processor.to_nested_dict_advanced(
-    ['company_map','bank_map', 'security_map', 'insurance_map',\
-     'company_ratio', 'bank_ratio', 'security_ratio', 'insurance_ratio'],
-    key_hierarchy=['CAL_GROUP', 'CATEGORY', 'COL'],
-    value_columns=['VN_NAME', 'ORDER'],
-    filters={
-        'LEVEL': {'<=':LEVEL_MAP}, 'CATEGORY': {'in':['BS', 'IS', 'CF', 'ratio'] }
-    },
-)
-# print(FINANCIAL_METRICS)
\ No newline at end of file
+def __getattr__(name):
+    if name == 'FINANCIAL_METRICS':
+        return get_financial_metrics()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
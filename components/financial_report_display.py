@@ -3,35 +3,36 @@
 Hiển thị báo cáo tài chính với performance cao và dễ customize
 """
 
+import numpy as np
 import pandas as pd
 import streamlit as st
+from packaging.version import Version
 from typing import Dict, List, Optional, Tuple
+from utils.data_index import get_symbol_rows
 
 # ==================== FINANCIAL METRICS ====================
-from components.excel_processor import ExcelProcessorAdvanced
-# from excel_processor import ExcelProcessorAdvanced
-map_path = "D:/aifinance_project/data/raw/Map_Complete.xlsx"
-processor = ExcelProcessorAdvanced(map_path)   
-
-LEVEL_MAP = 3
-
-FINANCIAL_METRICS = processor.to_nested_dict_advanced(
-    ['company_map','bank_map', 'security_map', 'insurance_map',\
-     'company_ratio', 'bank_ratio', 'security_ratio', 'insurance_ratio'],
-    key_hierarchy=['CAL_GROUP', 'CATEGORY', 'COL'],
-    value_columns=['VN_NAME', 'ORDER'],
-    filters={
-        'LEVEL': {'<=':LEVEL_MAP}, 'CATEGORY': {'in':['BS', 'IS', 'CF', 'ratio'] }
-    },
-)
-# print(FINANCIAL_METRICS)
+# Đọc từ artifact đã biên dịch của Map_Complete.xlsx (components/metric_dictionary.py).
+# Chỉ load khi được dùng lần đầu: import module này không tốn chi phí đọc catalogue.
+from components.metric_dictionary import get_financial_metrics, LEVEL_MAP
+from components.metric_catalog import get_metric_catalog
+from components.financial_statement import build_statement, build_statement_bundle, detect_cal_group
+from components.financial_table_renderer import TABLE_CLASS, render_statement_html
+from components.financial_export import XLSX_MIME, cached_export, statement_workbook, write_csv, write_excel
+
+
+def __getattr__(name):
+    """FINANCIAL_METRICS được load lười qua get_financial_metrics()"""
+    if name == 'FINANCIAL_METRICS':
+        return get_financial_metrics()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # =================== STYLE CONFIG ====================
 # Import style config
 try:
     from components.financial_report_style_config import (
         COLORS, FONTS, SPACING, COLUMN_WIDTH,
-        get_table_styles, get_cell_properties, get_group_info, get_streamlit_css
+        get_table_styles, get_cell_properties, get_group_info, get_streamlit_css,
+        get_table_css
     )
 except ImportError:
     st.warning("⚠️ Không tìm thấy financial_report_style_config.py, sử dụng style mặc định")
@@ -39,6 +40,8 @@ except ImportError:
     COLORS = {'negative_number': '#D32F2F'}
     def get_table_styles(): return []
     def get_cell_properties(): return {}
+    def get_table_css(table_class='fin-report'):
+        return f"<style>table.{table_class} td.neg {{ color: {COLORS['negative_number']}; font-weight: 600; }}</style>"
     def get_group_info(): 
         return {
             'company': {'icon': '🏢', 'name': 'Công ty', 'color': '#1976D2'},
@@ -47,32 +50,14 @@ except ImportError:
             'insurance': {'icon': '🛡️', 'name': 'Bảo hiểm', 'color': '#7B1FA2'},
         }
 
-# ==================== CACHED HELPER FUNCTIONS ====================
-
-@st.cache_data(show_spinner=False)
-def detect_cal_group(df: pd.DataFrame, symbol: str) -> str:
-    """Phát hiện CAL_GROUP (cached)"""
-    symbol_data = df[df['SYMBOL'] == symbol]
-    if symbol_data.empty:
-        return 'company'
-    
-    if 'CAL_GROUP' in symbol_data.columns:
-        cal_group = symbol_data['CAL_GROUP'].iloc[0]
-        if pd.notna(cal_group):
-            cal_group = str(cal_group).lower()
-            if cal_group in ['company', 'bank', 'security', 'insurance']:
-                return cal_group
-    
-    return 'company'
+# Khối CSS của bảng báo cáo, dựng một lần khi import
+TABLE_CSS = get_table_css(TABLE_CLASS)
 
+# ==================== CACHED HELPER FUNCTIONS ====================
 
 def get_metrics_for_report_type(cal_group: str, report_type: str) -> Dict:
-    """Lấy metrics cho report type"""
-    if cal_group not in FINANCIAL_METRICS:
-        cal_group = 'company'
-    if report_type not in FINANCIAL_METRICS[cal_group]:
-        return {}
-    return FINANCIAL_METRICS[cal_group][report_type]
+    """Lấy metrics cho report type (code -> {'VN_NAME', 'ORDER', 'name'}, đã sắp theo ORDER)"""
+    return get_metric_catalog().metrics(cal_group, report_type).info
 
 
 def format_value(val, format_type: str = 'billion'):
@@ -90,66 +75,23 @@ def format_value(val, format_type: str = 'billion'):
         return val / 1e9
 
 
-@st.cache_data(show_spinner=False)
 def prepare_financial_data(
     df: pd.DataFrame,
     symbol: str,
     report_type: str = 'IS',
     metrics: List[str] = None
 ) -> Tuple[pd.DataFrame, str, Dict]:
-    """Chuẩn bị dữ liệu tài chính (cached)"""
-    
-    # Lọc dữ liệu
-    df_filtered = df[df['SYMBOL'] == symbol].copy()
-    if df_filtered.empty:
-        return pd.DataFrame(), 'company', {}
-    
-    # Phát hiện CAL_GROUP
-    cal_group = detect_cal_group(df, symbol)
-    
-    # Lấy metrics info
-    metrics_info = get_metrics_for_report_type(cal_group, report_type)
-    
-    # Lấy metrics
-    if metrics is None:
-        metrics = list(metrics_info.keys())
-    
-    # Chỉ giữ metrics có trong data
-    available_metrics = [m for m in metrics if m in df_filtered.columns]
-    if not available_metrics:
-        return pd.DataFrame(), cal_group, {}
-    
-    # Tạo Quarter_Year
-    df_filtered['QUARTER_YEAR'] = df_filtered['QUARTER'].astype(str)
-    
-    # Pivot data
-    columns_to_keep = ['QUARTER_YEAR'] + available_metrics
-    df_pivoted = df_filtered[columns_to_keep].copy()
-    df_pivoted = df_pivoted.set_index('QUARTER_YEAR').T
-    df_pivoted.columns.name = None  # Xóa tên column index
-    
-    # Thêm tên chỉ số
-    df_pivoted['Chỉ số'] = df_pivoted.index.map(
-        lambda x: metrics_info.get(x, {}).get('name', x)
-    )
-    
-    # Thêm cột _code để tham chiếu
-    df_pivoted['_code'] = df_pivoted.index
-    
-    # Sắp xếp
-    quarter_cols = [col for col in df_pivoted.columns if col not in ['Chỉ số', '_code']]
-    df_pivoted = df_pivoted[['_code', 'Chỉ số'] + sorted(quarter_cols, reverse=True)]
-    
-    # Sort theo order
-    df_pivoted['_ORDER'] = df_pivoted['_code'].map(
-        lambda x: metrics_info.get(x, {}).get('ORDER', 999)
-    )
-    df_pivoted = df_pivoted.sort_values('_ORDER').drop('_ORDER', axis=1)
-
-    # Đặt 'Chỉ số' làm index
-    df_pivoted = df_pivoted.set_index('Chỉ số')
+    """
+    Chuẩn bị dữ liệu tài chính (cache theo frame/mã/loại báo cáo qua build_statement)
     
-    return df_pivoted, cal_group, metrics_info
+    Returns:
+        tuple: (DataFrame index 'Chỉ số', cột '_code' + các kỳ mới nhất trước
+                theo đơn vị gốc; cal_group; metrics_info)
+    """
+    statement = build_statement(df, symbol, report_type, metrics)
+    if statement.empty:
+        return pd.DataFrame(), statement.cal_group, {}
+    return statement.to_frame(), statement.cal_group, statement.metrics_info
 
 
 def display_financial_report(
@@ -158,16 +100,20 @@ def display_financial_report(
     report_type: str = 'IS',
     metrics: List[str] = None
 ):
-    """Hiển thị báo cáo tài chính"""
+    """
+    Hiển thị báo cáo tài chính
+    
+    Returns:
+        FinancialStatement đã hiển thị (dùng lại cho export, không dựng lại)
+    """
     
     # Chuẩn bị dữ liệu (cached)
-    df_display, cal_group, metrics_info = prepare_financial_data(
-        df, symbol, report_type, metrics
-    )
+    statement = build_statement(df, symbol, report_type, metrics)
+    cal_group = statement.cal_group
     
-    if df_display.empty:
+    if statement.empty:
         st.warning(f'⚠️ Không tìm thấy dữ liệu cho {symbol}')
-        return
+        return statement
     
     # Get group info
     group_info = get_group_info()
@@ -187,59 +133,9 @@ def display_financial_report(
     unit_text = '📊 Đơn vị: Tỷ lệ, %, lần, VNĐ' if report_type == 'ratio' else '💰 Đơn vị: Tỷ VNĐ'
     st.caption(unit_text)
     
-    # Format dữ liệu
-    df_styled = df_display.copy()
-    
-    if report_type == 'ratio':
-        # Format theo từng metric
-        for idx, row in df_styled.iterrows():
-            code = row.get('_code', '')
-            if code in metrics_info:
-                fmt = metrics_info[code].get('format', 'number')
-                for col in df_styled.columns:
-                    if col != '_code':
-                        df_styled.at[idx, col] = format_value(row[col], fmt)
-    else:
-        # Format tất cả sang tỷ
-        for col in df_styled.columns:
-            if col != '_code':
-                df_styled[col] = df_styled[col].apply(lambda x: format_value(x, 'billion'))
-    
-    # Highlight số âm
-    def highlight_negative(val):
-        try:
-            if isinstance(val, (int, float)) and val < 0:
-                return f'color: {COLORS["negative_number"]}; font-weight: 600'
-            return ''
-        except:
-            return ''
-    
-    # Remove _code column và reset index để "Chỉ số" thành cột thường
-    df_to_display = df_styled.drop(columns=['_code']).reset_index()
-    
-    # Apply styling
-    styled_df = df_to_display.style\
-        .hide(axis='index')\
-        .applymap(highlight_negative, subset=[col for col in df_to_display.columns if col != 'Chỉ số'])\
-        .format('{:,.2f}', subset=[col for col in df_to_display.columns if col != 'Chỉ số'], na_rep='-')\
-        .set_properties(**{
-            'text-align': 'right',
-            'font-size': '13px',
-            'padding': '8px'
-        }, subset=[col for col in df_to_display.columns if col != 'Chỉ số'])\
-        .set_properties(**{
-            'text-align': 'left',
-            'font-weight': '600',
-            'font-size': '13px',
-            'padding': '8px',
-            'background-color': '#FFF9C4',
-            'min-width': '250px',
-            'width': '250px'
-        }, subset=['Chỉ số'])\
-        .set_table_styles(get_table_styles())
-    
-    # Hiển thị bảng (index=False vì "Chỉ số" đã là cột thường)
-    st.write(styled_df.to_html(escape=False, index=False), unsafe_allow_html=True)
+    # Bảng HTML: render vectorized, cache theo statement (không qua pandas Styler)
+    table_html = render_statement_html(statement)
+    st.write(TABLE_CSS + table_html, unsafe_allow_html=True)
     
     # Footer
     st.markdown('<br>', unsafe_allow_html=True)
@@ -253,59 +149,62 @@ def display_financial_report(
     }
     
     with col1:
-        st.metric('📊 Số chỉ số', len(df_to_display))
+        st.metric('📊 Số chỉ số', len(statement.codes))
     with col2:
-        st.metric('📅 Số quý', len(df_to_display.columns))
+        st.metric('📅 Số quý', len(statement.periods))
     with col3:
         st.metric('📋 Loại', report_names.get(report_type, report_type))
+    
+    return statement
 
 
-@st.cache_data(show_spinner=False)
 def get_available_metrics(df: pd.DataFrame, symbol: str, report_type: str) -> List[str]:
-    """Lấy danh sách metrics có sẵn (cached)"""
-    symbol_data = df[df['SYMBOL'] == symbol]
+    """Lấy danh sách metrics có sẵn (tra cứu O(1) qua SymbolIndex)"""
+    symbol_data = get_symbol_rows(df, symbol)
     if symbol_data.empty:
         return []
     
     cal_group = detect_cal_group(df, symbol)
-    metrics_info = get_metrics_for_report_type(cal_group, report_type)
-    
-    return [m for m in metrics_info.keys() if m in symbol_data.columns]
+    return get_metric_catalog().metrics(cal_group, report_type).available(symbol_data.columns)
 
 
 def export_to_excel(df: pd.DataFrame, symbol: str, report_type: str) -> bytes:
     """
-    Export dữ liệu ra file Excel
+    Export dữ liệu ra file Excel (xlsxwriter constant_memory nếu có, không thì openpyxl)
     Returns: bytes data của file Excel
     """
-    from io import BytesIO
-    
-    output = BytesIO()
-    
-    # Tạo Excel writer
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name=report_type, index=True)
-    
-    output.seek(0)
-    return output.getvalue()
+    return write_excel({report_type: df})
 
 
-def export_to_csv(df: pd.DataFrame) -> str:
+def export_to_csv(df: pd.DataFrame) -> bytes:
     """
     Export dữ liệu ra CSV
-    Returns: CSV string
+    Returns: CSV bytes (utf-8)
     """
-    return df.to_csv(index=True).encode('utf-8')
+    return write_csv(df)
+
+
+# st.download_button nhận data dạng callable từ Streamlit 1.52: file chỉ được tạo khi người dùng bấm tải
+DEFERRED_DOWNLOAD_MIN_VERSION = '1.52.0'
+_DEFERRED_DOWNLOAD = Version(st.__version__) >= Version(DEFERRED_DOWNLOAD_MIN_VERSION)
+
 
+def _download_data(key, source, build):
+    """data cho st.download_button: callable (lazy) nếu được hỗ trợ, không thì bytes đã cache"""
+    if _DEFERRED_DOWNLOAD:
+        return lambda: cached_export(key, source, build)
+    return cached_export(key, source, build)
 
-def create_export_buttons(df: pd.DataFrame, symbol: str, report_type: str):
+
+def create_export_buttons(df: pd.DataFrame, symbol: str, report_type: str, data_version: str = None):
     """
     Tạo các nút export cho báo cáo
     
     Args:
-        df: DataFrame cần export (đã format)
+        df: DataFrame cần export (frame của statement đang hiển thị)
         symbol: Mã chứng khoán
         report_type: Loại báo cáo
+        data_version: Phiên bản dữ liệu (DatasetStore.version), dùng làm key cache
     """
     report_names = {
         'IS': 'Ket_qua_KD',
@@ -320,36 +219,77 @@ def create_export_buttons(df: pd.DataFrame, symbol: str, report_type: str):
     
     with col1:
         # Export Excel
-        excel_data = export_to_excel(df, symbol, report_type)
         st.download_button(
             label="📥 Export Excel",
-            data=excel_data,
+            data=_download_data((symbol, report_type, data_version, 'xlsx'), df,
+                                lambda: export_to_excel(df, symbol, report_type)),
             file_name=f"{file_name}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            mime=XLSX_MIME,
             use_container_width=True
         )
     
     with col2:
         # Export CSV
-        csv_data = export_to_csv(df)
         st.download_button(
             label="📥 Export CSV",
-            data=csv_data,
+            data=_download_data((symbol, report_type, data_version, 'csv'), df,
+                                lambda: export_to_csv(df)),
             file_name=f"{file_name}.csv",
             mime="text/csv",
             use_container_width=True
         )
 
 
+def create_bundle_export_button(df: pd.DataFrame, symbol: str, metrics: Optional[List[str]] = None,
+                                data_version: str = None):
+    """
+    Nút export workbook tất cả báo cáo (IS/BS/CF/ratio, mỗi báo cáo một sheet)
+    
+    Bundle và workbook chỉ được dựng khi người dùng bấm tải (data callable);
+    Streamlit chưa hỗ trợ data callable thì cần bấm "Chuẩn bị" trước.
+    
+    Args:
+        df: DataFrame dữ liệu (frame trong kho dùng chung)
+        symbol: Mã chứng khoán
+        metrics: Danh sách mã chỉ tiêu (mặc định tất cả chỉ tiêu của nhóm)
+        data_version: Phiên bản dữ liệu (DatasetStore.version), dùng làm key cache
+    """
+    key = (symbol, 'ALL', data_version, 'xlsx')
+    button = dict(
+        label="📥 Export tất cả báo cáo (Excel)",
+        file_name=f"{symbol}_Bao_cao_tai_chinh.xlsx",
+        mime=XLSX_MIME,
+        use_container_width=True
+    )
+
+    def build():
+        bundle = build_statement_bundle(df, symbol, metrics)
+        return cached_export(key, bundle, lambda: statement_workbook(bundle))
+
+    if _DEFERRED_DOWNLOAD:
+        st.download_button(data=build, **button)
+        return
+
+    # Streamlit cũ: chỉ tạo workbook sau khi người dùng yêu cầu (nhớ theo mã/chỉ tiêu/phiên bản)
+    request = (symbol, tuple(metrics) if metrics is not None else None, data_version)
+    if st.session_state.get('bundle_export_request') != request:
+        if not st.button("📦 Chuẩn bị file Excel tất cả báo cáo", use_container_width=True):
+            return
+        st.session_state['bundle_export_request'] = request
+    st.download_button(data=build(), **button)
+
+
 # ==================== EXPORT ====================
 
 __all__ = [
-    'FINANCIAL_METRICS',
+    'get_financial_metrics',
     'detect_cal_group',
+    'build_statement_bundle',
     'get_metrics_for_report_type',
     'format_value',
     'prepare_financial_data',
     'display_financial_report',
     'get_available_metrics',
-    'create_export_buttons'
+    'create_export_buttons',
+    'create_bundle_export_button'
 ]
\ No newline at end of file
@@ -147,6 +147,34 @@ def get_cell_properties():
         'padding': SPACING['cell_padding'],
     }
 
+# ==================== TABLE CSS (RENDERER) ====================
+
+def get_table_css(table_class='fin-report'):
+    """
+    Khối CSS cho bảng render bởi components/financial_table_renderer.py
+    Dựng từ get_table_styles() và get_cell_properties(), scope theo class của bảng
+
+    Args:
+        table_class: Class của thẻ <table>
+
+    Returns:
+        str: Thẻ <style> hoàn chỉnh
+    """
+    scope = f'table.{table_class}'
+    rules = [
+        (f'{scope} td', list(get_cell_properties().items())),
+        (f'{scope} td.neg', [('color', COLORS['negative_number']), ('font-weight', FONTS['weight_bold'])]),
+    ]
+    for style in get_table_styles():
+        selector = style['selector']
+        rules.append((scope if selector == 'table' else f'{scope} {selector}', style['props']))
+
+    body = '\n'.join(
+        f"{selector} {{ {'; '.join(f'{prop}: {value}' for prop, value in props)}; }}"
+        for selector, props in rules
+    )
+    return f'<style>\n{body}\n</style>'
+
 # ==================== GROUP INFO ====================
 
 def get_group_info():
@@ -0,0 +1,269 @@
+"""
+Financial Statement - Dựng ma trận báo cáo tài chính (chỉ tiêu x kỳ) cho một mã
+
+Các dòng của mã được lấy qua SymbolIndex một lần cho cả bốn báo cáo
+(IS/BS/CF/ratio): cột chỉ tiêu của tất cả báo cáo được đọc thành một ma trận
+float64 trong một lần to_numpy, rồi tách theo từng báo cáo (sắp theo ORDER
+của catalogue, kỳ mới nhất trước). Hệ số đổi đơn vị được tính sẵn cho từng
+chỉ tiêu. Kết quả được cache theo (frame, mã, chỉ tiêu): frame trong kho dùng
+chung đổi khi phiên bản dữ liệu đổi nên cache tự động theo phiên bản.
+"""
+
+import weakref
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from utils.data_index import get_symbol_rows, period_keys
+from components.metric_catalog import get_metric_catalog
+
+STATEMENT_TYPES = ('IS', 'BS', 'CF', 'ratio')
+
+CAL_GROUPS = ('company', 'bank', 'security', 'insurance')
+
+# Hệ số nhân theo định dạng chỉ tiêu (format_value): tiền -> tỷ đồng, tỷ lệ giữ nguyên
+FORMAT_FACTORS = {
+    'billion': 1e-9,
+    'vnd': 1e-9,
+    'percent': 1.0,
+    'number': 1.0,
+}
+DEFAULT_FACTOR = 1e-9
+
+# Số bộ báo cáo (một mã, bốn loại) đã dựng được giữ lại
+STATEMENT_CACHE_SIZE = 256
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def detect_cal_group(df: pd.DataFrame, symbol: str) -> str:
+    """Phát hiện CAL_GROUP (tra cứu O(1) qua SymbolIndex)"""
+    return _cal_group_of(get_symbol_rows(df, symbol))
+
+
+def _cal_group_of(symbol_data: pd.DataFrame) -> str:
+    """CAL_GROUP từ các dòng của một mã (mặc định 'company')"""
+    if symbol_data.empty:
+        return 'company'
+
+    if 'CAL_GROUP' in symbol_data.columns:
+        cal_group = symbol_data['CAL_GROUP'].iloc[0]
+        if pd.notna(cal_group):
+            cal_group = str(cal_group).lower()
+            if cal_group in CAL_GROUPS:
+                return cal_group
+
+    return 'company'
+
+
+def period_label(key: int) -> str:
+    """Nhãn 'YYYYQX' từ key kỳ year * 4 + quý"""
+    return f"{(key - 1) // 4}Q{(key - 1) % 4 + 1}"
+
+
+def scale_factors(report_type: str, metrics_info: Dict, codes: List[str]) -> np.ndarray:
+    """
+    Hệ số đổi đơn vị cho từng chỉ tiêu
+
+    Báo cáo BS/IS/CF đổi toàn bộ sang tỷ đồng; báo cáo ratio theo 'format'
+    của từng chỉ tiêu (mặc định 'number', giữ nguyên).
+    """
+    if report_type != 'ratio':
+        return np.full(len(codes), FORMAT_FACTORS['billion'])
+    return np.array([
+        FORMAT_FACTORS.get(metrics_info.get(code, {}).get('format', 'number'), DEFAULT_FACTOR)
+        for code in codes
+    ])
+
+
+def _metric_matrix(rows: pd.DataFrame, codes: List[str]) -> np.ndarray:
+    """Ma trận (kỳ x chỉ tiêu) float64 trong một lần to_numpy (cột không phải số -> NaN)"""
+    block = rows[codes]
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in block.dtypes):
+        block = block.apply(pd.to_numeric, errors='coerce')
+    return block.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+class FinancialStatement:
+    """Một báo cáo (IS/BS/CF/ratio) của một mã: ma trận chỉ tiêu x kỳ"""
+
+    def __init__(self, symbol: str, report_type: str, cal_group: str, metrics_info: Dict,
+                 codes: List[str], names: List[str], periods: List[str], values: np.ndarray):
+        """
+        Args:
+            symbol: Mã
+            report_type: 'IS', 'BS', 'CF' hoặc 'ratio'
+            cal_group: Nhóm của mã
+            metrics_info: code -> {'VN_NAME', 'ORDER', 'name'} của nhóm
+            codes: Mã chỉ tiêu theo thứ tự dòng
+            names: Nhãn dòng hiển thị và export (mã chỉ tiêu, như bảng gốc)
+            periods: Nhãn kỳ theo thứ tự cột (mới nhất trước)
+            values: Ma trận float64 (len(codes) x len(periods)), đơn vị gốc
+        """
+        self.symbol = symbol
+        self.report_type = report_type
+        self.cal_group = cal_group
+        self.metrics_info = metrics_info
+        self.codes = codes
+        self.names = names
+        self.periods = periods
+        self.values = values
+        self.factors = scale_factors(report_type, metrics_info, codes)
+
+        # Ma trận và frame chỉ đọc: được dùng chung qua cache
+        self.values.setflags(write=False)
+        self._frames = {}
+
+    @property
+    def empty(self) -> bool:
+        return len(self.codes) == 0 or len(self.periods) == 0
+
+    @property
+    def scaled_values(self) -> np.ndarray:
+        """Giá trị đã đổi đơn vị hiển thị (một phép nhân broadcast)"""
+        return self.values * self.factors[:, None]
+
+    def to_frame(self, scaled: bool = False) -> pd.DataFrame:
+        """
+        DataFrame index 'Chỉ số', cột '_code' rồi các kỳ (mới nhất trước)
+
+        Frame được dựng một lần cho mỗi giá trị scaled và dùng lại (hiển thị và
+        export cùng một frame), người gọi không sửa trực tiếp.
+
+        Args:
+            scaled: Đổi đơn vị hiển thị (tỷ đồng) thay vì giữ đơn vị gốc
+
+        Returns:
+            DataFrame (rỗng nếu báo cáo rỗng)
+        """
+        if self.empty:
+            return pd.DataFrame()
+        frame = self._frames.get(scaled)
+        if frame is None:
+            values = self.scaled_values if scaled else self.values
+            frame = pd.DataFrame(values, index=pd.Index(self.names, name='Chỉ số'), columns=self.periods)
+            frame.insert(0, '_code', self.codes)
+            self._frames[scaled] = frame
+        return frame
+
+
+def _empty_statement(symbol, report_type, cal_group, metrics_info=None):
+    return FinancialStatement(symbol, report_type, cal_group, metrics_info or {}, [], [], [],
+                              np.empty((0, 0)))
+
+
+class StatementBundle:
+    """Bốn báo cáo (IS/BS/CF/ratio) của một mã, dựng từ một lần cắt dòng"""
+
+    def __init__(self, symbol: str, cal_group: str, statements: Dict[str, FinancialStatement]):
+        self.symbol = symbol
+        self.cal_group = cal_group
+        self.statements = statements
+
+    def __getitem__(self, report_type: str) -> FinancialStatement:
+        return self.statements[report_type]
+
+    def __iter__(self):
+        return iter(self.statements)
+
+    def items(self):
+        return self.statements.items()
+
+
+def _select_codes(group, columns, metrics: Optional[List[str]]) -> List[str]:
+    """Mã chỉ tiêu của một báo cáo theo thứ tự dòng"""
+    if metrics is None:
+        return group.available(columns)
+    # Chỉ tiêu tự chọn: giữ các cột có trong dữ liệu, sắp theo ORDER (mã lạ xếp cuối)
+    codes = [m for m in metrics if m in columns]
+    return [codes[i] for i in np.argsort(group.orders_for(codes), kind='stable')]
+
+
+def _build_bundle(df: pd.DataFrame, symbol: str, metrics: Optional[List[str]]) -> StatementBundle:
+    """Dựng cả bốn báo cáo của một mã (không cache)"""
+    rows = get_symbol_rows(df, symbol)
+    if rows.empty:
+        return StatementBundle(symbol, 'company', {
+            report_type: _empty_statement(symbol, report_type, 'company') for report_type in STATEMENT_TYPES
+        })
+
+    cal_group = _cal_group_of(rows)
+    catalog = get_metric_catalog()
+    columns = set(rows.columns)
+    groups = {report_type: catalog.metrics(cal_group, report_type) for report_type in STATEMENT_TYPES}
+    codes = {report_type: _select_codes(group, columns, metrics) for report_type, group in groups.items()}
+
+    # Kỳ mới nhất trước; nhãn 'YYYYQX' duy nhất cho mỗi kỳ
+    keys = period_keys(rows)
+    order = np.argsort(-keys, kind='stable')
+    periods = [period_label(int(key)) for key in keys[order]]
+
+    # Một ma trận (chỉ tiêu x kỳ) cho hợp các chỉ tiêu của bốn báo cáo
+    all_codes = list(dict.fromkeys(code for report_codes in codes.values() for code in report_codes))
+    matrix = _metric_matrix(rows, all_codes)[order].T if all_codes else np.empty((0, len(order)))
+    position = {code: i for i, code in enumerate(all_codes)}
+
+    statements = {}
+    for report_type, group in groups.items():
+        report_codes = codes[report_type]
+        if not report_codes:
+            statements[report_type] = _empty_statement(symbol, report_type, cal_group, group.info)
+            continue
+        values = matrix[[position[code] for code in report_codes]]
+        statements[report_type] = FinancialStatement(
+            symbol, report_type, cal_group, group.info, report_codes,
+            list(report_codes), periods, values
+        )
+    return StatementBundle(symbol, cal_group, statements)
+
+
+def build_statement_bundle(df: pd.DataFrame, symbol: str,
+                           metrics: Optional[List[str]] = None) -> StatementBundle:
+    """
+    Lấy cả bốn báo cáo của một mã (cache theo frame, mã, chỉ tiêu)
+
+    Args:
+        df: DataFrame dữ liệu (frame trong kho dùng chung)
+        symbol: Mã
+        metrics: Danh sách mã chỉ tiêu (mặc định tất cả chỉ tiêu của nhóm)
+
+    Returns:
+        StatementBundle: bundle['IS'], bundle['BS'], bundle['CF'], bundle['ratio']
+    """
+    key = (id(df), symbol, tuple(metrics) if metrics is not None else None)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0]() is df:
+            _cache.move_to_end(key)
+            return entry[1]
+
+    bundle = _build_bundle(df, symbol, metrics)
+
+    with _cache_lock:
+        _cache[key] = (weakref.ref(df), bundle)
+        _cache.move_to_end(key)
+        while len(_cache) > STATEMENT_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return bundle
+
+
+def build_statement(df: pd.DataFrame, symbol: str, report_type: str = 'IS',
+                    metrics: Optional[List[str]] = None) -> FinancialStatement:
+    """
+    Lấy một báo cáo của mã (lấy từ bundle đã cache)
+
+    Args:
+        df: DataFrame dữ liệu (frame trong kho dùng chung)
+        symbol: Mã
+        report_type: 'IS', 'BS', 'CF' hoặc 'ratio'
+        metrics: Danh sách mã chỉ tiêu (mặc định tất cả chỉ tiêu của nhóm)
+
+    Returns:
+        FinancialStatement
+    """
+    bundle = build_statement_bundle(df, symbol, metrics)
+    if report_type not in bundle.statements:
+        return _empty_statement(symbol, report_type, bundle.cal_group)
+    return bundle[report_type]
@@ -0,0 +1,97 @@
+"""
+Financial Table Renderer - Render bảng báo cáo tài chính thành HTML không qua pandas Styler
+
+Styler gọi hàm Python cho từng ô (applymap) rồi sinh CSS riêng cho từng ô
+ở mỗi lần to_html(). Renderer này giữ nguyên giao diện nhưng:
+    - Số âm được đánh dấu bằng mask NumPy (class 'neg' thay cho style từng ô)
+    - CSS là một khối dựng sẵn từ financial_report_style_config.get_table_css()
+    - Định dạng số '{:,.2f}' theo từng cột, ô NaN -> '-'
+    - HTML đã render được cache theo FinancialStatement (bản thân statement
+      được cache theo frame/mã/chỉ tiêu nên cache tự động theo phiên bản dữ liệu)
+"""
+
+import html
+import threading
+import weakref
+from typing import List
+import numpy as np
+
+TABLE_CLASS = 'fin-report'
+NA_REP = '-'
+INDEX_HEADER = 'Chỉ số'
+
+_html_cache = weakref.WeakKeyDictionary()
+_html_lock = threading.Lock()
+
+
+def format_matrix(values: np.ndarray, na_rep: str = NA_REP) -> np.ndarray:
+    """
+    Định dạng ma trận số theo từng cột ('{:,.2f}', NaN -> na_rep)
+
+    Args:
+        values: Ma trận float (dòng x cột)
+        na_rep: Chuỗi cho ô NaN
+
+    Returns:
+        np.ndarray: Ma trận chuỗi (dtype object) cùng shape
+    """
+    text = np.full(values.shape, na_rep, dtype=object)
+    present = ~np.isnan(values)
+    for j in range(values.shape[1]):
+        rows = present[:, j]
+        text[rows, j] = [format(value, ',.2f') for value in values[rows, j].tolist()]
+    return text
+
+
+def render_table_html(names: List[str], columns: List[str], values: np.ndarray,
+                      table_class: str = TABLE_CLASS, index_header: str = INDEX_HEADER) -> str:
+    """
+    Render bảng (cột tên chỉ tiêu + các cột số) thành HTML
+
+    Args:
+        names: Tên chỉ tiêu theo thứ tự dòng
+        columns: Nhãn các cột số
+        values: Ma trận float (len(names) x len(columns)), đã đổi đơn vị hiển thị
+        table_class: Class của thẻ <table> (khớp với get_table_css)
+        index_header: Tiêu đề cột tên chỉ tiêu
+
+    Returns:
+        str: Thẻ <table> (không gồm CSS)
+    """
+    with np.errstate(invalid='ignore'):
+        negative = values < 0
+    opening = np.where(negative, '<td class="neg">', '<td>').astype(object)
+    cells = opening + format_matrix(values) + '</td>'
+
+    header = ''.join(f'<th>{html.escape(str(column))}</th>' for column in columns)
+    body = ''.join(
+        f'<tr><td>{html.escape(str(name))}</td>{"".join(row)}</tr>'
+        for name, row in zip(names, cells.tolist())
+    )
+    return (
+        f'<table class="{table_class}">'
+        f'<thead><tr><th>{html.escape(index_header)}</th>{header}</tr></thead>'
+        f'<tbody>{body}</tbody></table>'
+    )
+
+
+def render_statement_html(statement) -> str:
+    """
+    HTML của một FinancialStatement (giá trị đã đổi đơn vị), cache theo statement
+
+    Args:
+        statement: FinancialStatement (components/financial_statement.py)
+
+    Returns:
+        str: Thẻ <table> (không gồm CSS)
+    """
+    with _html_lock:
+        cached = _html_cache.get(statement)
+    if cached is not None:
+        return cached
+
+    rendered = render_table_html(statement.names, statement.periods, statement.scaled_values)
+
+    with _html_lock:
+        _html_cache[statement] = rendered
+    return rendered
@@ -0,0 +1,150 @@
+"""
+Metric Catalog - Catalogue chỉ tiêu dạng bảng phẳng có chỉ mục dựng sẵn
+
+Thay cho việc duyệt dict lồng nhau CAL_GROUP -> CATEGORY -> COL ở mỗi lần
+render: catalogue được trải phẳng một lần thành DataFrame (sắp theo ORDER),
+kèm chỉ mục theo (cal_group, category) và theo mã chỉ tiêu.
+"""
+
+import functools
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+# Nhóm mặc định khi cal_group không có trong catalogue
+DEFAULT_CAL_GROUP = 'company'
+
+# ORDER của mã không có trong catalogue (xếp cuối bảng)
+MISSING_ORDER = 999
+
+CATALOG_COLUMNS = ['CAL_GROUP', 'CATEGORY', 'COL', 'VN_NAME', 'ORDER']
+
+
+class MetricGroup:
+    """Các chỉ tiêu của một (cal_group, category), đã sắp theo ORDER"""
+
+    def __init__(self, frame: pd.DataFrame):
+        """
+        Args:
+            frame: Các dòng của catalogue thuộc nhóm (đã sắp theo ORDER)
+        """
+        self.frame = frame
+        self.codes: List[str] = frame['COL'].tolist()
+        self.names: List[str] = [
+            name if isinstance(name, str) else code
+            for code, name in zip(self.codes, frame['VN_NAME'].tolist())
+        ]
+        self.orders = frame['ORDER'].to_numpy()
+
+        self._name_map = dict(zip(self.codes, self.names))
+        self._order_map = dict(zip(self.codes, self.orders.tolist()))
+
+        # Dạng dict như catalogue lồng nhau cũ: code -> {'VN_NAME', 'ORDER', 'name'}
+        self.info: Dict[str, Dict] = {
+            code: {'VN_NAME': name, 'ORDER': order, 'name': name}
+            for code, name, order in zip(self.codes, self.names, self.orders.tolist())
+        }
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self._name_map
+
+    def name(self, code: str) -> str:
+        """Tên tiếng Việt của mã (mặc định chính mã đó)"""
+        return self._name_map.get(code, code)
+
+    def orders_for(self, codes) -> np.ndarray:
+        """ORDER cho danh sách mã (MISSING_ORDER nếu không có trong nhóm)"""
+        return np.array([self._order_map.get(code, MISSING_ORDER) for code in codes], dtype=float)
+
+    def available(self, columns) -> List[str]:
+        """Các mã của nhóm có trong columns, giữ thứ tự ORDER"""
+        columns = set(columns)
+        return [code for code in self.codes if code in columns]
+
+
+_EMPTY_GROUP = MetricGroup(pd.DataFrame(columns=CATALOG_COLUMNS))
+
+
+class MetricCatalog:
+    """Catalogue chỉ tiêu phẳng với chỉ mục theo (cal_group, category) và theo mã"""
+
+    def __init__(self, frame: pd.DataFrame):
+        """
+        Args:
+            frame: DataFrame có các cột CATALOG_COLUMNS
+        """
+        self.frame = frame.sort_values(
+            ['CAL_GROUP', 'CATEGORY', 'ORDER'], kind='stable', na_position='last'
+        ).reset_index(drop=True)
+
+        self._groups = {
+            key: MetricGroup(group)
+            for key, group in self.frame.groupby(['CAL_GROUP', 'CATEGORY'], sort=False)
+        }
+        self._by_code = {
+            code: list(zip(rows['CAL_GROUP'], rows['CATEGORY']))
+            for code, rows in self.frame.groupby('COL', sort=False)
+        }
+        self.cal_groups = list(dict.fromkeys(self.frame['CAL_GROUP']))
+
+    @classmethod
+    def from_nested(cls, nested: Dict) -> 'MetricCatalog':
+        """
+        Dựng catalogue từ dict lồng nhau {CAL_GROUP: {CATEGORY: {COL: {'VN_NAME', 'ORDER'}}}}
+
+        Args:
+            nested: Kết quả của get_financial_metrics()
+
+        Returns:
+            MetricCatalog
+        """
+        rows = [
+            (cal_group, category, code, info.get('VN_NAME'), info.get('ORDER'))
+            for cal_group, categories in nested.items()
+            for category, metrics in categories.items()
+            for code, info in metrics.items()
+        ]
+        frame = pd.DataFrame(rows, columns=CATALOG_COLUMNS)
+        frame['ORDER'] = pd.to_numeric(frame['ORDER'], errors='coerce')
+        return cls(frame)
+
+    def resolve_cal_group(self, cal_group: str) -> str:
+        """cal_group không có trong catalogue -> DEFAULT_CAL_GROUP"""
+        return cal_group if cal_group in self.cal_groups else DEFAULT_CAL_GROUP
+
+    def metrics(self, cal_group: str, category: str) -> MetricGroup:
+        """
+        Chỉ tiêu của (cal_group, category), tra cứu O(1)
+
+        Args:
+            cal_group: 'company', 'bank', 'security' hoặc 'insurance'
+            category: 'BS', 'IS', 'CF' hoặc 'ratio'
+
+        Returns:
+            MetricGroup (rỗng nếu không có)
+        """
+        return self._groups.get((self.resolve_cal_group(cal_group), category), _EMPTY_GROUP)
+
+    def categories(self, cal_group: str) -> List[str]:
+        """Các category của một cal_group"""
+        cal_group = self.resolve_cal_group(cal_group)
+        return [category for group, category in self._groups if group == cal_group]
+
+    def locate(self, code: str) -> List[tuple]:
+        """Các (cal_group, category) chứa mã chỉ tiêu"""
+        return self._by_code.get(code, [])
+
+
+@functools.lru_cache(maxsize=1)
+def get_metric_catalog() -> MetricCatalog:
+    """
+    MetricCatalog của catalogue báo cáo tài chính (dựng một lần mỗi process)
+
+    Returns:
+        MetricCatalog
+    """
+    from components.metric_dictionary import get_financial_metrics
+    return MetricCatalog.from_nested(get_financial_metrics())
@@ -0,0 +1,200 @@
+"""
+Metric Dictionary - Biên dịch Map_Complete.xlsx thành artifact nhị phân
+
+Đọc workbook bằng openpyxl (qua ExcelProcessorAdvanced) rất chậm, nên
+dictionary chỉ tiêu được build một lần rồi lưu thành file pickle. Các lần
+import sau chỉ cần stat workbook và đọc pickle; artifact chỉ được build lại
+khi workbook đổi (mtime/size, xác nhận lại bằng sha1 nội dung), khi spec đổi
+hoặc khi ARTIFACT_VERSION tăng.
+
+Biên dịch thủ công: python -m components.metric_dictionary
+"""
+
+import os
+import hashlib
+import functools
+import pickle
+import tempfile
+from pathlib import Path
+import config
+
+# Tăng khi logic build dictionary thay đổi để artifact cũ bị bỏ qua
+ARTIFACT_VERSION = 1
+
+LEVEL_MAP = 3
+
+# Tham số to_nested_dict_advanced của catalogue chỉ tiêu báo cáo tài chính
+FINANCIAL_METRICS_SPEC = {
+    'sheet_name': ['company_map', 'bank_map', 'security_map', 'insurance_map',
+                   'company_ratio', 'bank_ratio', 'security_ratio', 'insurance_ratio'],
+    'key_hierarchy': ['CAL_GROUP', 'CATEGORY', 'COL'],
+    'value_columns': ['VN_NAME', 'ORDER'],
+    'filters': {
+        'LEVEL': {'<=': LEVEL_MAP}, 'CATEGORY': {'in': ['BS', 'IS', 'CF', 'ratio']}
+    },
+}
+
+
+def _file_sha1(path):
+    """sha1 nội dung file"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _spec_key(spec):
+    """Key ổn định của spec (đổi spec -> build lại)"""
+    return hashlib.sha1(repr(sorted(spec.items())).encode()).hexdigest()[:12]
+
+
+def artifact_path(name, artifact_dir=None):
+    """
+    Đường dẫn artifact của một dictionary
+
+    Args:
+        name: Tên dictionary, VD 'financial_metrics'
+        artifact_dir: Thư mục artifact (mặc định config.METRIC_ARTIFACT_DIR)
+
+    Returns:
+        Path
+    """
+    return Path(artifact_dir or config.METRIC_ARTIFACT_DIR).expanduser() / f"{name}.pkl"
+
+
+def compile_metric_dictionary(map_path, spec, out_path):
+    """
+    Build dictionary từ workbook và ghi artifact
+
+    Args:
+        map_path: Đường dẫn Map_Complete.xlsx
+        spec: Tham số cho ExcelProcessorAdvanced.to_nested_dict_advanced
+        out_path: File artifact cần ghi
+
+    Returns:
+        dict: Artifact đã ghi (version, spec, mtime_ns, size, sha1, data)
+    """
+    from components.excel_processor import ExcelProcessorAdvanced
+
+    stat = os.stat(map_path)
+    data = ExcelProcessorAdvanced(map_path).to_nested_dict_advanced(**spec)
+    artifact = {
+        'version': ARTIFACT_VERSION,
+        'spec': _spec_key(spec),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha1': _file_sha1(map_path),
+        'data': data,
+    }
+    _write_artifact(artifact, out_path)
+    return artifact
+
+
+def _write_artifact(artifact, out_path):
+    """Ghi pickle qua file tạm rồi đổi tên (process khác không đọc phải file dở dang)"""
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=out_path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, out_path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _read_artifact(path):
+    """Đọc artifact, None nếu chưa có hoặc hỏng"""
+    try:
+        with open(path, 'rb') as f:
+            artifact = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    return artifact if isinstance(artifact, dict) and 'data' in artifact else None
+
+
+def load_metric_dictionary(name, spec, map_path=None, artifact_dir=None):
+    """
+    Lấy dictionary từ artifact, chỉ build lại khi workbook/spec thay đổi
+
+    Nếu không tìm thấy workbook (VD môi trường deploy chỉ có artifact),
+    dùng artifact hiện có.
+
+    Args:
+        name: Tên artifact, VD 'financial_metrics'
+        spec: Tham số cho to_nested_dict_advanced
+        map_path: Đường dẫn workbook (mặc định config.MAP_FILE)
+        artifact_dir: Thư mục artifact (mặc định config.METRIC_ARTIFACT_DIR)
+
+    Returns:
+        dict: Nested dictionary
+    """
+    map_path = map_path or config.MAP_FILE
+    out_path = artifact_path(name, artifact_dir)
+    artifact = _read_artifact(out_path)
+    valid = (
+        artifact is not None
+        and artifact.get('version') == ARTIFACT_VERSION
+        and artifact.get('spec') == _spec_key(spec)
+    )
+
+    try:
+        stat = os.stat(map_path)
+    except OSError:
+        if valid:
+            return artifact['data']
+        raise FileNotFoundError(f"Không tìm thấy {map_path} và chưa có artifact {out_path}")
+
+    if valid:
+        if (artifact.get('mtime_ns'), artifact.get('size')) == (stat.st_mtime_ns, stat.st_size):
+            return artifact['data']
+        # mtime đổi nhưng nội dung giữ nguyên (copy/checkout lại): chỉ cập nhật dấu thời gian
+        if artifact.get('size') == stat.st_size and artifact.get('sha1') == _file_sha1(map_path):
+            artifact.update(mtime_ns=stat.st_mtime_ns)
+            try:
+                _write_artifact(artifact, out_path)
+            except OSError:
+                pass
+            return artifact['data']
+
+    try:
+        return compile_metric_dictionary(map_path, spec, out_path)['data']
+    except OSError:
+        # Không ghi được artifact (thư mục chỉ đọc): vẫn trả dictionary vừa build
+        from components.excel_processor import ExcelProcessorAdvanced
+        return ExcelProcessorAdvanced(map_path).to_nested_dict_advanced(**spec)
+
+
+def load_financial_metrics(map_path=None):
+    """Catalogue chỉ tiêu báo cáo tài chính (CAL_GROUP -> CATEGORY -> COL)"""
+    return load_metric_dictionary('financial_metrics', FINANCIAL_METRICS_SPEC, map_path=map_path)
+
+
+@functools.lru_cache(maxsize=1)
+def get_financial_metrics():
+    """
+    Catalogue chỉ tiêu báo cáo tài chính, load lần đầu khi được gọi
+
+    Mỗi process chỉ load một lần; các lần gọi sau trả lại cùng dict
+    (coi là read-only).
+
+    Returns:
+        dict: CAL_GROUP -> CATEGORY -> COL -> {'VN_NAME', 'ORDER'}
+    """
+    return load_financial_metrics()
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    source = sys.argv[1] if len(sys.argv) > 1 else config.MAP_FILE
+    target = artifact_path('financial_metrics')
+    started = time.perf_counter()
+    compiled = compile_metric_dictionary(source, FINANCIAL_METRICS_SPEC, target)
+    print(f"Đã biên dịch {source} -> {target} ({time.perf_counter() - started:.2f}s, sha1 {compiled['sha1'][:12]})")
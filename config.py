@@ -3,12 +3,108 @@ Configuration file for Stock Dashboard
 Chứa các constants, cấu hình và settings
 """
 
+import os
+
 # ========== PATH CONFIGURATION ==========
 DATA_DIR = "D:/aifinance_project/data/output"
 MARKET_DATA_FILE = f"{DATA_DIR}/market_analysis.parquet"
 INDUSTRY_DATA_FILE = f"{DATA_DIR}/industry_analysis.parquet"
 TICKER_DATA_FILE = f"{DATA_DIR}/ticker_analysis.parquet"
 
+# ========== DATA COMPACTION ==========
+# compact_frame (utils/data_compact.py) chạy lúc load để giảm bộ nhớ mỗi replica
+COMPACT_CATEGORY_MAX_RATIO = 0.5   # Cột chuỗi có (số giá trị khác nhau / số dòng) <= ngưỡng -> category
+COMPACT_FLOAT32_TOLERANCE = 1e-4   # Sai số tuyệt đối tối đa khi ép float64 -> float32 (None = tắt)
+# Các cột giữ nguyên kiểu. SYMBOL/QUARTER được chuyển category: chỗ ghép chuỗi
+# phải ép kiểu trước (VD YEAR.astype(str) + QUARTER.astype(str))
+COMPACT_EXCLUDE_COLUMNS = []
+
+# ========== DATA REFRESH ==========
+# Khoảng thời gian tối thiểu giữa hai lần kiểm tra phiên bản dữ liệu
+# (generation/md5 trên GCS, mtime/size với file local). Chỉ tải lại khi dữ liệu đổi.
+DATA_REFRESH_CHECK_SECONDS = 300
+
+# ========== LOCAL PARQUET CACHE ==========
+# Bản sao trên đĩa của các blob GCS (theo generation), dùng khi khởi động lại
+# và khi mất kết nối GCS (utils/parquet_cache.py). None = tắt cache đĩa.
+PARQUET_CACHE_DIR = os.environ.get('AIFINANCE_CACHE_DIR', '~/.cache/aifinance/parquet')
+PARQUET_CACHE_MAX_BYTES = 2 * 1024 ** 3   # Vượt ngưỡng -> xóa file ít dùng gần đây nhất
+
+# ========== METRIC DICTIONARY ==========
+# Workbook ánh xạ chỉ tiêu và thư mục artifact đã biên dịch (components/metric_dictionary.py)
+MAP_FILE = "D:/aifinance_project/data/raw/Map_Complete.xlsx"
+METRIC_ARTIFACT_DIR = os.environ.get('AIFINANCE_METRIC_ARTIFACT_DIR', '~/.cache/aifinance/metrics')
+
+# ========== PARALLEL LOADING ==========
+DATASET_LOAD_WORKERS = 3                  # Số dataset được đọc/tải song song lúc khởi động
+DOWNLOAD_CHUNK_BYTES = 16 * 1024 ** 2     # Blob lớn hơn ngưỡng được tải theo nhiều đoạn (HTTP Range)
+DOWNLOAD_CHUNK_WORKERS = 8                # Số đoạn tải song song cho một blob (1 = tải một lần)
+
+# ========== SCORING ==========
+# Bảng ngưỡng cho điểm thanh khoản/sinh lời (utils/scoring.py):
+# cột -> (trọng số, toán tử, [(ngưỡng, điểm), ...] xét từ ngưỡng cao xuống).
+# Cột thiếu dữ liệu không được tính vào tổng trọng số.
+LIQUIDITY_SCORE_RULES = {
+    'CURRENT_RATIO_Q': (30, '>=', [(2, 30), (1.5, 20), (1, 10)]),
+    'QUICK_RATIO_Q': (25, '>=', [(1, 25), (0.8, 15), (0.5, 5)]),
+    'CASH_RATIO': (25, '>=', [(0.5, 25), (0.3, 15), (0.1, 5)]),   # CASH_PLUS_EQUIVALENTS / CURRENT_LIABILITIES
+    'WORKING_CAPITAL_AVG4Q': (20, '>', [(0, 20)]),
+}
+PROFITABILITY_SCORE_RULES = {
+    'ROAE': (30, '>=', [(20, 30), (15, 20), (10, 10)]),
+    'ROAA': (25, '>=', [(8, 25), (5, 15), (3, 5)]),
+    'NET_INCOME_MARGIN_12M': (25, '>=', [(15, 25), (10, 15), (5, 5)]),
+    'ROIC': (20, '>=', [(15, 20), (10, 10), (5, 5)]),
+}
+# Hệ số Altman Z-Score
+Z_SCORE_WEIGHTS = {'Z1': 1.2, 'Z2': 1.4, 'Z3': 3.3, 'Z4': 0.6, 'Z5': 1.0}
+
+# ========== COMPOSITE SCORES ==========
+# Điểm tổng hợp theo kỳ (utils/scoring.composite_scores), chuẩn hóa trong từng kỳ:
+#   universe: điều kiện lọc (cú pháp filter engine) các dòng được chấm điểm
+#   components: metric, weight, direction ('higher' cao tốt, 'lower' thấp tốt,
+#     'inverse' chấm theo 1/x với 0 và +inf thay bằng fill), normalize ('max'
+#     x/max, 'rank' percentile, 'zscore', 'winsor' cắt theo COMPOSITE_WINSOR_LIMITS rồi min-max)
+COMPOSITE_SCORES = {
+    'Banking_Score': {
+        'universe': {'CAL_GROUP': 'bank'},
+        'components': [
+            {'metric': 'NIM_12M', 'weight': 25, 'direction': 'higher', 'normalize': 'max'},
+            {'metric': 'NPL_Q', 'weight': 25, 'direction': 'lower', 'normalize': 'max'},
+            {'metric': 'CIR_12M', 'weight': 25, 'direction': 'lower', 'normalize': 'max'},
+            {'metric': 'ROAE', 'weight': 25, 'direction': 'higher', 'normalize': 'max'},
+        ],
+    },
+    'Securities_Score': {
+        'universe': {'CAL_GROUP': 'security'},
+        'components': [
+            {'metric': 'ROAE', 'weight': 30, 'direction': 'higher', 'normalize': 'max'},
+            {'metric': 'OPERATING_MARGIN_12M', 'weight': 30, 'direction': 'higher', 'normalize': 'max'},
+            {'metric': 'PE_EOQ', 'weight': 20, 'direction': 'inverse', 'fill': 50, 'normalize': 'max'},
+            {'metric': 'CURRENT_RATIO_Q', 'weight': 20, 'direction': 'higher', 'normalize': 'max'},
+        ],
+    },
+    # Điểm của Stock Screener (v2): chấm trên tập cổ phiếu đã lọc
+    'Score': {
+        'universe': {},
+        'components': [
+            {'metric': 'ROAE', 'weight': 25, 'direction': 'higher', 'normalize': 'max'},
+            {'metric': 'ROAA', 'weight': 25, 'direction': 'higher', 'normalize': 'max'},
+            {'metric': 'PE_EOQ', 'weight': 25, 'direction': 'inverse', 'fill': float('inf'), 'normalize': 'max'},
+            {'metric': 'Z_SCORE', 'weight': 25, 'direction': 'higher', 'normalize': 'max'},
+        ],
+    },
+}
+COMPOSITE_WINSOR_LIMITS = (0.05, 0.95)
+
+# ========== PERCENTILE RANKS ==========
+# Cột được xếp hạng percentile ngay khi dựng kho (DatasetStoreManager): badge
+# trang công ty và top N trang ngành (pages/v2.py). Cột khác xếp hạng lần đầu khi tra.
+PERCENTILE_RANK_COLUMNS = {
+    'ticker': ['ROAE', 'ROAA', 'PE_EOQ', 'PB_EOQ', 'MARKET_CAP_HT'],
+    'industry': ['MARKET_CAP_HT', 'ROAE', 'MARKET_CAP_HT_GYOY'],
+}
+
 # ========== DASHBOARD CONFIGURATION ==========
 APP_TITLE = "📊 Dashboard Phân Tích Chứng Khoán"
 APP_ICON = "📈"
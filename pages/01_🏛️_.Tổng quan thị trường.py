@@ -6,6 +6,7 @@ ROOT_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
 import config
+from utils.data_store import require_dataset_store
 from components.charts import *
 from components.kpi_cards import *
 from components.filters import *
@@ -14,12 +15,8 @@ from utils.formatters import *
 st.set_page_config(page_title="Tổng Quan Thị Trường", page_icon="🏛️", layout="wide")
 st.title("🏛️ Tổng Quan Thị Trường")
 
-if "market_df" not in st.session_state:
-    st.error("Vui lòng quay lại trang chủ để load dữ liệu!")
-    st.stop()
-
-market_df = st.session_state.market_df
-market_df["QUARTER"] =  market_df["QUARTER"]
+store = require_dataset_store()
+market_df = store.market_df
 
 # Filters
 st.sidebar.header("⚙️ Bộ lọc")
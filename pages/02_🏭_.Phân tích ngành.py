@@ -6,6 +6,7 @@ ROOT_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
 import config
+from utils.data_store import require_dataset_store
 from components.charts import *
 from components.tables import *
 from utils.formatters import *
@@ -14,16 +15,13 @@ import pandas as pd
 st.set_page_config(page_title="Phân Tích Ngành", page_icon="🏭", layout="wide")
 st.title("🏭 Phân Tích Ngành")
 
-if "industry_df" not in st.session_state:
-    st.error("Vui lòng quay lại trang chủ!")
-    st.stop()
-
-industry_df = st.session_state.industry_df
-ticker_df = st.session_state.ticker_df
+store = require_dataset_store()
+industry_df = store.industry_df
+ticker_df = store.ticker_df
 # Get latest data
-latest_year = industry_df["YEAR"].max()
-latest_quarter = industry_df[industry_df["YEAR"] == latest_year]["QUARTER"].max()
-latest = industry_df[(industry_df["YEAR"] == latest_year) & (industry_df["QUARTER"] == latest_quarter)]
+industry_periods = store.quarter_index("industry")
+latest_year, latest_quarter = industry_periods.latest_period()
+latest = industry_periods.get_period(latest_year, latest_quarter)
 
 # Filters
 st.sidebar.header("⚙️ Bộ lọc")
@@ -6,6 +6,7 @@ ROOT_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
 import config
+from utils.data_store import require_dataset_store
 from components.charts import *
 from components.kpi_cards import *
 from utils.formatters import *
@@ -14,11 +15,8 @@ from utils.metrics import *
 st.set_page_config(page_title="Phân Tích Cổ Phiếu", page_icon="📊", layout="wide")
 st.title("📊 Phân Tích Cổ Phiếu Chi Tiết")
 
-if "ticker_df" not in st.session_state:
-    st.error("Vui lòng quay lại trang chủ!")
-    st.stop()
-
-ticker_df = st.session_state.ticker_df
+store = require_dataset_store()
+ticker_df = store.ticker_df
 
 # Ticker selector
 st.sidebar.header("⚙️ Chọn Cổ Phiếu")
@@ -26,8 +24,8 @@ tickers = sorted(ticker_df["SYMBOL"].unique())
 selected_ticker = st.sidebar.selectbox("Mã cổ phiếu", tickers)
 
 if selected_ticker:
-    ticker_data = ticker_df[ticker_df["SYMBOL"] == selected_ticker].sort_values(["YEAR", "QUARTER"])
-    ticker_data["QUARTER_KEY"] = ticker_data["YEAR"].astype(str) + ticker_data["QUARTER"]
+    ticker_data = store.symbol_index("ticker").get(selected_ticker).sort_values("PERIOD_ID")
+    ticker_data["QUARTER_KEY"] = ticker_data["YEAR"].astype(str) + ticker_data["QUARTER"].astype(str)
     
     if len(ticker_data) > 0:
         latest = ticker_data.iloc[-1]
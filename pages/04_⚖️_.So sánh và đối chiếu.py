@@ -6,22 +6,19 @@ ROOT_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
 import config
+from utils.data_store import require_dataset_store
 from components.charts import *
 from components.tables import *
 
 st.set_page_config(page_title="So Sánh", page_icon="⚖️", layout="wide")
 st.title("⚖️ So Sánh & Đối Chiếu")
 
-if "ticker_df" not in st.session_state:
-    st.error("Vui lòng quay lại trang chủ!")
-    st.stop()
+store = require_dataset_store()
+ticker_df = store.ticker_df
 
-ticker_df = st.session_state.ticker_df
-
-# Get latest data
-latest_year = ticker_df["YEAR"].max()
-latest_quarter = ticker_df[ticker_df["YEAR"] == latest_year]["QUARTER"].max()
-latest = ticker_df[(ticker_df["YEAR"] == latest_year) & (ticker_df["QUARTER"] == latest_quarter)]
+# Get latest period
+ticker_periods = store.quarter_index("ticker")
+latest_year, latest_quarter = ticker_periods.latest_period()
 
 # Ticker selector
 st.sidebar.header("⚙️ Chọn Cổ Phiếu So Sánh")
@@ -29,7 +26,10 @@ tickers = sorted(ticker_df["SYMBOL"].unique())
 selected = st.sidebar.multiselect("Chọn 2-10 mã", tickers, default=tickers[:3] if len(tickers) >= 3 else tickers, max_selections=10)
 
 if len(selected) >= 2:
-    compare_data = latest[latest["SYMBOL"].isin(selected)]
+    compare_rows = store.symbol_index("ticker").get_many(selected)
+    compare_data = compare_rows[
+        (compare_rows["YEAR"] == latest_year) & (compare_rows["QUARTER"] == latest_quarter)
+    ]
     
     # Comparison table
     st.header("📊 Bảng So Sánh")
@@ -6,21 +6,19 @@ ROOT_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
 import config
-from utils.metrics import screen_stocks
+from utils.data_store import require_dataset_store
+from utils.metrics import screen_history, screen_stocks
 
 st.set_page_config(page_title="Sàng Lọc", page_icon="🔍", layout="wide")
 st.title("🔍 Sàng Lọc & Tìm Kiếm")
 
-if "ticker_df" not in st.session_state:
-    st.error("Vui lòng quay lại trang chủ!")
-    st.stop()
-
-ticker_df = st.session_state.ticker_df
+store = require_dataset_store()
+ticker_df = store.ticker_df
 
 # Get latest data
-latest_year = ticker_df["YEAR"].max()
-latest_quarter = ticker_df[ticker_df["YEAR"] == latest_year]["QUARTER"].max()
-latest = ticker_df[(ticker_df["YEAR"] == latest_year) & (ticker_df["QUARTER"] == latest_quarter)]
+ticker_periods = store.quarter_index("ticker")
+latest_year, latest_quarter = ticker_periods.latest_period()
+latest = ticker_periods.get_period(latest_year, latest_quarter)
 
 # Sidebar filters
 st.sidebar.header("⚙️ Tiêu Chí Lọc")
@@ -52,7 +50,8 @@ else:
 st.header("📊 Kết Quả Lọc")
 
 if criteria:
-    result = screen_stocks(latest, criteria)
+    # Lọc trên frame đầy đủ của kho: dùng ScreeningIndex của kỳ gần nhất
+    result = screen_stocks(ticker_df, criteria, period=(latest_year, latest_quarter))
     
     st.info(f"Tìm thấy **{len(result)}** cổ phiếu thỏa mãn tiêu chí")
     
@@ -69,3 +68,31 @@ if criteria:
         st.warning("Không tìm thấy cổ phiếu nào!")
 else:
     st.info("Chọn tiêu chí lọc từ sidebar")
+
+# Historical screening
+st.header("📈 Sàng Lọc Lịch Sử")
+
+if criteria:
+    col1, col2 = st.columns(2)
+    with col1:
+        last_n = st.slider("Số quý gần nhất (M)", 2, 40, 8)
+    with col2:
+        mode = st.radio("Điều kiện", ["Đạt N / M quý", "N quý liên tiếp"], horizontal=True)
+    min_required = st.slider("Số quý đạt tối thiểu (N)", 1, last_n, last_n)
+
+    if mode == "Đạt N / M quý":
+        history = screen_history(ticker_df, criteria, last_n=last_n, min_passes=min_required)
+    else:
+        history = screen_history(ticker_df, criteria, last_n=last_n, min_streak=min_required)
+
+    st.info(f"Tìm thấy **{len(history)}** cổ phiếu thỏa mãn tiêu chí trong {last_n} quý gần nhất")
+
+    if len(history) > 0:
+        history = history.reset_index().rename(columns={
+            "SYMBOL": "Mã", "PERIODS": "Số quý có dữ liệu", "PASS_COUNT": "Số quý đạt",
+            "PASS_RATIO": "Tỷ lệ đạt", "CURRENT_STREAK": "Chuỗi hiện tại", "MAX_STREAK": "Chuỗi dài nhất",
+            "FIRST_PASS": "Đạt lần đầu", "LAST_PASS": "Đạt gần nhất",
+        })
+        st.dataframe(history, use_container_width=True, hide_index=True)
+else:
+    st.info("Chọn tiêu chí lọc từ sidebar")
@@ -6,20 +6,17 @@ ROOT_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
 import config
+from utils.data_store import require_dataset_store
 
 st.set_page_config(page_title="Danh Mục", page_icon="⭐", layout="wide")
 st.title("⭐ Danh Mục Theo Dõi")
 
-if "ticker_df" not in st.session_state:
-    st.error("Vui lòng quay lại trang chủ!")
-    st.stop()
+store = require_dataset_store()
+ticker_df = store.ticker_df
 
-ticker_df = st.session_state.ticker_df
-
-# Get latest data
-latest_year = ticker_df["YEAR"].max()
-latest_quarter = ticker_df[ticker_df["YEAR"] == latest_year]["QUARTER"].max()
-latest = ticker_df[(ticker_df["YEAR"] == latest_year) & (ticker_df["QUARTER"] == latest_quarter)]
+# Get latest period
+ticker_periods = store.quarter_index("ticker")
+latest_year, latest_quarter = ticker_periods.latest_period()
 
 # Initialize watchlist in session state
 if "watchlist" not in st.session_state:
@@ -39,7 +36,10 @@ if selected and selected not in st.session_state.watchlist:
 st.header("📋 Danh Mục Của Tôi")
 
 if st.session_state.watchlist:
-    watchlist_data = latest[latest["SYMBOL"].isin(st.session_state.watchlist)]
+    watchlist_rows = store.symbol_index("ticker").get_many(st.session_state.watchlist)
+    watchlist_data = watchlist_rows[
+        (watchlist_rows["YEAR"] == latest_year) & (watchlist_rows["QUARTER"] == latest_quarter)
+    ]
     
     display_cols = ["SYMBOL", "CLOSE_PRICE", "MARKET_CAP_EOQ", "PE_EOQ", "PB_EOQ", "ROAE", "ROAA", "DIVIDEND_YIELD_EOQ"]
     display_cols = [c for c in display_cols if c in watchlist_data.columns]
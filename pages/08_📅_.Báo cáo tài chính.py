@@ -19,14 +19,16 @@ sys.path.insert(0, str(ROOT_DIR))
 try:
     from components.financial_report_display import (
         display_financial_report,
-        FINANCIAL_METRICS,
+        get_financial_metrics,
         detect_cal_group,
         get_available_metrics,
         get_metrics_for_report_type,
         create_export_buttons,
-        prepare_financial_data,
+        create_bundle_export_button,
         get_streamlit_css
     )
+    from utils.data_store import require_dataset_store
+    from utils.data_index import get_symbol_rows
     # from components.financial_report_style_config import get_streamlit_css
 except ImportError as e:
     st.error(f'⚠️ Lỗi import module: {str(e)}')
@@ -53,13 +55,10 @@ st.markdown(get_streamlit_css(), unsafe_allow_html=True)
 # DATA CHECK
 # ============================================
 
-if "industry_df" not in st.session_state:
-    st.error("❌ Vui lòng quay lại trang chủ để load dữ liệu!")
-    st.stop()
-
-industry_df = st.session_state.industry_df
-ticker_df = st.session_state.ticker_df
-market_df = st.session_state.market_df
+store = require_dataset_store()
+industry_df = store.industry_df
+ticker_df = store.ticker_df
+market_df = store.market_df
 
 # Initialize session state
 if 'data_type' not in st.session_state:
@@ -181,7 +180,7 @@ if not selected_symbol:
 
 # Metrics summary
 cal_group = detect_cal_group(df, selected_symbol)
-num_quarters = len(df[df['SYMBOL'] == selected_symbol])
+num_quarters = len(get_symbol_rows(df, selected_symbol))
 
 cal_group_names = {
     'company': '🏢 Công ty',
@@ -206,68 +205,38 @@ st.divider()
 # TABS
 # ============================================
 
-tab1, tab2, tab3, tab4 = st.tabs([
-    '📈 Kết quả Kinh doanh',
-    '💰 Cân đối Kế toán',
-    '💵 Lưu chuyển Tiền tệ',
-    '📊 Chỉ số Phân tích'
-])
+# Chỉ render báo cáo đang chọn: st.tabs chạy cả 4 thân tab ở mỗi lần rerun.
+# Bốn báo cáo được dựng trong một lần cắt dòng (build_statement_bundle, cache theo mã)
+report_tabs = {
+    'IS': '📈 Kết quả Kinh doanh',
+    'BS': '💰 Cân đối Kế toán',
+    'CF': '💵 Lưu chuyển Tiền tệ',
+    'ratio': '📊 Chỉ số Phân tích'
+}
 
-with tab1:
+if st.session_state.get('report_type') not in report_tabs:
     st.session_state.report_type = 'IS'
-    try:
-        display_financial_report(df, selected_symbol, 'IS', selected_metrics)
-
-        # Thêm nút export
-        st.markdown('---')
-        st.subheader('📥 Export dữ liệu')
-        df_export, _, _ = prepare_financial_data(df, selected_symbol, 'IS', selected_metrics)
-        if not df_export.empty:
-            create_export_buttons(df_export, selected_symbol, 'IS')
-    except Exception as e:
-        st.error(f'❌ Lỗi: {str(e)}')
-
-with tab2:
-    st.session_state.report_type = 'BS'
-    try:
-        display_financial_report(df, selected_symbol, 'BS', selected_metrics)
-
-        # Thêm nút export
-        st.markdown('---')
-        st.subheader('📥 Export dữ liệu')
-        df_export, _, _ = prepare_financial_data(df, selected_symbol, 'BS', selected_metrics)
-        if not df_export.empty:
-            create_export_buttons(df_export, selected_symbol, 'BS')
-    except Exception as e:
-        st.error(f'❌ Lỗi: {str(e)}')
-
-with tab3:
-    st.session_state.report_type = 'CF'
-    try:
-        display_financial_report(df, selected_symbol, 'CF', selected_metrics)
-
-        # Thêm nút export
-        st.markdown('---')
-        st.subheader('📥 Export dữ liệu')
-        df_export, _, _ = prepare_financial_data(df, selected_symbol, 'CF', selected_metrics)
-        if not df_export.empty:
-            create_export_buttons(df_export, selected_symbol, 'CF')
-    except Exception as e:
-        st.error(f'❌ Lỗi: {str(e)}')
-
-with tab4:
-    st.session_state.report_type = 'ratio'
-    try:
-        display_financial_report(df, selected_symbol, 'ratio', selected_metrics)
-        
-        # Thêm nút export
-        st.markdown('---')
-        st.subheader('📥 Export dữ liệu')
-        df_export, _, _ = prepare_financial_data(df, selected_symbol, 'ratio', selected_metrics)
-        if not df_export.empty:
-            create_export_buttons(df_export, selected_symbol, 'ratio')
-    except Exception as e:
-        st.error(f'❌ Lỗi: {str(e)}')
+
+report_type = st.radio(
+    'Loại báo cáo',
+    list(report_tabs.keys()),
+    format_func=report_tabs.get,
+    horizontal=True,
+    key='report_type',
+    label_visibility='collapsed'
+)
+
+try:
+    statement = display_financial_report(df, selected_symbol, report_type, selected_metrics)
+
+    # Thêm nút export: dùng lại frame của báo cáo vừa hiển thị
+    st.markdown('---')
+    st.subheader('📥 Export dữ liệu')
+    if not statement.empty:
+        create_export_buttons(statement.to_frame(), selected_symbol, report_type, store.version)
+        create_bundle_export_button(df, selected_symbol, selected_metrics, store.version)
+except Exception as e:
+    st.error(f'❌ Lỗi: {str(e)}')
 
 # ============================================
 # FOOTER - QUICK INSIGHTS
@@ -303,7 +272,7 @@ with st.expander('💡 Thông tin & Phân tích nhanh'):
         st.markdown('#### 📈 Phân tích nhanh')
         
         try:
-            df_symbol = df[df['SYMBOL'] == selected_symbol].copy()
+            df_symbol = get_symbol_rows(df, selected_symbol)
             
             if len(df_symbol) >= 2:
                 latest = df_symbol.iloc[-1]
@@ -5,6 +5,15 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from utils.data_store import get_dataset_store, attach_session
+from utils.scoring import composite_scores
+from utils.metrics import metric_percentiles
 
 # Cấu hình trang
 st.set_page_config(
@@ -77,14 +86,12 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Cache data loading
-@st.cache_data
+# Data loading - dùng chung kho dữ liệu của process (mặc định đọc file local)
 def load_data():
     """Load all data files"""
-    industry_df = pd.read_parquet(r'D:/aifinance_project/data/output/industry_analysis.parquet')
-    market_df = pd.read_parquet(r'D:/aifinance_project/data/output/market_analysis.parquet')
-    ticker_df = pd.read_parquet(r'D:/aifinance_project/data/output/ticker_analysis.parquet')
-    return industry_df, market_df, ticker_df
+    store = get_dataset_store(st.session_state.get('data_source', 'local'))
+    attach_session(store)
+    return store
 
 def get_company_type_badge(cal_group):
     """Return HTML badge for company type"""
@@ -122,7 +129,11 @@ def create_gauge_chart(value, title, min_val=0, max_val=100, thresholds=[30, 70]
 
 # Load data
 try:
-    industry_df, market_df, ticker_df = load_data()
+    store = load_data()
+    industry_df, market_df, ticker_df = store.industry_df, store.market_df, store.ticker_df
+    ticker_periods = store.quarter_index('ticker')
+    # Điểm tổng hợp của mọi kỳ (tính một lần mỗi phiên bản dữ liệu), cùng index với ticker_df
+    ticker_scores = store.scores('ticker')
     
     # Tiêu đề chính
     st.markdown('<h1 class="main-header">📈 DASHBOARD PHÂN TÍCH CỔ PHIẾU V2.0</h1>', unsafe_allow_html=True)
@@ -135,30 +146,27 @@ try:
         st.header("🎯 Bộ Lọc & Cài Đặt")
         
         # Chọn ngành và quý
-        years = sorted(ticker_df['YEAR'].unique(), reverse=True)
+        years = ticker_periods.years()
         selected_year = st.selectbox("📅 Năm", years, key='year_filter')
         
-        quarters_in_year = sorted(ticker_df[ticker_df['YEAR'] == selected_year]['QUARTER'].unique(), reverse=True)
+        quarters_in_year = ticker_periods.quarters_in_year(selected_year)
         selected_quarter = st.selectbox("📊 Quý", quarters_in_year, key='quarter_filter')
         
         st.markdown("---")
         
         # Thống kê nhanh
-        current_data = ticker_df[
-            (ticker_df['YEAR'] == selected_year) & 
-            (ticker_df['QUARTER'] == selected_quarter)
-        ]
+        current_tickers = ticker_periods.get_period(selected_year, selected_quarter)
         
         st.subheader("📊 Thống Kê Nhanh")
         
-        if not current_data.empty:
+        if not current_tickers.empty:
             # Đếm theo loại hình
-            cal_group_counts = current_data['CAL_GROUP'].value_counts()
+            cal_group_counts = current_tickers['CAL_GROUP'].value_counts()
             
             st.metric("🏢 Doanh nghiệp", f"{cal_group_counts.get('company', 0):,}")
             st.metric("🏦 Ngân hàng", f"{cal_group_counts.get('bank', 0):,}")
             st.metric("📊 Chứng khoán", f"{cal_group_counts.get('security', 0):,}")
-            st.metric("📈 Tổng cộng", f"{len(current_data):,}")
+            st.metric("📈 Tổng cộng", f"{len(current_tickers):,}")
         
         st.markdown("---")
         
@@ -183,10 +191,7 @@ try:
     with tab1:
         st.header("🏠 Tổng Quan Thị Trường & Phân Bổ")
         
-        current_market = market_df[
-            (market_df['YEAR'] == selected_year) & 
-            (market_df['QUARTER'] == selected_quarter)
-        ]
+        current_market = store.quarter_index('market').get_period(selected_year, selected_quarter)
         
         if not current_market.empty:
             market_data = current_market.iloc[0]
@@ -226,11 +231,6 @@ try:
             # Row 2: Phân bổ theo loại hình
             st.subheader("🎯 Phân Bổ Thị Trường Theo Loại Hình")
             
-            current_tickers = ticker_df[
-                (ticker_df['YEAR'] == selected_year) & 
-                (ticker_df['QUARTER'] == selected_quarter)
-            ]
-            
             col1, col2, col3 = st.columns(3)
             
             with col1:
@@ -250,7 +250,7 @@ try:
             
             with col2:
                 # Pie chart - Vốn hóa
-                market_cap_by_type = current_tickers.groupby('CAL_GROUP')['MARKET_CAP_HT'].sum()
+                market_cap_by_type = current_tickers.groupby('CAL_GROUP', observed=True)['MARKET_CAP_HT'].sum()
                 
                 fig = px.pie(
                     values=market_cap_by_type.values,
@@ -265,7 +265,7 @@ try:
             
             with col3:
                 # Bar chart - ROE trung bình theo loại
-                roe_by_type = current_tickers.groupby('CAL_GROUP')['ROAE'].mean() * 100
+                roe_by_type = current_tickers.groupby('CAL_GROUP', observed=True)['ROAE'].mean() * 100
                 
                 fig = go.Figure(data=[
                     go.Bar(
@@ -290,7 +290,7 @@ try:
             # Row 3: Xu hướng thị trường
             st.subheader("📈 Xu Hướng Thị Trường (3 năm gần nhất)")
             
-            market_trend = market_df[market_df['YEAR'] >= selected_year - 2].sort_values(['YEAR', 'QUARTER'])
+            market_trend = market_df[market_df['YEAR'] >= selected_year - 2].sort_values('PERIOD_ID')
             
             if not market_trend.empty:
                 col1, col2 = st.columns(2)
@@ -429,10 +429,9 @@ try:
     with tab2:
         st.header("🏭 Phân Tích Toàn Diện Theo Ngành")
         
-        current_industries = industry_df[
-            (industry_df['YEAR'] == selected_year) & 
-            (industry_df['QUARTER'] == selected_quarter)
-        ].copy()
+        current_industries = store.quarter_index('industry').get_period(selected_year, selected_quarter)
+        # Xếp hạng theo kỳ tính sẵn: top N là phép tra thứ hạng thay cho nlargest
+        industry_ranks = store.percentile_ranks('industry')
         
         if not current_industries.empty:
             # Overview metrics
@@ -463,7 +462,7 @@ try:
             ])
             
             with tab2_1:
-                top_cap = current_industries.nlargest(15, 'MARKET_CAP_HT')
+                top_cap = industry_ranks.top('MARKET_CAP_HT', 15, selected_year, selected_quarter)
                 
                 fig = px.bar(
                     top_cap,
@@ -481,7 +480,8 @@ try:
                 st.plotly_chart(fig, use_container_width=True)
             
             with tab2_2:
-                top_roe = current_industries[current_industries['ROAE'] > 0].nlargest(15, 'ROAE')
+                top_roe = industry_ranks.top('ROAE', 15, selected_year, selected_quarter)
+                top_roe = top_roe[top_roe['ROAE'] > 0]
                 
                 fig = px.bar(
                     top_roe,
@@ -515,8 +515,8 @@ try:
                 st.plotly_chart(fig, use_container_width=True)
             
             with tab2_4:
-                growth_industries = current_industries[current_industries['MARKET_CAP_HT_GYOY'].notna()]
-                top_growth = growth_industries.nlargest(15, 'MARKET_CAP_HT_GYOY')
+                top_growth = industry_ranks.top('MARKET_CAP_HT_GYOY', 15, selected_year, selected_quarter)
+                top_growth = top_growth[top_growth['MARKET_CAP_HT_GYOY'].notna()]
                 
                 fig = px.bar(
                     top_growth,
@@ -608,7 +608,7 @@ try:
             st.subheader("🌡️ Bản Đồ Nhiệt So Sánh Ngành")
             
             # Select top industries by market cap for heatmap
-            top_industries = current_industries.nlargest(20, 'MARKET_CAP_HT')
+            top_industries = industry_ranks.top('MARKET_CAP_HT', 20, selected_year, selected_quarter)
             
             # Select metrics for heatmap
             heatmap_metrics = ['PE_EOQ', 'PB_EOQ', 'ROAE', 'ROAA', 'ROIC',
@@ -680,9 +680,8 @@ try:
         
         if selected_ticker:
             # Get data for selected ticker
-            ticker_data = ticker_df[ticker_df['SYMBOL'] == selected_ticker].sort_values(
-                ['YEAR', 'QUARTER'], ascending=False
-            )
+            symbol_rows = store.symbol_index('ticker').get(selected_ticker).dropna(subset=['LEVEL2_NAME_EN'])
+            ticker_data = symbol_rows.sort_values('PERIOD_ID', ascending=False)
             
             if not ticker_data.empty:
                 current_data = ticker_data.iloc[0]
@@ -727,9 +726,30 @@ try:
                 with col5:
                     outs_shares = current_data.get('OUTS_SHARES', 0) / 1e6
                     st.metric("CP lưu hành (M)", f"{outs_shares:.1f}")
-                
+
+                # Percentile badges: vị thế so với thị trường và trong ngành (tra bảng tính sẵn)
+                percentile_metrics = {'ROAE': 'ROE', 'ROAA': 'ROA', 'PE_EOQ': 'P/E', 'PB_EOQ': 'P/B',
+                                      'MARKET_CAP_HT': 'Vốn hóa'}
+                positions = metric_percentiles(
+                    store.ticker_df, selected_ticker, list(percentile_metrics),
+                    (current_data['YEAR'], current_data['QUARTER'])
+                )
+                if not positions.empty:
+                    badge_cols = st.columns(len(positions))
+                    for badge_col, (metric, position) in zip(badge_cols, positions.iterrows()):
+                        with badge_col:
+                            if position['RANK_MARKET'] == 0:
+                                st.caption(f"**{percentile_metrics[metric]}**: N/A")
+                                continue
+                            badge = (f"**{percentile_metrics[metric]}**: P{position['PERCENTILE_MARKET']:.0f} thị trường "
+                                     f"(#{position['RANK_MARKET']:.0f}/{position['COUNT_MARKET']:.0f})")
+                            if position.get('RANK_INDUSTRY', 0) > 0:
+                                badge += (f" · P{position['PERCENTILE_INDUSTRY']:.0f} ngành "
+                                          f"(#{position['RANK_INDUSTRY']:.0f}/{position['COUNT_INDUSTRY']:.0f})")
+                            st.caption(badge)
+
                 st.markdown("---")
-                
+
                 # Dynamic tabs based on company type
                 if cal_group == 'bank':
                     # TABS FOR BANK
@@ -1146,10 +1166,9 @@ try:
                     st.subheader("📉 Xu Hướng Theo Thời Gian")
                     
                     # Get historical data (last 3 years)
-                    historical = ticker_df[
-                        (ticker_df['SYMBOL'] == selected_ticker) &
-                        (ticker_df['YEAR'] >= selected_year - 2)
-                    ].sort_values(['YEAR', 'QUARTER'])
+                    historical = symbol_rows[
+                        symbol_rows['YEAR'] >= selected_year - 2
+                    ].sort_values('PERIOD_ID')
                     
                     if len(historical) > 1:
                         # Revenue & Profit
@@ -1584,13 +1603,8 @@ try:
             # Ranking table
             st.subheader("📋 Bảng Xếp Hạng Ngân Hàng")
             
-            # Calculate composite score
-            banks_data['Banking_Score'] = (
-                (banks_data['NIM_12M'] / banks_data['NIM_12M'].max() * 25) +
-                ((1 - banks_data['NPL_Q'] / banks_data['NPL_Q'].max()) * 25) +
-                ((1 - banks_data['CIR_12M'] / banks_data['CIR_12M'].max()) * 25) +
-                (banks_data['ROAE'] / banks_data['ROAE'].max() * 25)
-            )
+            # Calculate composite score (tính sẵn theo kỳ, config.COMPOSITE_SCORES)
+            banks_data['Banking_Score'] = ticker_scores['Banking_Score']
             
             banks_ranked = banks_data.nlargest(20, 'Banking_Score')[
                 ['SYMBOL', 'NIM_12M', 'NPL_Q', 'CIR_12M', 'LDR_12M', 'CASA_12M', 
@@ -1620,7 +1634,7 @@ try:
             
             st.dataframe(
                 banks_ranked.style.format({
-                    col: '{:.2f}' for col in banks_ranked.select_dtypes(include=['float64']).columns
+                    col: '{:.2f}' for col in banks_ranked.select_dtypes(include=['float']).columns
                 }).background_gradient(subset=['Điểm'], cmap='RdYlGn'),
                 use_container_width=True,
                 height=600
@@ -1832,13 +1846,8 @@ try:
             with tab5_3:
                 st.write("**Bảng Xếp Hạng Công Ty Chứng Khoán**")
                 
-                # Calculate composite score
-                securities_data['Securities_Score'] = (
-                    (securities_data['ROAE'] / securities_data['ROAE'].max() * 30) +
-                    (securities_data['OPERATING_MARGIN_12M'] / securities_data['OPERATING_MARGIN_12M'].max() * 30) +
-                    ((1 / securities_data['PE_EOQ'].replace([0, np.inf], 50)) / (1 / securities_data['PE_EOQ'].replace([0, np.inf], 50)).max() * 20) +
-                    (securities_data['CURRENT_RATIO_Q'] / securities_data['CURRENT_RATIO_Q'].max() * 20)
-                )
+                # Calculate composite score (tính sẵn theo kỳ, config.COMPOSITE_SCORES)
+                securities_data['Securities_Score'] = ticker_scores['Securities_Score']
                 
                 securities_ranked = securities_data.nlargest(20, 'Securities_Score')[
                     ['SYMBOL', 'BROKERAGE_COMPONENT', 'MARGIN_COMPONENT', 'PROPRIETARY_TRADING_COMPONENT',
@@ -1866,7 +1875,7 @@ try:
                 
                 st.dataframe(
                     securities_ranked.style.format({
-                        col: '{:.2f}' for col in securities_ranked.select_dtypes(include=['float64']).columns
+                        col: '{:.2f}' for col in securities_ranked.select_dtypes(include=['float']).columns
                     }).background_gradient(subset=['Điểm'], cmap='RdYlGn'),
                     use_container_width=True,
                     height=600
@@ -2006,12 +2015,8 @@ try:
                     st.success(f"✅ Tìm thấy {len(filtered)} cổ phiếu phù hợp!")
                     
                     # Calculate composite score
-                    filtered['Score'] = (
-                        (filtered['ROAE'] / filtered['ROAE'].max() * 25) +
-                        (filtered['ROAA'] / filtered['ROAA'].max() * 25) +
-                        ((1 / filtered['PE_EOQ'].replace(0, np.inf)) / (1 / filtered['PE_EOQ'].replace(0, np.inf)).max() * 25) +
-                        (filtered['Z_SCORE'] / filtered['Z_SCORE'].max() * 25)
-                    )
+                    # Chuẩn hóa trên tập đã lọc (config.COMPOSITE_SCORES['Score'])
+                    filtered['Score'] = composite_scores(filtered, ['Score'])['Score']
                     
                     filtered = filtered.sort_values('Score', ascending=False)
                     
@@ -2113,7 +2118,7 @@ try:
                     
                     st.dataframe(
                         result_df.style.format({
-                            col: '{:.2f}' for col in result_df.select_dtypes(include=['float64']).columns
+                            col: '{:.2f}' for col in result_df.select_dtypes(include=['float']).columns
                         }).background_gradient(subset=['Điểm'], cmap='RdYlGn'),
                         use_container_width=True,
                         height=600
@@ -0,0 +1,85 @@
+"""
+Fake GCS client cho test: giữ các blob trong memory
+
+Chỉ cài phần API mà utils/data_loader dùng: client.bucket(name),
+bucket.get_blob(name), bucket.blob(name, generation=None), blob.reload(),
+blob.download_as_bytes(start=None, end=None) với end inclusive như GCS.
+"""
+
+import hashlib
+
+
+class FakeGCSClient:
+    """Client giả: {(bucket, blob): [nội dung theo generation]}"""
+
+    def __init__(self):
+        self.objects = {}
+        self.offline = False
+        self.metadata_requests = 0
+        self.downloads = 0
+
+    def upload(self, bucket_name, blob_name, content):
+        """Ghi đè blob (generation mới), trả về generation"""
+        versions = self.objects.setdefault((bucket_name, blob_name), [])
+        versions.append(bytes(content))
+        return len(versions)
+
+    def bucket(self, bucket_name):
+        return FakeBucket(self, bucket_name)
+
+    def _check_online(self):
+        if self.offline:
+            raise ConnectionError("Fake GCS đang offline")
+
+
+class FakeBucket:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def get_blob(self, blob_name):
+        self.client._check_online()
+        self.client.metadata_requests += 1
+        versions = self.client.objects.get((self.name, blob_name))
+        if not versions:
+            return None
+        blob = FakeBlob(self, blob_name, len(versions))
+        blob.reload()
+        return blob
+
+    def blob(self, blob_name, generation=None):
+        return FakeBlob(self, blob_name, generation)
+
+    def list_blobs(self, prefix=''):
+        self.client._check_online()
+        return [FakeBlob(self, name, None) for (bucket, name) in self.client.objects
+                if bucket == self.name and name.startswith(prefix)]
+
+
+class FakeBlob:
+    def __init__(self, bucket, name, generation):
+        self.bucket = bucket
+        self.name = name
+        self.generation = generation
+        self.size = None
+        self.md5_hash = None
+
+    def _content(self):
+        self.bucket.client._check_online()
+        versions = self.bucket.client.objects.get((self.bucket.name, self.name))
+        if not versions:
+            raise FileNotFoundError(self.name)
+        generation = self.generation or len(versions)
+        return versions[generation - 1], generation
+
+    def reload(self):
+        content, self.generation = self._content()
+        self.size = len(content)
+        self.md5_hash = hashlib.md5(content).hexdigest()
+
+    def download_as_bytes(self, start=None, end=None):
+        content, _ = self._content()
+        self.bucket.client.downloads += 1
+        start = start or 0
+        end = len(content) - 1 if end is None else end
+        return content[start:end + 1]
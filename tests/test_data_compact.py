@@ -0,0 +1,85 @@
+"""
+Frame đã thu gọn (compact_frame: SYMBOL/QUARTER category, float32) cho cùng kết quả qua các chỉ mục của kho
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_compact import compact_frame
+from utils.data_index import get_symbol_rows, sort_by_period
+from utils.data_store import DatasetStore
+from utils.metrics import metric_percentiles, screen_history, screen_stocks
+from utils.scoring import composite_scores
+
+PERIODS = [(2023, 'Q3'), (2023, 'Q4'), (2024, 'Q1'), (2024, 'Q2')]
+
+
+def _ticker(symbols=60, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = [(f'S{i:03d}', year, quarter) for year, quarter in PERIODS for i in range(symbols)]
+    df = pd.DataFrame(rows, columns=['SYMBOL', 'YEAR', 'QUARTER'])
+    # Bỏ một số dòng: mã thiếu ở vài kỳ
+    df = df.drop(df.sample(frac=0.1, random_state=seed).index)
+    n = len(df)
+    df['CAL_GROUP'] = rng.choice(['bank', 'security', 'corporate'], size=n)
+    df['LEVEL2_NAME_EN'] = rng.choice(['Banks', 'Real Estate', 'Retail'], size=n)
+    for column in ['ROAE', 'ROAA', 'PE_EOQ', 'NIM_12M', 'NPL_Q', 'CIR_12M']:
+        values = np.round(rng.normal(10, 5, size=n), 2)
+        values[rng.random(n) < 0.1] = np.nan
+        df[column] = values
+    return sort_by_period(df.reset_index(drop=True))
+
+
+@pytest.fixture(scope='module')
+def stores():
+    plain = _ticker()
+    compacted, report = compact_frame(plain)
+    assert {'SYMBOL', 'QUARTER'} <= set(report['category_columns'])
+    assert isinstance(compacted['SYMBOL'].dtype, pd.CategoricalDtype)
+    return (DatasetStore({'ticker': plain}, 'local', version='plain'),
+            DatasetStore({'ticker': compacted}, 'local', version='compact'))
+
+
+def _assert_same(left, right):
+    pd.testing.assert_frame_equal(left, right, check_dtype=False, check_categorical=False,
+                                  check_index_type=False, atol=1e-4)
+
+
+def test_period_and_symbol_indexes(stores):
+    plain, compacted = stores
+    assert plain.quarter_index('ticker').latest_period() == compacted.quarter_index('ticker').latest_period()
+    for year, quarter in PERIODS:
+        _assert_same(plain.quarter_index('ticker').get_period(year, quarter),
+                     compacted.quarter_index('ticker').get_period(year, quarter))
+    for symbol in ['S000', 'S017', 'S059']:
+        _assert_same(get_symbol_rows(plain.ticker_df, symbol), get_symbol_rows(compacted.ticker_df, symbol))
+    _assert_same(plain.latest_snapshot('ticker').snapshot, compacted.latest_snapshot('ticker').snapshot)
+    _assert_same(plain.latest_snapshot('ticker').get_many(['S001', 'S030']),
+                 compacted.latest_snapshot('ticker').get_many(['S001', 'S030']))
+
+
+@pytest.mark.parametrize('criteria', [{'ROAE': (10, None)}, {'ROAE': (5, 15), 'PE_EOQ': (None, 12)}])
+def test_screening(stores, criteria):
+    plain, compacted = stores
+    for period in ['latest', (2023, 'Q4')]:
+        _assert_same(screen_stocks(plain.ticker_df, criteria, period=period),
+                     screen_stocks(compacted.ticker_df, criteria, period=period))
+    _assert_same(screen_history(plain.ticker_df, criteria, last_n=3),
+                 screen_history(compacted.ticker_df, criteria, last_n=3))
+
+
+def test_ranks_and_scores(stores):
+    plain, compacted = stores
+    for symbol in ['S003', 'S042']:
+        _assert_same(metric_percentiles(plain.ticker_df, symbol, ['ROAE', 'PE_EOQ']),
+                     metric_percentiles(compacted.ticker_df, symbol, ['ROAE', 'PE_EOQ']))
+    _assert_same(plain.percentile_ranks('ticker').top('ROAE', 10, industry='Banks'),
+                 compacted.percentile_ranks('ticker').top('ROAE', 10, industry='Banks'))
+    _assert_same(composite_scores(plain.ticker_df), composite_scores(compacted.ticker_df))
+
+
+def test_quarter_key_concatenation(stores):
+    plain, compacted = stores
+    keys = [store.ticker_df['YEAR'].astype(str) + store.ticker_df['QUARTER'].astype(str) for store in stores]
+    assert keys[0].tolist() == keys[1].tolist()
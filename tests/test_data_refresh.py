@@ -0,0 +1,154 @@
+"""
+Làm mới dữ liệu theo token GCS (DatasetStoreManager + utils.data_loader) trên fake GCS client
+"""
+
+import io
+
+import pandas as pd
+import pytest
+
+import config
+from utils import data_loader, parquet_cache
+from utils.data_store import DatasetStoreManager
+from tests.fake_gcs import FakeGCSClient
+
+
+def _parquet_bytes(df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _dataset(value, symbols=('AAA', 'BBB')):
+    return pd.DataFrame({
+        'SYMBOL': [s for s in symbols for _ in range(2)],
+        'YEAR': [2024] * 2 * len(symbols),
+        'QUARTER': ['Q1', 'Q2'] * len(symbols),
+        'VALUE': [float(value)] * 2 * len(symbols),
+    })
+
+
+@pytest.fixture
+def fake_gcs(tmp_path, monkeypatch):
+    """Fake client có đủ ba dataset, cache đĩa trong thư mục tạm"""
+    monkeypatch.setattr(config, 'PARQUET_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(parquet_cache, '_cache', None)
+    # Đoạn nhỏ để đi qua đường tải song song theo Range
+    monkeypatch.setattr(config, 'DOWNLOAD_CHUNK_BYTES', 512)
+
+    client = FakeGCSClient()
+    for name, blob_name in data_loader.GCS_DATASETS.items():
+        client.upload(data_loader.GCS_BUCKET_NAME, blob_name, _parquet_bytes(_dataset(1)))
+    return client
+
+
+def test_token_change_reloads_only_changed_dataset(fake_gcs):
+    manager = DatasetStoreManager('gcs', client=fake_gcs, check_interval=3600)
+    store = manager.current()
+    assert store.ticker_df['VALUE'].tolist() == [1.0] * 4
+
+    # Token không đổi: giữ nguyên kho, không tải lại
+    downloads = fake_gcs.downloads
+    assert manager.current(force=True) is store
+    assert fake_gcs.downloads == downloads
+
+    fake_gcs.upload(data_loader.GCS_BUCKET_NAME, data_loader.GCS_TICKER_FILE,
+                    _parquet_bytes(_dataset(2, symbols=('AAA', 'BBB', 'CCC'))))
+    refreshed = manager.current(force=True)
+
+    assert refreshed is not store
+    assert refreshed.version != store.version
+    assert refreshed.ticker_df['VALUE'].tolist() == [2.0] * 6
+    # Dataset không đổi dùng lại frame của kho cũ
+    assert refreshed.market_df is store.market_df
+    assert refreshed.industry_df is store.industry_df
+
+
+def test_refresh_error_keeps_current_store(fake_gcs):
+    manager = DatasetStoreManager('gcs', client=fake_gcs, check_interval=3600)
+    store = manager.current()
+
+    fake_gcs.offline = True
+    assert manager.current(force=True) is store
+    assert 'offline' in store.last_error
+
+
+def test_initial_load_falls_back_to_disk_cache(fake_gcs):
+    # Lần chạy trước đã tải và ghi cache đĩa
+    online = DatasetStoreManager('gcs', client=fake_gcs).current()
+
+    fake_gcs.offline = True
+    offline = DatasetStoreManager('gcs', client=fake_gcs).current()
+
+    assert offline.version == online.version
+    assert offline.last_error.startswith('Đang dùng bản cache trên đĩa')
+    pd.testing.assert_frame_equal(offline.ticker_df, online.ticker_df)
+
+
+def test_initial_load_without_cache_raises(fake_gcs):
+    fake_gcs.offline = True
+    with pytest.raises(ConnectionError):
+        DatasetStoreManager('gcs', client=fake_gcs).current()
+
+
+def test_page_loaders_throttle_token_checks(fake_gcs, monkeypatch):
+    monkeypatch.setattr(data_loader, 'get_gcs_client', lambda: fake_gcs)
+    monkeypatch.setattr(data_loader, '_recent_tokens', {})
+    blob_name = data_loader.GCS_TICKER_FILE
+
+    first = data_loader.get_recent_blob_token(data_loader.GCS_BUCKET_NAME, blob_name)
+    fake_gcs.upload(data_loader.GCS_BUCKET_NAME, blob_name, _parquet_bytes(_dataset(2)))
+    requests = fake_gcs.metadata_requests
+
+    # Trong khoảng kiểm tra: dùng lại token, không gọi GCS
+    assert data_loader.get_recent_blob_token(data_loader.GCS_BUCKET_NAME, blob_name) == first
+    assert fake_gcs.metadata_requests == requests
+
+    # Quá hạn: hỏi lại và thấy generation mới
+    newer = data_loader.get_recent_blob_token(data_loader.GCS_BUCKET_NAME, blob_name, max_age=0)
+    assert newer != first
+    assert fake_gcs.metadata_requests == requests + 1
+
+
+def test_chunked_download_returns_buffer_without_copy(fake_gcs):
+    expected = _dataset(3, symbols=tuple(f'S{i:03d}' for i in range(200)))
+    fake_gcs.upload(data_loader.GCS_BUCKET_NAME, data_loader.GCS_TICKER_FILE, _parquet_bytes(expected))
+
+    content = data_loader.download_blob_bytes(
+        data_loader.GCS_BUCKET_NAME, data_loader.GCS_TICKER_FILE, client=fake_gcs
+    )
+    assert isinstance(content, memoryview)
+    assert bytes(content) == _parquet_bytes(expected)
+
+    df = data_loader.fetch_parquet_from_gcs(
+        data_loader.GCS_BUCKET_NAME, data_loader.GCS_TICKER_FILE, client=fake_gcs
+    )
+    pd.testing.assert_frame_equal(df, expected)
+
+    path = parquet_cache.get_parquet_cache().put('ticker', 'token', content)
+    assert path.read_bytes() == bytes(content)
+
+
+def test_dataset_accessors_cache_sorted_frame_per_version(fake_gcs, monkeypatch):
+    monkeypatch.setattr(data_loader, 'get_gcs_client', lambda: fake_gcs)
+    monkeypatch.setattr(data_loader, '_recent_tokens', {})
+    monkeypatch.setattr(config, 'PARQUET_CACHE_DIR', None)
+    data_loader._sorted_dataset_version.clear()
+    sorts = []
+    sort_by_period = data_loader.sort_by_period
+    monkeypatch.setattr(data_loader, 'sort_by_period', lambda *a, **k: sorts.append(1) or sort_by_period(*a, **k))
+
+    first = data_loader.get_ticker_data()
+    downloads = fake_gcs.downloads
+    pd.testing.assert_frame_equal(data_loader.get_ticker_data(), first)
+    # Cùng phiên bản: không tải, không sắp lại
+    assert fake_gcs.downloads == downloads
+    assert len(sorts) == 1
+
+    fake_gcs.upload(data_loader.GCS_BUCKET_NAME, data_loader.GCS_TICKER_FILE,
+                    _parquet_bytes(_dataset(5, symbols=('CCC', 'AAA'))))
+    monkeypatch.setattr(config, 'DATA_REFRESH_CHECK_SECONDS', 0)
+    refreshed = data_loader.get_ticker_data()
+    assert refreshed['SYMBOL'].tolist() == ['AAA', 'AAA', 'CCC', 'CCC']
+    assert len(sorts) == 2
+    data_loader._sorted_dataset_version.clear()
@@ -0,0 +1,105 @@
+"""
+Chỉ mục lười của DatasetStore (utils.data_store + utils.data_index)
+"""
+
+import gc
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import data_index
+from utils.data_index import PercentileRanks, PeriodPanel, ScreeningIndex, SymbolIndex, find_index
+from utils.data_store import DATASET_NAMES, DatasetStore, DatasetStoreManager
+
+
+def _ticker(symbols=20):
+    rng = np.random.default_rng(0)
+    rows = [(f'S{i:02d}', year, f'Q{quarter}')
+            for i in range(symbols) for year in (2023, 2024) for quarter in range(1, 5)]
+    df = pd.DataFrame(rows, columns=['SYMBOL', 'YEAR', 'QUARTER'])
+    df['ROE'] = rng.normal(size=len(df))
+    df['LEVEL2_NAME_EN'] = np.where(rng.random(len(df)) < 0.5, 'Banks', 'Real Estate')
+    return df
+
+
+def _store():
+    market = pd.DataFrame({'YEAR': [2024], 'QUARTER': ['Q1'], 'VALUE': [1.0]})
+    return DatasetStore({'market': market, 'industry': _ticker(5), 'ticker': _ticker()}, 'local', version='v')
+
+
+def test_indexes_are_built_on_first_access():
+    store = _store()
+    assert store._indexes == {}
+
+    ranks = find_index(store.ticker_df, PercentileRanks)
+    assert ranks is store.percentile_ranks('ticker')
+    assert find_index(store.ticker_df, PeriodPanel) is store.period_panel('ticker')
+    assert set(store._indexes) == {('ticker', 'PercentileRanks'), ('ticker', 'PeriodPanel')}
+
+
+def test_find_index_ignores_foreign_frames_and_missing_columns():
+    store = _store()
+    assert find_index(store.ticker_df.copy(), ScreeningIndex) is None
+    assert find_index(store.market_df, SymbolIndex) is None
+
+
+def test_sort_by_period_warns_and_drops_invalid_periods():
+    df = _ticker(2)
+    df.loc[[1, 5], 'QUARTER'] = ['Q5', None]
+    df.loc[3, 'YEAR'] = np.nan
+    with pytest.warns(UserWarning, match='Bỏ 3 dòng'):
+        result = data_index.sort_by_period(df)
+    assert len(result) == len(df) - 3
+    assert not result.index.isin([1, 3, 5]).any()
+
+
+def test_store_release_drops_index_owners():
+    store = _store()
+    store.screening_index('ticker')
+    frame_ids = {id(df) for df in (store.market_df, store.industry_df, store.ticker_df)}
+    ref = weakref.ref(store)
+    del store
+    gc.collect()
+
+    assert ref() is None
+    assert not [key for key in data_index._OWNERS if key[0] in frame_ids]
+
+
+class _SlowLoader:
+    """Loader giả: read_dataset chờ được cho phép khi token là 'slow'"""
+
+    def __init__(self):
+        self.tokens = {name: 'v1' for name in DATASET_NAMES}
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def read_dataset_tokens(self):
+        return dict(self.tokens)
+
+    def read_dataset(self, name, token):
+        if token == 'slow':
+            self.started.set()
+            assert self.release.wait(5)
+        return _ticker(), {'bytes_before': 0, 'bytes_after': 0, 'category_columns': [], 'float32_columns': []}
+
+
+def test_refresh_download_does_not_block_other_sessions():
+    loader = _SlowLoader()
+    manager = DatasetStoreManager('local', loader=loader, check_interval=0)
+    store = manager.current()
+
+    loader.tokens['ticker'] = 'slow'
+    refresher = threading.Thread(target=manager.current)
+    refresher.start()
+    assert loader.started.wait(5)
+
+    # Trong lúc tải: session khác nhận ngay kho hiện tại
+    assert manager.current() is store
+
+    loader.release.set()
+    refresher.join(5)
+    assert manager.current() is not store
+    assert manager.current().tokens['ticker'] == 'slow'
@@ -0,0 +1,57 @@
+"""
+Báo cáo tài chính của một mã (build_statement): nhãn dòng, thứ tự chỉ tiêu và kỳ
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from components import financial_statement
+from components.metric_catalog import MetricCatalog
+
+NESTED = {
+    'company': {
+        'IS': {
+            'REVENUE': {'VN_NAME': 'Doanh thu thuần', 'ORDER': 2},
+            'NET_PROFIT': {'VN_NAME': 'Lợi nhuận sau thuế', 'ORDER': 1},
+        },
+        'ratio': {
+            'ROAE': {'VN_NAME': 'ROE', 'ORDER': 1},
+        },
+    },
+}
+
+
+@pytest.fixture(autouse=True)
+def catalog(monkeypatch):
+    monkeypatch.setattr(financial_statement, 'get_metric_catalog', lambda: MetricCatalog.from_nested(NESTED))
+
+
+def _frame():
+    return pd.DataFrame({
+        'SYMBOL': ['AAA', 'AAA', 'BBB'],
+        'YEAR': [2024, 2024, 2024],
+        'QUARTER': ['Q1', 'Q2', 'Q1'],
+        'REVENUE': [1e9, 2e9, 3e9],
+        'NET_PROFIT': [1e8, np.nan, 2e8],
+        'ROAE': [10.0, 12.0, 8.0],
+    })
+
+
+def test_row_labels_are_metric_codes():
+    statement = financial_statement.build_statement(_frame(), 'AAA', 'IS')
+
+    # Nhãn dòng (bảng hiển thị và export) là mã chỉ tiêu như bảng gốc, sắp theo ORDER
+    assert statement.names == statement.codes == ['NET_PROFIT', 'REVENUE']
+    frame = statement.to_frame()
+    assert frame.index.tolist() == ['NET_PROFIT', 'REVENUE']
+    assert frame.columns.tolist() == ['_code', '2024Q2', '2024Q1']
+    assert frame.loc['REVENUE', '2024Q2'] == 2e9
+    assert statement.to_frame(scaled=True).loc['REVENUE', '2024Q1'] == pytest.approx(1.0)
+
+
+def test_metric_info_keeps_vietnamese_names_for_picker():
+    statement = financial_statement.build_statement(_frame(), 'AAA', 'ratio')
+
+    assert statement.names == ['ROAE']
+    assert statement.metrics_info['ROAE']['name'] == 'ROE'
@@ -0,0 +1,112 @@
+"""
+Percentile và thứ hạng theo kỳ (PercentileRanks, metric_percentiles) so với cách tính trên frame của kỳ
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_index import PercentileRanks, PeriodPanel
+from utils.data_store import DatasetStore
+from utils.metrics import calculate_percentile, metric_percentiles
+
+PERIODS = [(2024, 'Q1'), (2024, 'Q2')]
+INDUSTRIES = ['Banks', 'Real Estate', 'Retail']
+
+pytestmark = pytest.mark.filterwarnings('ignore:PeriodPanel')
+
+
+def _ticker(symbols=30, seed=0):
+    """Frame có giá trị trùng (hòa hạng), NaN, dòng trùng (SYMBOL, kỳ) và dòng thiếu SYMBOL"""
+    rng = np.random.default_rng(seed)
+    rows = [(f'S{i:02d}', year, quarter) for year, quarter in PERIODS for i in range(symbols)]
+    df = pd.DataFrame(rows, columns=['SYMBOL', 'YEAR', 'QUARTER'])
+    n = len(df)
+    df['ROAE'] = rng.choice([1.0, 2.0, 2.0, 3.0, 5.0, np.nan], size=n)
+    df['MARKET_CAP_HT'] = rng.integers(1, 8, size=n).astype(float)
+    df['LEVEL2_NAME_EN'] = rng.choice(INDUSTRIES, size=n)
+
+    duplicates = df.sample(6, random_state=seed).assign(ROAE=rng.choice([0.5, 2.0, 9.0], size=6))
+    missing_symbol = df.sample(4, random_state=seed + 1).assign(SYMBOL=np.nan)
+    df = pd.concat([df, duplicates, missing_symbol], ignore_index=True)
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def _period_frame(df, year, quarter):
+    return df[(df['YEAR'] == year) & (df['QUARTER'] == quarter)]
+
+
+def test_period_panel_reports_duplicate_pairs():
+    df = _ticker()
+    with pytest.warns(UserWarning, match='trùng cặp'):
+        panel = PeriodPanel(df)
+    assert panel.duplicate_rows == 6
+
+    # Ô của grid giữ dòng cuối của cặp trùng
+    for (symbol, year, quarter), rows in df.dropna(subset=['SYMBOL']).groupby(['SYMBOL', 'YEAR', 'QUARTER']).groups.items():
+        p = panel.period_keys.tolist().index(year * 4 + int(quarter[-1]))
+        assert panel.grid[p, panel.symbols.get_loc(symbol)] == df.index.get_indexer(rows).max()
+
+
+@pytest.mark.parametrize('column', ['ROAE', 'MARKET_CAP_HT'])
+@pytest.mark.parametrize('n', [1, 5, 12, 100])
+@pytest.mark.parametrize('year, quarter', PERIODS)
+def test_top_matches_nlargest(column, n, year, quarter):
+    df = _ticker()
+    ranks = PercentileRanks(PeriodPanel(df))
+    period_frame = _period_frame(df, year, quarter)
+
+    pd.testing.assert_frame_equal(ranks.top(column, n, year, quarter), period_frame.nlargest(n, column))
+    pd.testing.assert_frame_equal(
+        ranks.top(column, n, year, quarter, ascending=True), period_frame.nsmallest(n, column)
+    )
+    for industry in INDUSTRIES:
+        industry_frame = period_frame[period_frame['LEVEL2_NAME_EN'] == industry]
+        pd.testing.assert_frame_equal(
+            ranks.top(column, n, year, quarter, industry=industry), industry_frame.nlargest(n, column)
+        )
+
+
+@pytest.mark.parametrize('year, quarter', PERIODS)
+def test_metric_percentiles_match_calculate_percentile(year, quarter):
+    store = DatasetStore({'ticker': _ticker(seed=1)}, 'local', version='v')
+    df = store.ticker_df
+    period_frame = _period_frame(df, year, quarter)
+    columns = ['ROAE', 'MARKET_CAP_HT']
+
+    for symbol in period_frame['SYMBOL'].dropna().unique():
+        result = metric_percentiles(df, symbol, columns, (year, quarter))
+        # Mã có dòng trùng: tra theo dòng cuối của mã trong kỳ
+        row = period_frame[period_frame['SYMBOL'] == symbol].iloc[-1]
+        industry_frame = period_frame[period_frame['LEVEL2_NAME_EN'] == row['LEVEL2_NAME_EN']]
+
+        for column in columns:
+            value = row[column]
+            for scope, frame in (('MARKET', period_frame), ('INDUSTRY', industry_frame)):
+                position = result.loc[column]
+                if pd.isna(value):
+                    assert position[f'RANK_{scope}'] == 0
+                    continue
+                expected = calculate_percentile(frame, column, value)
+                assert position[f'PERCENTILE_{scope}'] == pytest.approx(expected, rel=1e-6)
+                assert position[f'RANK_{scope}'] == (frame[column] > value).sum() + 1
+                assert position[f'COUNT_{scope}'] == frame[column].notna().sum()
+
+
+def test_display_columns_are_ranked_when_store_is_built():
+    store = DatasetStore({'ticker': _ticker()}, 'local', version='v')
+    store.precompute_percentile_ranks({'ticker': ['ROAE', 'NOT_A_COLUMN'], 'market': ['ROAE']})
+    assert set(store.percentile_ranks('ticker')._columns) == {'ROAE'}
+
+
+@pytest.mark.parametrize('n', [3, 15, 100])
+def test_filtered_top_matches_filtered_nlargest(n):
+    # pages/v2.py: lọc sau top() thay cho lọc trước nlargest
+    df = _ticker(seed=2)
+    ranks = PercentileRanks(PeriodPanel(df))
+    period_frame = _period_frame(df, 2024, 'Q2')
+
+    top_roe = ranks.top('ROAE', n, 2024, 'Q2')
+    pd.testing.assert_frame_equal(top_roe[top_roe['ROAE'] > 2], period_frame[period_frame['ROAE'] > 2].nlargest(n, 'ROAE'))
+    top_valid = top_roe[top_roe['ROAE'].notna()]
+    pd.testing.assert_frame_equal(top_valid, period_frame[period_frame['ROAE'].notna()].nlargest(n, 'ROAE'))
@@ -0,0 +1,308 @@
+"""
+Điểm tính theo cột (utils/scoring.py) so với bản tính từng dòng trước đây (utils/metrics.py)
+và điểm tổng hợp so với công thức inline trước đây trong pages/v2.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+from utils import metrics
+from utils.scoring import composite_scores, dupont_frame, score_frame, z_score_frame
+
+
+# ---- Bản tính từng dòng cũ (trước khi chuyển sang utils/scoring.py) ----
+
+def _old_z_score_components(row):
+    components = {}
+    if pd.notna(row.get('WORKING_CAPITAL_AVG4Q')) and pd.notna(row.get('TOTAL_ASSETS')):
+        wc = row.get('WORKING_CAPITAL_AVG4Q', 0)
+        ta = row.get('TOTAL_ASSETS', 1)
+        components['Z1'] = wc / ta if ta != 0 else 0
+    if 'Z2' in row:
+        components['Z2'] = row['Z2']
+    if pd.notna(row.get('EBIT_12M')) and pd.notna(row.get('TOTAL_ASSETS')):
+        ebit = row.get('EBIT_12M', 0)
+        ta = row.get('TOTAL_ASSETS', 1)
+        components['Z3'] = ebit / ta if ta != 0 else 0
+    if pd.notna(row.get('MARKET_CAP_EOQ')) and pd.notna(row.get('TOTAL_LIABILITIES')):
+        mve = row.get('MARKET_CAP_EOQ', 0)
+        tl = row.get('TOTAL_LIABILITIES', 1)
+        components['Z4'] = mve / tl if tl != 0 else 0
+    if pd.notna(row.get('NET_SALES_12M')) and pd.notna(row.get('TOTAL_ASSETS')):
+        sales = row.get('NET_SALES_12M', 0)
+        ta = row.get('TOTAL_ASSETS', 1)
+        components['Z5'] = sales / ta if ta != 0 else 0
+    if all(k in components for k in ['Z1', 'Z2', 'Z3', 'Z4', 'Z5']):
+        components['Z_SCORE'] = (
+            1.2 * components['Z1'] + 1.4 * components['Z2'] + 3.3 * components['Z3']
+            + 0.6 * components['Z4'] + 1.0 * components['Z5']
+        )
+    return components
+
+
+def _old_dupont_analysis(row):
+    components = {}
+    for name, column in [('tax_burden', 'DU1_TAX_BURDEN'), ('interest_burden', 'DU2_INTEREST_BURDEN'),
+                         ('profit_margin', 'DU3_PROFIT_MARGIN'), ('asset_turnover', 'DU4_ASSETS_TURNOVER'),
+                         ('leverage', 'DU5_LEVERAGE')]:
+        if column in row:
+            components[name] = row[column]
+    if len(components) == 5:
+        components['roe'] = (components['tax_burden'] * components['interest_burden']
+                             * components['profit_margin'] * components['asset_turnover']
+                             * components['leverage'])
+    return components
+
+
+def _old_band(value, bands):
+    for threshold, points in bands:
+        if value >= threshold:
+            return points
+    return 0
+
+
+def _old_liquidity_score(row):
+    score = count = 0
+    if pd.notna(row.get('CURRENT_RATIO_Q')):
+        score += _old_band(row.get('CURRENT_RATIO_Q', 0), [(2, 30), (1.5, 20), (1, 10)])
+        count += 30
+    if pd.notna(row.get('QUICK_RATIO_Q')):
+        score += _old_band(row.get('QUICK_RATIO_Q', 0), [(1, 25), (0.8, 15), (0.5, 5)])
+        count += 25
+    if pd.notna(row.get('CASH_PLUS_EQUIVALENTS')) and pd.notna(row.get('CURRENT_LIABILITIES')):
+        cash = row.get('CASH_PLUS_EQUIVALENTS', 0)
+        cl = row.get('CURRENT_LIABILITIES', 1)
+        cash_ratio = cash / cl if cl != 0 else 0
+        score += _old_band(cash_ratio, [(0.5, 25), (0.3, 15), (0.1, 5)])
+        count += 25
+    if pd.notna(row.get('WORKING_CAPITAL_AVG4Q')):
+        if row.get('WORKING_CAPITAL_AVG4Q', 0) > 0:
+            score += 20
+        count += 20
+    return (score / count * 100) if count > 0 else 0
+
+
+def _old_profitability_score(row):
+    score = count = 0
+    for column, weight, bands in [
+        ('ROAE', 30, [(20, 30), (15, 20), (10, 10)]),
+        ('ROAA', 25, [(8, 25), (5, 15), (3, 5)]),
+        ('NET_INCOME_MARGIN_12M', 25, [(15, 25), (10, 15), (5, 5)]),
+        ('ROIC', 20, [(15, 20), (10, 10), (5, 5)]),
+    ]:
+        if pd.notna(row.get(column)):
+            score += _old_band(row.get(column, 0), bands)
+            count += weight
+    return (score / count * 100) if count > 0 else 0
+
+
+# ---- Dữ liệu: giá trị đúng bằng ngưỡng, NaN, mẫu số 0, cột thiếu ----
+
+VALUE_POOL = {
+    'CURRENT_RATIO_Q': [2, 1.5, 1, 0.99, 3, np.nan],
+    'QUICK_RATIO_Q': [1, 0.8, 0.5, 0.4, np.nan],
+    'CASH_PLUS_EQUIVALENTS': [0, 5, 3, 1, 50, np.nan],
+    'CURRENT_LIABILITIES': [10, 0, -10, np.nan],
+    'WORKING_CAPITAL_AVG4Q': [0, 1, -1, np.nan],
+    'ROAE': [20, 15, 10, 9.99, -5, np.nan],
+    'ROAA': [8, 5, 3, 2, np.nan],
+    'NET_INCOME_MARGIN_12M': [15, 10, 5, 4, np.nan],
+    'ROIC': [15, 10, 5, 4, np.nan],
+    'TOTAL_ASSETS': [100, 0, np.nan],
+    'EBIT_12M': [10, -3, np.nan],
+    'MARKET_CAP_EOQ': [200, np.nan],
+    'TOTAL_LIABILITIES': [50, 0, np.nan],
+    'NET_SALES_12M': [80, np.nan],
+    'Z2': [0.3, np.nan],
+    'DU1_TAX_BURDEN': [0.8, np.nan],
+    'DU2_INTEREST_BURDEN': [0.9, 0],
+    'DU3_PROFIT_MARGIN': [0.12, np.nan],
+    'DU4_ASSETS_TURNOVER': [0.7],
+    'DU5_LEVERAGE': [2.5, np.nan],
+}
+
+
+def _frame(n=400, seed=0, drop=()):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({column: rng.choice(pool, size=n) for column, pool in VALUE_POOL.items()})
+    return df.drop(columns=list(drop))
+
+
+# Cột thiếu: mỗi nhóm bỏ một cột của tỷ số, của bảng ngưỡng, Z2 và DuPont
+DROPS = [(), ('CURRENT_LIABILITIES', 'ROIC'), ('Z2', 'DU5_LEVERAGE'), ('TOTAL_ASSETS', 'QUICK_RATIO_Q'),
+         tuple(VALUE_POOL)]
+
+
+def _assert_same(actual, expected):
+    assert actual.keys() == expected.keys()
+    for name in expected:
+        assert actual[name] == pytest.approx(expected[name], nan_ok=True), name
+
+
+@pytest.mark.parametrize('drop', DROPS)
+def test_row_scores_match_old_scalar_code(drop):
+    df = _frame(drop=drop)
+    for _, row in df.iterrows():
+        assert metrics.calculate_liquidity_score(row) == pytest.approx(_old_liquidity_score(row))
+        assert metrics.calculate_profitability_score(row) == pytest.approx(_old_profitability_score(row))
+        _assert_same(metrics.calculate_z_score_components(row), _old_z_score_components(row))
+        _assert_same(metrics.calculate_dupont_analysis(row), _old_dupont_analysis(row))
+
+
+def test_row_scores_accept_dict_rows():
+    row = _frame(n=1).iloc[0].to_dict()
+    assert metrics.calculate_liquidity_score(row) == pytest.approx(_old_liquidity_score(row))
+    _assert_same(metrics.calculate_z_score_components(row), _old_z_score_components(row))
+    assert metrics.calculate_profitability_score({}) == 0
+
+
+@pytest.mark.parametrize('drop', DROPS)
+def test_frame_scores_match_old_scalar_code(drop):
+    df = _frame(seed=1, drop=drop)
+    scores = score_frame(df)
+    z_scores = z_score_frame(df)
+    dupont = dupont_frame(df)
+
+    for i, (_, row) in enumerate(df.iterrows()):
+        assert scores['LIQUIDITY_SCORE'].iloc[i] == pytest.approx(_old_liquidity_score(row))
+        assert scores['PROFITABILITY_SCORE'].iloc[i] == pytest.approx(_old_profitability_score(row))
+        old_z = _old_z_score_components(row)
+        assert scores['Z_SCORE_CALC'].iloc[i] == pytest.approx(old_z.get('Z_SCORE', np.nan), nan_ok=True)
+        for name, value in old_z.items():
+            assert z_scores[name].iloc[i] == pytest.approx(value, nan_ok=True)
+        old_dupont = _old_dupont_analysis(row)
+        assert set(dupont.columns) == set(old_dupont)
+        assert scores['DUPONT_ROE'].iloc[i] == pytest.approx(old_dupont.get('roe', np.nan), nan_ok=True)
+
+
+@pytest.mark.parametrize('value, expected', list(zip(
+    [2, 1.9999, 1.5, 1.4999, 1, 0.9999],
+    [100, 200 / 3, 200 / 3, 100 / 3, 100 / 3, 0],
+)))
+def test_threshold_boundaries_are_inclusive(value, expected):
+    assert metrics.calculate_liquidity_score({'CURRENT_RATIO_Q': value}) == pytest.approx(expected)
+
+
+def test_zero_denominators_score_zero_ratio():
+    row = {'CASH_PLUS_EQUIVALENTS': 5, 'CURRENT_LIABILITIES': 0, 'WORKING_CAPITAL_AVG4Q': 0}
+    # CASH_RATIO = 0 (không đạt ngưỡng nào), vốn lưu động 0 không > 0
+    assert metrics.calculate_liquidity_score(row) == 0
+    z = metrics.calculate_z_score_components({'EBIT_12M': 1, 'TOTAL_ASSETS': 0})
+    assert z == {'Z3': 0}
+
+
+# ---- Điểm tổng hợp (config.COMPOSITE_SCORES) so với công thức inline cũ trong pages/v2.py ----
+
+COMPOSITE_PERIODS = [(2023, 'Q4'), (2024, 'Q1'), (2024, 'Q2')]
+
+
+def _composite_frame(symbols=40, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = [(f'S{i:02d}', year, quarter) for year, quarter in COMPOSITE_PERIODS for i in range(symbols)]
+    df = pd.DataFrame(rows, columns=['SYMBOL', 'YEAR', 'QUARTER'])
+    n = len(df)
+    df['CAL_GROUP'] = rng.choice(['bank', 'security', 'corporate'], size=n)
+    for column in ['NIM_12M', 'NPL_Q', 'CIR_12M', 'ROAE', 'ROAA', 'OPERATING_MARGIN_12M',
+                   'CURRENT_RATIO_Q', 'Z_SCORE']:
+        values = rng.normal(10, 5, size=n)
+        values[rng.random(n) < 0.1] = np.nan
+        df[column] = values
+    df['PE_EOQ'] = rng.choice([0.0, np.inf, -4.0, 5.0, 8.0, 12.0, 30.0, np.nan], size=n)
+    return df
+
+
+def _old_banking_score(banks_data):
+    return (
+        (banks_data['NIM_12M'] / banks_data['NIM_12M'].max() * 25) +
+        ((1 - banks_data['NPL_Q'] / banks_data['NPL_Q'].max()) * 25) +
+        ((1 - banks_data['CIR_12M'] / banks_data['CIR_12M'].max()) * 25) +
+        (banks_data['ROAE'] / banks_data['ROAE'].max() * 25)
+    )
+
+
+def _old_securities_score(securities_data):
+    inverse_pe = 1 / securities_data['PE_EOQ'].replace([0, np.inf], 50)
+    return (
+        (securities_data['ROAE'] / securities_data['ROAE'].max() * 30) +
+        (securities_data['OPERATING_MARGIN_12M'] / securities_data['OPERATING_MARGIN_12M'].max() * 30) +
+        (inverse_pe / inverse_pe.max() * 20) +
+        (securities_data['CURRENT_RATIO_Q'] / securities_data['CURRENT_RATIO_Q'].max() * 20)
+    )
+
+
+def _old_screener_score(filtered):
+    inverse_pe = 1 / filtered['PE_EOQ'].replace(0, np.inf)
+    return (
+        (filtered['ROAE'] / filtered['ROAE'].max() * 25) +
+        (filtered['ROAA'] / filtered['ROAA'].max() * 25) +
+        (inverse_pe / inverse_pe.max() * 25) +
+        (filtered['Z_SCORE'] / filtered['Z_SCORE'].max() * 25)
+    )
+
+
+def _period_rows(df, year, quarter):
+    return df[(df['YEAR'] == year) & (df['QUARTER'] == quarter)]
+
+
+@pytest.mark.parametrize('name, group, old_formula', [
+    ('Banking_Score', 'bank', _old_banking_score),
+    ('Securities_Score', 'security', _old_securities_score),
+])
+def test_store_composite_scores_match_old_formulas(name, group, old_formula):
+    df = _composite_frame()
+    scores = composite_scores(df)
+
+    for year, quarter in COMPOSITE_PERIODS:
+        current = _period_rows(df, year, quarter)
+        members = current[current['CAL_GROUP'] == group]
+        pd.testing.assert_series_equal(scores.loc[members.index, name], old_formula(members), check_names=False)
+        # Dòng ngoài universe không có điểm
+        assert scores.loc[current.index.difference(members.index), name].isna().all()
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_screener_score_matches_old_formula_on_filtered_subset(seed):
+    df = _composite_frame(seed=seed)
+    current = _period_rows(df, 2024, 'Q2')
+    filtered = current[(current['ROAE'] > 8) & (current['PE_EOQ'] < 20)].copy()
+
+    result = composite_scores(filtered, ['Score'])['Score']
+    pd.testing.assert_series_equal(result, _old_screener_score(filtered), check_names=False)
+
+
+def _reference_normalize(values, method):
+    if method == 'max':
+        return values / values.max()
+    if method == 'rank':
+        return values.rank(pct=True)
+    if method == 'zscore':
+        return (values - values.mean()) / values.std()
+    low, high = values.quantile(list(config.COMPOSITE_WINSOR_LIMITS))
+    return (values.clip(low, high) - low) / (high - low)
+
+
+@pytest.mark.parametrize('method', ['max', 'rank', 'zscore', 'winsor'])
+@pytest.mark.parametrize('direction', ['higher', 'lower'])
+def test_composite_normalization_per_period(monkeypatch, method, direction):
+    spec = {
+        'universe': {'CAL_GROUP': {'in': ['bank', 'security']}},
+        'components': [
+            {'metric': 'ROAE', 'weight': 60, 'direction': direction, 'normalize': method},
+            {'metric': 'PE_EOQ', 'weight': 40, 'direction': 'inverse', 'fill': 50, 'normalize': method},
+        ],
+    }
+    monkeypatch.setitem(config.COMPOSITE_SCORES, 'Test_Score', spec)
+    df = _composite_frame(seed=3)
+    scores = composite_scores(df, ['Test_Score'])['Test_Score']
+
+    for year, quarter in COMPOSITE_PERIODS:
+        current = _period_rows(df, year, quarter)
+        members = current[current['CAL_GROUP'].isin(['bank', 'security'])]
+        roae = _reference_normalize(members['ROAE'], method)
+        if direction == 'lower':
+            roae = -roae if method == 'zscore' else 1 - roae
+        inverse_pe = 1 / members['PE_EOQ'].replace([0, np.inf], 50)
+        expected = roae * 60 + _reference_normalize(inverse_pe, method) * 40
+        pd.testing.assert_series_equal(scores.loc[members.index], expected, check_names=False)
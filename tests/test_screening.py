@@ -0,0 +1,190 @@
+"""
+Sàng lọc theo kỳ (ScreeningIndex, screen_stocks) và sàng lọc lịch sử (screen_history)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_index import ScreeningIndex
+from utils.data_store import DatasetStore
+from utils.filter_engine import compile_filters, range_filters
+from utils.metrics import screen_history, screen_stocks
+
+PERIODS = [(2023, 'Q4'), (2024, 'Q1'), (2024, 'Q2')]
+
+
+def _ticker(symbols=40, seed=0):
+    """Frame nhiều kỳ có NaN, giá trị trùng ở cận, float32 và Int64 có NA"""
+    rng = np.random.default_rng(seed)
+    rows = [(f'S{i:02d}', year, quarter) for year, quarter in PERIODS for i in range(symbols)]
+    df = pd.DataFrame(rows, columns=['SYMBOL', 'YEAR', 'QUARTER'])
+    n = len(df)
+
+    # Giá trị rời rạc để có nhiều dòng trùng đúng bằng cận
+    df['PE_EOQ'] = rng.choice([0.0, 5.0, 10.0, 15.0, 20.0, np.nan], size=n)
+    # Cột float32 như sau compact_frame: cận 0.1 phải so sánh theo float32
+    df['ROAE'] = rng.choice([0.1, 0.2, 0.30000001, 15.0, np.nan], size=n).astype(np.float32)
+    df['PB_EOQ'] = rng.integers(0, 5, size=n)
+    df['OUTS_SHARES'] = pd.array(rng.choice([1, 2, 3], size=n), dtype='Int64')
+    df.loc[rng.random(n) < 0.2, 'OUTS_SHARES'] = pd.NA
+    # Thứ tự dòng không theo kỳ để kiểm tra giữ thứ tự gốc
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+CRITERIA = [
+    {'PE_EOQ': (5.0, 15.0)},
+    {'PE_EOQ': (None, 10.0)},
+    {'PE_EOQ': (10.0, None)},
+    {'PE_EOQ': (None, None)},
+    {'ROAE': (0.1, 0.2)},
+    {'ROAE': (0.2, 0.30000001)},
+    {'ROAE': (0.1, None), 'PE_EOQ': (0.0, 20.0)},
+    {'PB_EOQ': (1, 3)},
+    {'PB_EOQ': (1.5, 3.5)},
+    {'OUTS_SHARES': (2, 2)},
+    {'OUTS_SHARES': (None, 2), 'PB_EOQ': (0, None)},
+    {'PE_EOQ': (100.0, None)},
+    {'PE_EOQ': (15.0, 5.0)},
+    {'MISSING_COLUMN': (0, 1), 'PE_EOQ': (0.0, 10.0)},
+]
+
+
+def _expected(df, criteria, year, quarter):
+    """Lọc bằng mask trên frame của kỳ (cách tính gốc)"""
+    period_frame = df[(df['YEAR'] == year) & (df['QUARTER'] == quarter)]
+    criteria = {column: bounds for column, bounds in criteria.items() if column in df.columns}
+    return compile_filters(range_filters(criteria)).apply(period_frame)
+
+
+@pytest.mark.parametrize('criteria', CRITERIA)
+@pytest.mark.parametrize('year, quarter', PERIODS)
+def test_screening_index_matches_mask_screening(criteria, year, quarter):
+    df = _ticker()
+    expected = _expected(df, criteria, year, quarter)
+
+    pd.testing.assert_frame_equal(screen_stocks(df, criteria, period=(year, quarter)), expected)
+    criteria = {column: bounds for column, bounds in criteria.items() if column in df.columns}
+    pd.testing.assert_frame_equal(ScreeningIndex(df).screen(criteria, year, quarter), expected)
+
+
+@pytest.mark.parametrize('criteria', CRITERIA)
+def test_store_latest_screen_matches_mask_screening(criteria):
+    store = DatasetStore({'ticker': _ticker(seed=1)}, 'local', version='v')
+    year, quarter = store.quarter_index('ticker').latest_period()
+    expected = _expected(store.ticker_df, criteria, year, quarter)
+
+    pd.testing.assert_frame_equal(screen_stocks(store.ticker_df, criteria, period='latest'), expected)
+    pd.testing.assert_frame_equal(screen_stocks(store.ticker_df, criteria, period=(year, quarter)), expected)
+    assert ('ticker', 'ScreeningIndex') in store._indexes
+
+
+def test_unknown_period_returns_empty():
+    df = _ticker()
+    assert screen_stocks(df, {'PE_EOQ': (0.0, None)}, period=(2020, 'Q1')).empty
+
+
+def test_screen_without_period_uses_all_rows():
+    df = _ticker()
+    criteria = {'PE_EOQ': (5.0, 15.0)}
+    pd.testing.assert_frame_equal(screen_stocks(df, criteria), compile_filters(range_filters(criteria)).apply(df))
+
+
+def _history_frame():
+    """
+    Bốn mã qua sáu kỳ, tiêu chí ROAE >= 10:
+    AAA đạt 1, 2, 4, 5, 6; BBB thiếu kỳ 2 và 5, đạt 1, 3, 4;
+    CCC chỉ có ba kỳ cuối (một kỳ NaN), không đạt kỳ nào; DDD chỉ có kỳ đầu
+    """
+    periods = [(2023, 'Q1'), (2023, 'Q2'), (2023, 'Q3'), (2023, 'Q4'), (2024, 'Q1'), (2024, 'Q2')]
+    values = {
+        'AAA': [12, 15, 5, 10, 11, 20],
+        'BBB': [10, None, 30, 40, None, 1],
+        'CCC': [None, None, None, 9, np.nan, 2],
+        'DDD': [50, None, None, None, None, None],
+    }
+    rows = []
+    for symbol, series in values.items():
+        for (year, quarter), value in zip(periods, series):
+            if value is None:
+                continue  # Mã không có dòng ở kỳ này
+            rows.append((symbol, year, quarter, value))
+    df = pd.DataFrame(rows, columns=['SYMBOL', 'YEAR', 'QUARTER', 'ROAE'])
+    return df.sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+def test_screen_history_counts_and_streaks():
+    result = screen_history(_history_frame(), {'ROAE': (10, None)})
+
+    assert result.loc['AAA', ['PERIODS', 'PASS_COUNT', 'CURRENT_STREAK', 'MAX_STREAK']].tolist() == [6, 5, 3, 3]
+    assert result.loc['AAA', ['FIRST_PASS', 'LAST_PASS']].tolist() == ['2023Q1', '2024Q2']
+    # Kỳ thiếu dữ liệu cắt chuỗi và không tính vào PERIODS
+    assert result.loc['BBB', ['PERIODS', 'PASS_COUNT', 'CURRENT_STREAK', 'MAX_STREAK']].tolist() == [4, 3, 0, 2]
+    assert result.loc['BBB', 'PASS_RATIO'] == pytest.approx(0.75)
+    assert result.loc['BBB', ['FIRST_PASS', 'LAST_PASS']].tolist() == ['2023Q1', '2023Q4']
+    # NaN không đạt; mã không đạt kỳ nào không có FIRST_PASS/LAST_PASS
+    assert result.loc['CCC', ['PERIODS', 'PASS_COUNT', 'CURRENT_STREAK']].tolist() == [3, 0, 0]
+    assert pd.isna(result.loc['CCC', 'FIRST_PASS'])
+    # Sắp theo chuỗi hiện tại rồi số kỳ đạt
+    assert result.index.tolist() == ['AAA', 'BBB', 'DDD', 'CCC']
+
+
+def test_screen_history_window_and_thresholds():
+    df = _history_frame()
+
+    window = screen_history(df, {'ROAE': (10, None)}, last_n=3)
+    assert window.loc['AAA', ['PERIODS', 'PASS_COUNT', 'CURRENT_STREAK']].tolist() == [3, 3, 3]
+    assert window.loc['BBB', ['PERIODS', 'PASS_COUNT']].tolist() == [2, 1]
+    # DDD không có dòng trong cửa sổ nên bị bỏ
+    assert 'DDD' not in window.index
+
+    ended = screen_history(df, {'ROAE': (10, None)}, last_n=3, period=(2023, 'Q4'))
+    assert ended.loc['BBB', ['PERIODS', 'PASS_COUNT', 'CURRENT_STREAK']].tolist() == [2, 2, 2]
+
+    assert screen_history(df, {'ROAE': (10, None)}, min_passes=3).index.tolist() == ['AAA', 'BBB']
+    assert screen_history(df, {'ROAE': (10, None)}, min_streak=3).index.tolist() == ['AAA']
+
+
+@pytest.mark.parametrize('last_n', [None, 1, 2])
+def test_screen_history_matches_per_period_screening(last_n):
+    df = _ticker(symbols=15, seed=2)
+    # Mã thiếu ở một số kỳ
+    df = df.drop(df.sample(frac=0.2, random_state=3).index)
+    criteria = {'PE_EOQ': (5.0, 15.0), 'ROAE': (0.1, None)}
+    result = screen_history(df, criteria, last_n=last_n)
+
+    window = PERIODS[-last_n:] if last_n else PERIODS
+    passed = {symbol: [] for symbol in df['SYMBOL'].unique()}
+    present = {symbol: 0 for symbol in passed}
+    for year, quarter in window:
+        period_frame = df[(df['YEAR'] == year) & (df['QUARTER'] == quarter)]
+        hits = set(screen_stocks(period_frame, criteria)['SYMBOL'])
+        for symbol in passed:
+            passed[symbol].append(symbol in hits)
+        for symbol in period_frame['SYMBOL']:
+            present[symbol] += 1
+
+    for symbol, flags in passed.items():
+        if present[symbol] == 0:
+            assert symbol not in result.index
+            continue
+        streak = 0
+        for flag in reversed(flags):
+            if not flag:
+                break
+            streak += 1
+        row = result.loc[symbol]
+        assert row['PERIODS'] == present[symbol]
+        assert row['PASS_COUNT'] == sum(flags)
+        assert row['CURRENT_STREAK'] == streak
+
+
+def test_filter_engine_warns_about_unknown_columns_and_operators():
+    df = _ticker()
+    with pytest.warns(UserWarning, match="Cột 'MISSING_COLUMN' không tồn tại"):
+        result = compile_filters({'MISSING_COLUMN': 1, 'PE_EOQ': {'>=': 10.0}}).apply(df)
+    pd.testing.assert_frame_equal(result, df[df['PE_EOQ'] >= 10.0])
+
+    with pytest.warns(UserWarning, match="Operator '~=' không được hỗ trợ"):
+        compiled = compile_filters({'PE_EOQ': {'~=': 1}})
+    assert len(compiled.apply(df)) == len(df)
@@ -1,12 +1,13 @@
 """
 Utils package - Chứa các utility functions
 """
-from .data_loader import load_all_data, get_market_data, get_industry_data, get_ticker_data
+from .data_loader import load_all_data, load_columns, get_market_data, get_industry_data, get_ticker_data
 from .formatters import format_number, format_percent, format_billion, format_change
 from .metrics import calculate_summary_stats, calculate_growth_rate
 
 __all__ = [
     'load_all_data',
+    'load_columns',
     'get_market_data',
     'get_industry_data', 
     'get_ticker_data',
@@ -0,0 +1,119 @@
+"""
+Data Compact Module
+Thu gọn kiểu dữ liệu của DataFrame ngay lúc load để giảm bộ nhớ
+"""
+
+import numpy as np
+import pandas as pd
+import config
+
+
+def frame_bytes(df):
+    """Bộ nhớ của DataFrame (bytes, tính cả chuỗi)"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _is_string_column(series):
+    """Cột chuỗi (object/string) chưa phải category"""
+    return pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+
+
+def _fits_float32(values, tolerance):
+    """
+    Kiểm tra cột float64 ép sang float32 có sai số tuyệt đối <= tolerance
+
+    Cột tỷ lệ (giá trị nhỏ) luôn đạt; cột số tiền lớn (tỷ đồng) sẽ không đạt
+    nên được giữ float64. NaN/inf được giữ nguyên khi ép kiểu.
+    """
+    with np.errstate(over='ignore', invalid='ignore'):
+        diff = np.abs(values.astype(np.float32).astype(np.float64) - values)
+    return not bool((diff > tolerance).any())
+
+
+def compact_frame(df, category_max_ratio=None, float_tolerance=None, exclude=None):
+    """
+    Thu gọn kiểu dữ liệu của frame vừa load
+
+    - Cột chuỗi ít giá trị khác nhau (SYMBOL, QUARTER, CAL_GROUP, LEVEL2_NAME_EN...) -> category
+      (trừ các cột trong config.COMPACT_EXCLUDE_COLUMNS)
+    - Cột float64 ép được sang float32 trong sai số cho phép -> float32
+
+    Args:
+        df: DataFrame vừa load
+        category_max_ratio: Tỷ lệ tối đa số giá trị khác nhau / số dòng để
+                            chuyển sang category (mặc định config.COMPACT_CATEGORY_MAX_RATIO)
+        float_tolerance: Sai số tuyệt đối tối đa khi ép float32
+                         (mặc định config.COMPACT_FLOAT32_TOLERANCE, None trong config = tắt)
+        exclude: Các cột giữ nguyên kiểu (mặc định config.COMPACT_EXCLUDE_COLUMNS)
+
+    Returns:
+        tuple: (DataFrame đã thu gọn, dict báo cáo gồm bytes_before,
+                bytes_after, category_columns, float32_columns)
+    """
+    if category_max_ratio is None:
+        category_max_ratio = config.COMPACT_CATEGORY_MAX_RATIO
+    if float_tolerance is None:
+        float_tolerance = config.COMPACT_FLOAT32_TOLERANCE
+    if exclude is None:
+        exclude = config.COMPACT_EXCLUDE_COLUMNS
+
+    bytes_before = frame_bytes(df)
+    n_rows = len(df)
+
+    converted = {}
+    category_columns = []
+    float32_columns = []
+
+    for col in df.columns:
+        if col in exclude:
+            continue
+        series = df[col]
+
+        if _is_string_column(series):
+            if n_rows and series.nunique(dropna=True) <= category_max_ratio * n_rows:
+                converted[col] = series.astype('category')
+                category_columns.append(col)
+
+        elif series.dtype == np.float64 and float_tolerance is not None:
+            values = series.to_numpy()
+            if _fits_float32(values, float_tolerance):
+                converted[col] = pd.Series(values.astype(np.float32), index=df.index, name=col)
+                float32_columns.append(col)
+
+    if converted:
+        # Ghép một lần thay vì gán từng cột (tránh frame bị phân mảnh)
+        df = pd.concat(
+            [converted[col] if col in converted else df[col] for col in df.columns],
+            axis=1
+        )
+
+    report = {
+        'bytes_before': bytes_before,
+        'bytes_after': frame_bytes(df) if converted else bytes_before,
+        'category_columns': category_columns,
+        'float32_columns': float32_columns,
+    }
+    return df, report
+
+
+def format_compaction_report(reports):
+    """
+    Format báo cáo thu gọn của các dataset
+
+    Args:
+        reports: Dict {tên dataset: report từ compact_frame}
+
+    Returns:
+        str: Markdown
+    """
+    mb = 1024 * 1024
+    lines = []
+    for name, report in reports.items():
+        before = report['bytes_before'] / mb
+        after = report['bytes_after'] / mb
+        saved = 1 - report['bytes_after'] / report['bytes_before'] if report['bytes_before'] else 0
+        lines.append(
+            f"**{name}**: {before:,.1f} MB → {after:,.1f} MB (-{saved:.0%}; "
+            f"{len(report['category_columns'])} category, {len(report['float32_columns'])} float32)"
+        )
+    return "  \n".join(lines)
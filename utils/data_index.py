@@ -0,0 +1,961 @@
+"""
+Data Index Module
+Các chỉ mục dựng sẵn một lần lúc load để tra cứu nhanh trên DataFrame
+"""
+
+import weakref
+import threading
+import warnings
+import numpy as np
+import pandas as pd
+from utils.filter_engine import compile_filters, range_filters
+
+# Chỉ mục đã dựng cho các frame dùng chung: (id(frame), tên class) -> index
+# Giữ weakref để chỉ mục được giải phóng cùng kho dữ liệu
+_REGISTRY = weakref.WeakValueDictionary()
+
+# Chủ sở hữu dựng chỉ mục lười cho frame: (id(frame), tên class) -> weakref(owner)
+# owner.build_index(frame, index_class) dựng chỉ mục ở lần tra đầu tiên
+_OWNERS = {}
+
+# Cột key kỳ số nguyên thêm lúc load: year * 4 + quý (năm 2100 vẫn vừa int16)
+PERIOD_ID_COLUMN = 'PERIOD_ID'
+PERIOD_ID_DTYPE = np.int16
+
+# Cột ngành cho xếp hạng percentile trong ngành (PercentileRanks)
+INDUSTRY_COLUMN = 'LEVEL2_NAME_EN'
+
+
+def quarter_number(quarter):
+    """
+    Lấy số quý (1-4) từ giá trị QUARTER
+
+    Args:
+        quarter: 'Q3', '2024Q3' hoặc 3
+
+    Returns:
+        int: Số quý
+    """
+    return int(str(quarter)[-1])
+
+
+def period_key(year, quarter):
+    """Key số nguyên tăng dần theo thời gian cho (năm, quý): year * 4 + quý"""
+    return int(year) * 4 + quarter_number(quarter)
+
+
+def _parse_periods(df):
+    """(năm, quý) dạng float theo dòng, NaN nếu YEAR/QUARTER không đọc được hoặc quý ngoài 1-4"""
+    years = pd.to_numeric(df['YEAR'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    quarters = pd.to_numeric(df['QUARTER'].astype(str).str[-1], errors='coerce')
+    quarters = quarters.where(quarters.between(1, 4)).to_numpy(dtype=np.float64, na_value=np.nan)
+    return years, quarters
+
+
+def valid_period_mask(df):
+    """
+    Mask các dòng có YEAR/QUARTER hợp lệ
+
+    Args:
+        df: DataFrame có cột YEAR và QUARTER
+
+    Returns:
+        np.ndarray: Mảng bool độ dài len(df)
+    """
+    years, quarters = _parse_periods(df)
+    return ~np.isnan(years) & ~np.isnan(quarters)
+
+
+def _compute_period_keys(df):
+    """Tính key kỳ từ YEAR/QUARTER (thao tác chuỗi, chỉ dùng lúc load); raise nếu có kỳ không hợp lệ"""
+    years, quarters = _parse_periods(df)
+    invalid = np.isnan(years) | np.isnan(quarters)
+    if invalid.any():
+        examples = df.loc[invalid, ['YEAR', 'QUARTER']].drop_duplicates().head(3).values.tolist()
+        raise ValueError(f"YEAR/QUARTER không hợp lệ ở {int(invalid.sum())} dòng, VD {examples}")
+    return years.astype(np.int64) * 4 + quarters.astype(np.int64)
+
+
+def period_keys(df):
+    """
+    Phiên bản vector của period_key cho cả DataFrame
+
+    Dùng cột PERIOD_ID nếu loader đã thêm, ngược lại tính từ YEAR/QUARTER.
+
+    Args:
+        df: DataFrame có cột PERIOD_ID hoặc YEAR và QUARTER
+
+    Returns:
+        np.ndarray: Mảng số nguyên, mỗi dòng một key
+    """
+    if PERIOD_ID_COLUMN in df.columns:
+        return df[PERIOD_ID_COLUMN].to_numpy()
+    return _compute_period_keys(df)
+
+
+def add_period_id(df):
+    """
+    Thêm cột PERIOD_ID (year * 4 + quý, int16) vào frame vừa load
+
+    Args:
+        df: DataFrame có cột YEAR và QUARTER
+
+    Returns:
+        DataFrame: Chính frame đó (đã thêm cột)
+    """
+    if {'YEAR', 'QUARTER'}.issubset(df.columns):
+        df[PERIOD_ID_COLUMN] = _compute_period_keys(df).astype(PERIOD_ID_DTYPE)
+    return df
+
+
+def sort_by_period(df, by_symbol=True):
+    """
+    Thêm PERIOD_ID và sắp xếp frame vừa load theo thời gian
+
+    Dòng có YEAR/QUARTER không đọc được bị bỏ (kèm cảnh báo) thay vì bị gán
+    vào một kỳ không có thật.
+
+    Args:
+        df: DataFrame vừa load
+        by_symbol: Sắp xếp theo (SYMBOL, PERIOD_ID) thay vì chỉ PERIOD_ID
+
+    Returns:
+        DataFrame: Frame đã sắp xếp
+    """
+    if {'YEAR', 'QUARTER'}.issubset(df.columns):
+        valid = valid_period_mask(df)
+        if not valid.all():
+            warnings.warn(f"Bỏ {int((~valid).sum())} dòng có YEAR/QUARTER không hợp lệ", stacklevel=2)
+            df = df[valid].copy()
+    df = add_period_id(df)
+    if PERIOD_ID_COLUMN not in df.columns:
+        return df
+    sort_cols = ['SYMBOL', PERIOD_ID_COLUMN] if by_symbol and 'SYMBOL' in df.columns else [PERIOD_ID_COLUMN]
+    return df.sort_values(sort_cols, kind='stable')
+
+
+def format_period(key):
+    """
+    Chuyển key PERIOD_ID thành chuỗi kỳ 'YYYYQX' (ngược với parse_period)
+
+    Args:
+        key: VD 8099 (year * 4 + quý)
+
+    Returns:
+        str: VD '2024Q3'
+    """
+    key = int(key)
+    return f"{(key - 1) // 4}Q{(key - 1) % 4 + 1}"
+
+
+def parse_period(period):
+    """
+    Chuyển chuỗi kỳ 'YYYYQX' thành key PERIOD_ID
+
+    Args:
+        period: VD '2024Q3'
+
+    Returns:
+        int: Key kỳ
+    """
+    return period_key(period[:4], period[-1])
+
+
+class QuarterIndex:
+    """
+    Chỉ mục (YEAR, QUARTER) -> các dòng của kỳ đó
+
+    Vị trí các dòng được sắp xếp ổn định theo kỳ, nên mỗi kỳ là một
+    đoạn liên tiếp [start, stop) của mảng vị trí. Frame gốc giữ nguyên
+    thứ tự (SYMBOL, YEAR, QUARTER) và không bị nhân bản.
+    """
+
+    def __init__(self, df):
+        """
+        Args:
+            df: DataFrame có cột YEAR và QUARTER
+        """
+        self.frame = df
+
+        years = df['YEAR'].to_numpy(dtype=np.int64)
+        keys = period_keys(df)
+
+        # Sort ổn định: trong cùng một kỳ vẫn giữ thứ tự SYMBOL
+        self._order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[self._order]
+        unique_keys, starts = np.unique(sorted_keys, return_index=True)
+        stops = np.append(starts[1:], len(sorted_keys))
+
+        quarter_labels = df['QUARTER'].to_numpy()
+        self._bounds = {}
+        self._labels = {}
+        for key, start, stop in zip(unique_keys.tolist(), starts.tolist(), stops.tolist()):
+            self._bounds[key] = (start, stop)
+            first_row = self._order[start]
+            self._labels[key] = (int(years[first_row]), quarter_labels[first_row])
+
+        self._keys = unique_keys.tolist()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, period):
+        year, quarter = period
+        return period_key(year, quarter) in self._bounds
+
+    def periods(self):
+        """
+        Danh sách các kỳ theo thứ tự thời gian
+
+        Returns:
+            list: [(year, quarter), ...] với quarter là giá trị gốc của cột QUARTER
+        """
+        return [self._labels[key] for key in self._keys]
+
+    def years(self):
+        """Danh sách năm có dữ liệu (mới nhất trước)"""
+        return sorted({year for year, _ in self._labels.values()}, reverse=True)
+
+    def quarters_in_year(self, year):
+        """Danh sách quý có dữ liệu trong năm (mới nhất trước)"""
+        return [quarter for y, quarter in reversed(self.periods()) if y == year]
+
+    def latest_period(self):
+        """
+        Kỳ gần nhất có dữ liệu
+
+        Returns:
+            tuple: (year, quarter) hoặc None nếu frame rỗng
+        """
+        if not self._keys:
+            return None
+        return self._labels[self._keys[-1]]
+
+    def positions(self, year, quarter):
+        """Vị trí (iloc) các dòng thuộc kỳ, mảng rỗng nếu không có"""
+        bounds = self._bounds.get(period_key(year, quarter))
+        if bounds is None:
+            return self._order[:0]
+        start, stop = bounds
+        return self._order[start:stop]
+
+    def get_period(self, year, quarter):
+        """
+        Lấy dữ liệu của một kỳ
+
+        Args:
+            year: Năm
+            quarter: Quý ('Q3', '2024Q3' hoặc 3)
+
+        Returns:
+            DataFrame: Các dòng của kỳ (rỗng nếu không có)
+        """
+        return self.frame.take(self.positions(year, quarter))
+
+    def get_latest(self):
+        """Dữ liệu của kỳ gần nhất"""
+        latest = self.latest_period()
+        if latest is None:
+            return self.frame.iloc[:0]
+        return self.get_period(*latest)
+
+
+class SymbolIndex:
+    """
+    Chỉ mục SYMBOL -> đoạn dòng [start, stop) của mã đó
+
+    Frame từ loader đã sort theo (SYMBOL, YEAR, QUARTER) nên mỗi mã là một
+    đoạn liên tiếp và tra cứu chỉ là một lát cắt iloc (không copy).
+    Frame chưa sort vẫn dùng được qua mảng vị trí sắp xếp ổn định.
+    """
+
+    def __init__(self, df):
+        """
+        Args:
+            df: DataFrame có cột SYMBOL
+        """
+        self.frame = df
+
+        codes, uniques = pd.factorize(df['SYMBOL'])
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        n_missing = int((codes < 0).sum())
+
+        # factorize đánh mã theo thứ tự xuất hiện: frame đã nhóm theo SYMBOL
+        # khi và chỉ khi codes không giảm
+        grouped = n_missing == 0 and bool(np.all(codes[1:] >= codes[:-1]))
+        self._order = None if grouped else np.argsort(codes, kind='stable')
+
+        stops = n_missing + np.cumsum(counts)
+        starts = stops - counts
+        self._bounds = dict(zip(uniques.tolist(), zip(starts.tolist(), stops.tolist())))
+
+    def __len__(self):
+        return len(self._bounds)
+
+    def __contains__(self, symbol):
+        return symbol in self._bounds
+
+    def symbols(self):
+        """Danh sách mã đã sắp xếp"""
+        return sorted(self._bounds)
+
+    def bounds(self, symbol):
+        """Đoạn (start, stop) của mã, None nếu không có"""
+        return self._bounds.get(symbol)
+
+    def positions(self, symbol):
+        """Vị trí (iloc) các dòng của mã, mảng rỗng nếu không có"""
+        bounds = self._bounds.get(symbol, (0, 0))
+        if self._order is None:
+            return np.arange(*bounds)
+        return self._order[bounds[0]:bounds[1]]
+
+    def get(self, symbol):
+        """
+        Lấy tất cả các dòng của một mã
+
+        Args:
+            symbol: Mã cổ phiếu/ngành
+
+        Returns:
+            DataFrame: Các dòng của mã (rỗng nếu không có)
+        """
+        if self._order is None:
+            start, stop = self._bounds.get(symbol, (0, 0))
+            return self.frame.iloc[start:stop]
+        return self.frame.take(self.positions(symbol))
+
+    def get_many(self, symbols):
+        """
+        Lấy các dòng của nhiều mã trong một lần take
+
+        Args:
+            symbols: List mã (mã không tồn tại bị bỏ qua)
+
+        Returns:
+            DataFrame: Các dòng theo thứ tự mã trong symbols
+        """
+        parts = [self.positions(symbol) for symbol in symbols if symbol in self._bounds]
+        if not parts:
+            return self.frame.iloc[:0]
+        return self.frame.take(np.concatenate(parts))
+
+
+class LatestSnapshot:
+    """
+    Dòng của kỳ gần nhất cho từng mã, tính một lần cho cả frame
+
+    Thay cho việc gọi idxmax theo từng mã: sort một lần theo (SYMBOL, kỳ)
+    và lấy dòng cuối của mỗi nhóm.
+    """
+
+    def __init__(self, df):
+        """
+        Args:
+            df: DataFrame có cột SYMBOL, YEAR, QUARTER
+        """
+        self.frame = df
+
+        codes, _ = pd.factorize(df['SYMBOL'])
+        order = np.lexsort((period_keys(df), codes))
+        sorted_codes = codes[order]
+
+        # Dòng cuối của mỗi nhóm mã = kỳ gần nhất (bỏ qua SYMBOL thiếu)
+        is_last = np.append(sorted_codes[1:] != sorted_codes[:-1], True) & (sorted_codes >= 0)
+        self.positions = order[is_last]
+
+        self.snapshot = df.take(self.positions)
+        self._rows = {symbol: i for i, symbol in enumerate(self.snapshot['SYMBOL'].tolist())}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, symbol):
+        return symbol in self._rows
+
+    def get(self, symbol):
+        """
+        Dòng gần nhất của một mã
+
+        Returns:
+            Series hoặc None nếu không có mã
+        """
+        i = self._rows.get(symbol)
+        if i is None:
+            return None
+        return self.snapshot.iloc[i]
+
+    def get_many(self, symbols):
+        """
+        Dòng gần nhất của nhiều mã
+
+        Args:
+            symbols: List mã (mã không tồn tại bị bỏ qua)
+
+        Returns:
+            DataFrame: Theo thứ tự mã trong symbols
+        """
+        rows = [self._rows[symbol] for symbol in symbols if symbol in self._rows]
+        return self.snapshot.iloc[rows]
+
+
+class _SortedColumn:
+    """Một cột số của ScreeningIndex: các dòng của từng kỳ sắp theo giá trị (NaN cuối)"""
+
+    def __init__(self, values, local, valid_stops):
+        self.values = values            # giá trị đã sắp, theo đoạn kỳ
+        self.local = local              # vị trí trong kỳ (theo thứ tự kỳ) của từng giá trị
+        self.valid_stops = valid_stops  # hết đoạn không NaN của mỗi kỳ
+
+    def _bound(self, value):
+        # So sánh theo kiểu của cột (float32 như so sánh trên Series gốc)
+        if value is not None and self.values.dtype.kind == 'f':
+            return self.values.dtype.type(value)
+        return value
+
+    def range(self, segment, start, min_val, max_val):
+        """Đoạn [i, j) của các giá trị trong [min_val, max_val] của một kỳ"""
+        stop = self.valid_stops[segment]
+        values = self.values[start:stop]
+        i = start if min_val is None else start + np.searchsorted(values, self._bound(min_val), side='left')
+        j = stop if max_val is None else start + np.searchsorted(values, self._bound(max_val), side='right')
+        return i, max(i, j)
+
+
+class ScreeningIndex:
+    """
+    Chỉ mục sàng lọc theo khoảng giá trị cho từng kỳ
+
+    Với mỗi cột số (dựng lần đầu khi được dùng), các dòng của từng kỳ được
+    sắp theo giá trị bằng một lần lexsort (kỳ, giá trị) cho cả frame. Tiêu chí
+    (min, max) được tra bằng searchsorted thành một đoạn vị trí, đánh dấu vào
+    bitmap của kỳ rồi AND giữa các tiêu chí. Kết quả giống screen_stocks trên
+    frame của kỳ (cùng tập dòng, cùng thứ tự).
+    """
+
+    def __init__(self, df):
+        """
+        Args:
+            df: DataFrame có cột YEAR và QUARTER
+        """
+        self.frame = df
+
+        keys = period_keys(df)
+        self._order = np.argsort(keys, kind='stable')
+        unique_keys, starts, counts = np.unique(keys[self._order], return_index=True, return_counts=True)
+        self._segments = {key: i for i, key in enumerate(unique_keys.tolist())}
+        self._starts = starts
+        self._counts = counts
+        self._segment_ids = np.repeat(np.arange(len(unique_keys)), counts)
+
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    def _column(self, column):
+        """_SortedColumn của cột, None nếu cột không phải số"""
+        if column in self._columns:
+            return self._columns[column]
+
+        series = self.frame[column]
+        sorted_column = None
+        if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            values = series.to_numpy()
+            if values.dtype.kind not in 'iuf':
+                values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            values = values[self._order]
+
+            # Sắp theo (kỳ, giá trị); NaN nằm cuối đoạn của kỳ
+            perm = np.lexsort((values, self._segment_ids))
+            sorted_values = values[perm]
+            local = (perm - self._starts[self._segment_ids[perm]]).astype(np.int32)
+            valid = ~np.isnan(sorted_values) if sorted_values.dtype.kind == 'f' else np.ones(len(perm), dtype=bool)
+            valid_stops = self._starts + np.add.reduceat(valid, self._starts) if len(perm) else self._starts
+            sorted_column = _SortedColumn(sorted_values, local, valid_stops)
+
+        with self._lock:
+            return self._columns.setdefault(column, sorted_column)
+
+    def _segment(self, year, quarter):
+        if year is None:
+            if not self._segments:
+                return None
+            return len(self._segments) - 1
+        return self._segments.get(period_key(year, quarter))
+
+    def mask(self, criteria, year=None, quarter=None):
+        """
+        Bitmap các dòng của kỳ thỏa mãn tất cả tiêu chí
+
+        Args:
+            criteria: Dict {cột: (min, max)}, min/max là None thì bỏ qua cận đó;
+                      cột không có trong frame bị bỏ qua
+            year: Năm (mặc định kỳ gần nhất)
+            quarter: Quý ('Q3', '2024Q3' hoặc 3)
+
+        Returns:
+            tuple: (vị trí iloc các dòng của kỳ theo thứ tự gốc, mask bool cùng độ dài)
+        """
+        segment = self._segment(year, quarter)
+        if segment is None:
+            return self._order[:0], np.zeros(0, dtype=bool)
+
+        start = self._starts[segment]
+        count = self._counts[segment]
+        positions = self._order[start:start + count]
+        mask = np.ones(count, dtype=bool)
+        fallback = {}
+
+        for column, (min_val, max_val) in criteria.items():
+            if column not in self.frame.columns or (min_val is None and max_val is None):
+                continue
+            sorted_column = self._column(column)
+            if sorted_column is None:
+                fallback[column] = (min_val, max_val)
+                continue
+            i, j = sorted_column.range(segment, start, min_val, max_val)
+            hits = np.zeros(count, dtype=bool)
+            hits[sorted_column.local[i:j]] = True
+            mask &= hits
+            if not mask.any():
+                break
+
+        if fallback and mask.any():
+            # Cột không phải số: so sánh bằng filter engine trên các dòng của kỳ
+            mask &= compile_filters(range_filters(fallback)).mask(self.frame.take(positions))
+        return positions, mask
+
+    def screen(self, criteria, year=None, quarter=None):
+        """
+        Các dòng của kỳ thỏa mãn tất cả tiêu chí
+
+        Args:
+            criteria: Dict {cột: (min, max)}
+            year: Năm (mặc định kỳ gần nhất)
+            quarter: Quý
+
+        Returns:
+            DataFrame: Các dòng thỏa mãn, giữ thứ tự gốc
+        """
+        positions, mask = self.mask(criteria, year, quarter)
+        return self.frame.take(positions[mask])
+
+
+class PeriodPanel:
+    """
+    Bố cục kỳ x mã của frame: grid[p, s] là vị trí dòng của mã s ở kỳ p (-1 nếu không có)
+
+    Kỳ sắp tăng dần, mã sắp theo thứ tự chữ cái. Mọi phép tính nhiều kỳ (sàng
+    lọc lịch sử) chỉ cần một phép gather theo grid thay cho lặp từng kỳ.
+
+    Mỗi ô giữ một dòng: cặp (SYMBOL, kỳ) lặp lại thì giữ dòng cuối trong frame
+    (số dòng bị bỏ qua ở duplicate_rows, có cảnh báo); dòng thiếu SYMBOL không
+    có trong grid. PercentileRanks xếp hạng trên mọi dòng của kỳ nên không bị
+    ảnh hưởng.
+    """
+
+    def __init__(self, df):
+        """
+        Args:
+            df: DataFrame có cột SYMBOL, YEAR, QUARTER
+        """
+        self.frame = df
+
+        symbol_codes, symbols = pd.factorize(df['SYMBOL'], sort=True)
+        keys = period_keys(df)
+        self.period_keys = np.unique(keys)
+        period_codes = np.searchsorted(self.period_keys, keys)
+
+        self.symbols = symbols
+        self.periods = [format_period(key) for key in self.period_keys.tolist()]
+        self.grid = np.full((len(self.period_keys), len(symbols)), -1, dtype=np.int32)
+        has_symbol = symbol_codes >= 0
+        self.grid[period_codes[has_symbol], symbol_codes[has_symbol]] = np.flatnonzero(has_symbol)
+        self.present = self.grid >= 0
+
+        self.duplicate_rows = int(has_symbol.sum() - self.present.sum())
+        if self.duplicate_rows:
+            warnings.warn(
+                f"PeriodPanel: {self.duplicate_rows} dòng trùng cặp (SYMBOL, kỳ), giữ dòng cuối của mỗi cặp",
+                stacklevel=2,
+            )
+
+    @property
+    def shape(self):
+        """(số kỳ, số mã)"""
+        return self.grid.shape
+
+    def gather(self, row_values, fill=np.nan):
+        """
+        Trải mảng theo dòng của frame thành ma trận kỳ x mã
+
+        Args:
+            row_values: Mảng độ dài len(frame)
+            fill: Giá trị cho ô không có dòng
+
+        Returns:
+            np.ndarray: Ma trận (số kỳ x số mã)
+        """
+        values = np.asarray(row_values)[self.grid]
+        if fill is not None:
+            values = np.where(self.present, values, fill)
+        return values
+
+    def values(self, column):
+        """
+        Ma trận kỳ x mã của một cột số (float64, NaN nếu thiếu)
+
+        Args:
+            column: Tên cột
+
+        Returns:
+            np.ndarray
+        """
+        series = self.frame[column]
+        if not pd.api.types.is_numeric_dtype(series.dtype):
+            series = pd.to_numeric(series, errors='coerce')
+        return self.gather(series.to_numpy(dtype=np.float64, na_value=np.nan))
+
+    def window(self, last_n=None, end=None):
+        """
+        Đoạn kỳ [start, stop) của last_n kỳ kết thúc tại kỳ end
+
+        Args:
+            last_n: Số kỳ (mặc định tất cả)
+            end: (year, quarter) kỳ cuối (mặc định kỳ gần nhất)
+
+        Returns:
+            tuple: (start, stop)
+        """
+        stop = len(self.period_keys)
+        if end is not None:
+            stop = int(np.searchsorted(self.period_keys, period_key(*end), side='right'))
+        start = 0 if last_n is None else max(0, stop - int(last_n))
+        return start, stop
+
+
+class PercentileRanks:
+    """
+    Percentile và thứ hạng theo kỳ của mọi mã cho từng chỉ tiêu
+
+    Hai phạm vi: 'market' (mọi mã trong kỳ) và 'industry' (các mã cùng ngành
+    INDUSTRY_COLUMN trong kỳ). Mỗi cột được xếp hạng một lần cho tất cả các kỳ
+    bằng groupby rank (lần đầu khi được dùng) và lưu gọn theo dòng của frame:
+    percentile float32, thứ hạng/số mã uint16 (0 = không có dữ liệu). Tra
+    badge percentile hay bảng top N chỉ còn là phép lấy phần tử.
+
+    Percentile = tỷ lệ % mã có giá trị nhỏ hơn hẳn trong nhóm, giống
+    calculate_percentile trên frame của kỳ (hoặc của ngành trong kỳ). Nhóm gồm
+    mọi dòng của kỳ, kể cả dòng trùng (SYMBOL, kỳ) hay thiếu SYMBOL, như khi
+    tính trên frame của kỳ; tra theo mã (lookup) dùng dòng trong PeriodPanel.
+    """
+
+    def __init__(self, panel, group_column=INDUSTRY_COLUMN):
+        """
+        Args:
+            panel: PeriodPanel của frame
+            group_column: Cột ngành cho phạm vi 'industry'
+        """
+        self.frame = panel.frame
+        self.panel = panel
+        self.group_column = group_column
+
+        # Kỳ của từng dòng (mọi dòng, không chỉ các ô của grid)
+        period_codes = np.searchsorted(panel.period_keys, period_keys(self.frame)).astype(np.int64)
+        self._groups = {'market': period_codes}
+
+        # Dòng của từng kỳ theo thứ tự gốc, cho top()
+        self._period_order = np.argsort(period_codes, kind='stable')
+        self._period_starts = np.searchsorted(period_codes[self._period_order], np.arange(len(panel.period_keys) + 1))
+
+        if group_column in self.frame.columns:
+            industry_codes, self.industries = pd.factorize(self.frame[group_column], sort=True)
+            industry_groups = period_codes * max(len(self.industries), 1) + industry_codes
+            industry_groups[(industry_codes < 0) | (period_codes < 0)] = -1
+            self._groups['industry'] = industry_groups
+            self._industry_codes = industry_codes
+        else:
+            self.industries = pd.Index([])
+            self._industry_codes = None
+
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    def _column(self, column):
+        """{phạm vi: (percentile, hạng giảm dần, hạng tăng dần, số mã)} theo dòng của frame"""
+        if column in self._columns:
+            return self._columns[column]
+
+        series = self.frame[column]
+        if not pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+            series = pd.to_numeric(series, errors='coerce')
+        values = pd.Series(series.to_numpy(dtype=np.float64, na_value=np.nan))
+
+        ranks = {}
+        for scope, groups in self._groups.items():
+            grouped = values.where(groups >= 0).groupby(groups)
+            low = grouped.rank(method='min').to_numpy()
+            high = grouped.rank(method='max').to_numpy()
+            size = grouped.transform('count').to_numpy(dtype=np.float64)
+            valid = ~np.isnan(low)
+            with np.errstate(invalid='ignore'):
+                percentile = ((low - 1) / size * 100).astype(np.float32)
+            arrays = (
+                percentile,
+                np.where(valid, size - high + 1, 0).astype(np.uint16),
+                np.where(valid, low, 0).astype(np.uint16),
+                np.where(valid, size, 0).astype(np.uint16),
+            )
+            for array in arrays:
+                array.setflags(write=False)
+            ranks[scope] = arrays
+
+        with self._lock:
+            return self._columns.setdefault(column, ranks)
+
+    def precompute(self, columns):
+        """
+        Xếp hạng trước các cột (cột không có trong frame bị bỏ qua)
+
+        Args:
+            columns: Danh sách cột
+        """
+        for column in columns:
+            if column in self.frame.columns:
+                self._column(column)
+
+    def _scope(self, column, scope):
+        if scope not in self._groups:
+            raise KeyError(f"Phạm vi xếp hạng không hỗ trợ: {scope}")
+        return self._column(column)[scope]
+
+    def percentile(self, column, scope='market'):
+        """
+        Percentile (0-100) của từng dòng trong nhóm của nó
+
+        Args:
+            column: Tên cột
+            scope: 'market' hoặc 'industry'
+
+        Returns:
+            np.ndarray: float32 theo dòng của frame (NaN nếu thiếu dữ liệu), chỉ đọc
+        """
+        return self._scope(column, scope)[0]
+
+    def rank(self, column, scope='market', ascending=False):
+        """
+        Thứ hạng của từng dòng trong nhóm (1 = lớn nhất, hoặc nhỏ nhất nếu ascending)
+
+        Args:
+            column: Tên cột
+            scope: 'market' hoặc 'industry'
+            ascending: Xếp từ nhỏ đến lớn
+
+        Returns:
+            np.ndarray: uint16 theo dòng của frame (0 nếu thiếu dữ liệu), chỉ đọc
+        """
+        return self._scope(column, scope)[2 if ascending else 1]
+
+    def _period(self, year, quarter):
+        """Hàng kỳ trong panel (mặc định kỳ gần nhất), None nếu không có"""
+        keys = self.panel.period_keys
+        if not len(keys):
+            return None
+        if year is None:
+            return len(keys) - 1
+        key = period_key(year, quarter)
+        p = int(np.searchsorted(keys, key))
+        return p if p < len(keys) and keys[p] == key else None
+
+    def position(self, symbol, year=None, quarter=None):
+        """Vị trí iloc dòng của mã ở kỳ (mặc định kỳ gần nhất), None nếu không có"""
+        p = self._period(year, quarter)
+        if p is None or symbol not in self.panel.symbols:
+            return None
+        row = self.panel.grid[p, self.panel.symbols.get_loc(symbol)]
+        return int(row) if row >= 0 else None
+
+    def lookup(self, symbol, columns, year=None, quarter=None):
+        """
+        Percentile và thứ hạng của một mã ở một kỳ cho nhiều chỉ tiêu
+
+        Args:
+            symbol: Mã
+            columns: Danh sách chỉ tiêu (cột không có trong frame bị bỏ qua)
+            year: Năm (mặc định kỳ gần nhất)
+            quarter: Quý
+
+        Returns:
+            DataFrame: Index chỉ tiêu, cột PERCENTILE_MARKET, RANK_MARKET,
+            COUNT_MARKET và PERCENTILE_INDUSTRY, RANK_INDUSTRY, COUNT_INDUSTRY
+            (nếu có cột ngành); rỗng nếu mã không có dòng ở kỳ
+        """
+        row = self.position(symbol, year, quarter)
+        columns = [column for column in columns if column in self.frame.columns]
+        if row is None:
+            columns = []
+
+        data = {}
+        for scope in self._groups:
+            suffix = scope.upper()
+            entries = [self._scope(column, scope) for column in columns]
+            data[f'PERCENTILE_{suffix}'] = [float(entry[0][row]) for entry in entries]
+            data[f'RANK_{suffix}'] = [int(entry[1][row]) for entry in entries]
+            data[f'COUNT_{suffix}'] = [int(entry[3][row]) for entry in entries]
+        return pd.DataFrame(data, index=pd.Index(columns, name='METRIC'))
+
+    def top(self, column, n, year=None, quarter=None, ascending=False, industry=None):
+        """
+        N dòng đứng đầu của kỳ theo một chỉ tiêu (tra thứ hạng đã tính sẵn)
+
+        Giống frame_kỳ.nlargest(n, column) (nsmallest nếu ascending): bằng nhau
+        thì dòng đứng trước trong frame xếp trước, dòng NaN chỉ lấy (theo thứ
+        tự frame) khi không đủ n dòng có giá trị.
+
+        Args:
+            column: Tên cột
+            n: Số dòng
+            year: Năm (mặc định kỳ gần nhất)
+            quarter: Quý
+            ascending: Lấy nhỏ nhất thay vì lớn nhất
+            industry: Chỉ xếp hạng trong một ngành (giá trị của cột ngành)
+
+        Returns:
+            DataFrame: Các dòng theo thứ hạng
+        """
+        p = self._period(year, quarter)
+        if p is None:
+            return self.frame.iloc[:0]
+
+        rows = self._period_order[self._period_starts[p]:self._period_starts[p + 1]]
+        scope = 'market'
+        if industry is not None:
+            if self._industry_codes is None or industry not in self.industries:
+                return self.frame.iloc[:0]
+            scope = 'industry'
+            rows = rows[self._industry_codes[rows] == self.industries.get_loc(industry)]
+
+        ranks = self.rank(column, scope, ascending)[rows]
+        keep = (ranks > 0) & (ranks <= n)
+        selected = rows[keep][np.argsort(ranks[keep], kind='stable')][:n]
+        if len(selected) < n:
+            selected = np.concatenate([selected, rows[ranks == 0][:n - len(selected)]])
+        return self.frame.take(selected)
+
+
+def register_index(index):
+    """Đăng ký chỉ mục để các helper nhận frame tìm lại được"""
+    _REGISTRY[(id(index.frame), type(index).__name__)] = index
+    return index
+
+
+def register_index_owner(df, index_class, owner):
+    """
+    Đăng ký owner dựng chỉ mục lười cho frame
+
+    find_index gọi owner.build_index(df, index_class) khi chỉ mục chưa được dựng.
+    Chỉ giữ weakref tới owner, mục đăng ký tự xoá khi owner bị giải phóng.
+
+    Args:
+        df: DataFrame
+        index_class: Class chỉ mục (VD PeriodPanel)
+        owner: Đối tượng có build_index (VD DatasetStore)
+    """
+    key = (id(df), index_class.__name__)
+
+    def _forget(ref):
+        if _OWNERS.get(key) is ref:
+            _OWNERS.pop(key, None)
+
+    _OWNERS[key] = weakref.ref(owner, _forget)
+
+
+def find_index(df, index_class):
+    """
+    Tìm chỉ mục đã đăng ký cho frame (dựng lần đầu nếu frame có owner)
+
+    Args:
+        df: DataFrame
+        index_class: SymbolIndex, QuarterIndex, LatestSnapshot, ScreeningIndex, PeriodPanel
+                     hoặc PercentileRanks
+
+    Returns:
+        Chỉ mục hoặc None nếu frame chưa được đánh chỉ mục
+    """
+    key = (id(df), index_class.__name__)
+    index = _REGISTRY.get(key)
+    if index is not None and index.frame is df:
+        return index
+
+    owner_ref = _OWNERS.get(key)
+    owner = owner_ref() if owner_ref is not None else None
+    if owner is not None:
+        # Owner tự kiểm tra frame (id có thể bị frame khác dùng lại)
+        return owner.build_index(df, index_class)
+    return None
+
+
+def get_symbol_rows(df, symbol):
+    """
+    Lấy các dòng của một mã: O(1) nếu frame đã có SymbolIndex,
+    ngược lại lọc bằng mask như cũ
+
+    Args:
+        df: DataFrame có cột SYMBOL
+        symbol: Mã cần lấy
+
+    Returns:
+        DataFrame
+    """
+    index = find_index(df, SymbolIndex)
+    if index is not None:
+        return index.get(symbol)
+    return df[df['SYMBOL'] == symbol]
+
+
+def get_symbols_rows(df, symbols):
+    """Phiên bản nhiều mã của get_symbol_rows"""
+    index = find_index(df, SymbolIndex)
+    if index is not None:
+        return index.get_many(symbols)
+    return df[df['SYMBOL'].isin(symbols)]
+
+
+def latest_snapshot(df):
+    """
+    LatestSnapshot của frame: dùng bản đã dựng sẵn (theo phiên bản dữ liệu
+    trong kho) nếu có, ngược lại tính một lần cho frame này
+
+    Args:
+        df: DataFrame có cột SYMBOL, YEAR, QUARTER
+
+    Returns:
+        LatestSnapshot
+    """
+    snapshot = find_index(df, LatestSnapshot)
+    if snapshot is not None:
+        return snapshot
+    return LatestSnapshot(df)
+
+
+def filter_period_range(df, start_key, end_key):
+    """
+    Lọc các dòng có key kỳ trong [start_key, end_key]
+
+    Frame đã sort theo PERIOD_ID (market) được cắt lát bằng tìm nhị phân;
+    frame sort theo (SYMBOL, kỳ) so sánh trên cột số nguyên, không cắt chuỗi.
+
+    Args:
+        df: DataFrame có cột PERIOD_ID hoặc YEAR và QUARTER
+        start_key: Key kỳ bắt đầu (xem period_key)
+        end_key: Key kỳ kết thúc
+
+    Returns:
+        DataFrame: Các dòng thuộc khoảng, giữ thứ tự gốc
+    """
+    keys = period_keys(df)
+    if PERIOD_ID_COLUMN in df.columns and df[PERIOD_ID_COLUMN].is_monotonic_increasing:
+        start = np.searchsorted(keys, start_key, side='left')
+        stop = np.searchsorted(keys, end_key, side='right')
+        return df.iloc[start:stop]
+
+    return df[(keys >= start_key) & (keys <= end_key)]
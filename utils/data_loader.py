@@ -7,13 +7,25 @@ import certifi
 os.environ['REQUESTS_CA_BUNDLE'] = certifi.where()
 os.environ['SSL_CERT_FILE'] = certifi.where()
 
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from pathlib import Path
 from io import BytesIO
 from google.cloud import storage
 from google.oauth2 import service_account
 import config
+from utils.data_compact import compact_frame
+from utils.parquet_cache import get_parquet_cache, read_cached_parquet
+from utils.data_index import (
+    get_symbol_rows, latest_snapshot, period_keys, filter_period_range, parse_period, sort_by_period
+)
 
 # ========== GCS CONFIGURATION ==========
 # Thay đổi các giá trị này theo GCS bucket của bạn
@@ -25,6 +37,23 @@ GCS_MARKET_FILE = f"{GCS_DATA_FOLDER}market_analysis.parquet"
 GCS_INDUSTRY_FILE = f"{GCS_DATA_FOLDER}industry_analysis.parquet"
 GCS_TICKER_FILE = f"{GCS_DATA_FOLDER}ticker_analysis.parquet"
 
+# Map tên dataset -> blob, dùng cho load_columns
+GCS_DATASETS = {
+    'market': GCS_MARKET_FILE,
+    'industry': GCS_INDUSTRY_FILE,
+    'ticker': GCS_TICKER_FILE,
+}
+
+# Cột khóa luôn được load kèm để sort/lọc theo kỳ
+KEY_COLUMNS = ['SYMBOL', 'YEAR', 'QUARTER']
+
+# Số byte cuối file được đọc trước (chứa footer parquet)
+PARQUET_TAIL_BYTES = 64 * 1024
+
+# Token đã kiểm tra gần đây: (bucket, blob) -> (token, thời điểm kiểm tra)
+_recent_tokens = {}
+_recent_tokens_lock = threading.Lock()
+
 
 def get_gcs_client():
     """
@@ -44,29 +73,159 @@ def get_gcs_client():
         raise
 
 
-@st.cache_data(ttl=3600)  # Cache 1 giờ
-def load_parquet_from_gcs(bucket_name, blob_name):
+def blob_token(blob):
+    """
+    Token nội dung của blob: generation (đổi mỗi lần ghi đè), md5 nếu thiếu
+    
+    Args:
+        blob: storage.Blob đã có metadata
+        
+    Returns:
+        str: Token, khác nhau khi và chỉ khi nội dung blob khác nhau
+    """
+    if blob.generation is not None:
+        return str(blob.generation)
+    return blob.md5_hash
+
+
+def _token_generation(token):
+    """Generation để tải đúng phiên bản đã kiểm tra (None nếu token là md5)"""
+    return int(token) if token and str(token).isdigit() else None
+
+
+def get_blob_token(bucket_name, blob_name, client=None):
+    """
+    Lấy token của blob chỉ qua metadata (không tải nội dung)
+    
+    Args:
+        bucket_name (str): Tên GCS bucket
+        blob_name (str): Tên file trong bucket
+        client: GCS client (mặc định get_gcs_client(), có thể truyền client giả để test)
+        
+    Returns:
+        str: Token của blob
+    """
+    client = client or get_gcs_client()
+    blob = client.bucket(bucket_name).get_blob(blob_name)
+    if blob is None:
+        raise FileNotFoundError(f"Không tìm thấy {blob_name} trong bucket {bucket_name}")
+    return blob_token(blob)
+
+
+def get_recent_blob_token(bucket_name, blob_name, max_age=None):
     """
-    Load file parquet trực tiếp từ GCS
+    Token của blob, chỉ hỏi lại GCS khi lần kiểm tra trước đã quá max_age giây
+    
+    Dùng cho các hàm load được gọi ở mỗi lần rerun của trang: metadata chỉ
+    được đọc tối đa một lần mỗi config.DATA_REFRESH_CHECK_SECONDS.
     
     Args:
         bucket_name (str): Tên GCS bucket
         blob_name (str): Tên file trong bucket
+        max_age: Số giây token được dùng lại (mặc định config.DATA_REFRESH_CHECK_SECONDS)
+        
+    Returns:
+        str: Token của blob
+    """
+    max_age = config.DATA_REFRESH_CHECK_SECONDS if max_age is None else max_age
+    key = (bucket_name, blob_name)
+    with _recent_tokens_lock:
+        recent = _recent_tokens.get(key)
+    if recent is not None and time.time() - recent[1] < max_age:
+        return recent[0]
+    
+    token = get_blob_token(bucket_name, blob_name)
+    with _recent_tokens_lock:
+        _recent_tokens[key] = (token, time.time())
+    return token
+
+
+def read_dataset_tokens(client=None):
+    """
+    Lấy token của cả ba dataset (chỉ đọc metadata, rẻ như HEAD)
+    
+    Args:
+        client: GCS client (mặc định get_gcs_client())
+        
+    Returns:
+        dict: {tên dataset: token}
+    """
+    client = client or get_gcs_client()
+    return {
+        name: get_blob_token(GCS_BUCKET_NAME, blob_name, client=client)
+        for name, blob_name in GCS_DATASETS.items()
+    }
+
+
+def download_blob_bytes(bucket_name, blob_name, client=None, generation=None):
+    """
+    Tải toàn bộ nội dung blob về memory
+    
+    Blob lớn hơn config.DOWNLOAD_CHUNK_BYTES được chia thành các đoạn
+    (HTTP Range) tải song song để không bị giới hạn bởi băng thông một kết nối.
+    
+    Args:
+        bucket_name (str): Tên GCS bucket
+        blob_name (str): Tên file trong bucket
+        client: GCS client (mặc định get_gcs_client())
+        generation: Generation cần tải (mặc định bản mới nhất)
+        
+    Returns:
+        bytes hoặc memoryview: Nội dung blob (blob tải theo đoạn trả về
+        memoryview trên buffer đã ghép, không copy thêm một lần)
+    """
+    client = client or get_gcs_client()
+    blob = client.bucket(bucket_name).blob(blob_name, generation=generation)
+    
+    chunk = config.DOWNLOAD_CHUNK_BYTES
+    if not chunk or config.DOWNLOAD_CHUNK_WORKERS <= 1:
+        return blob.download_as_bytes()
+    
+    if blob.size is None:
+        blob.reload()
+    if blob.size is None or blob.size <= chunk:
+        return blob.download_as_bytes()
+    return _download_ranges(blob, blob.size, chunk, config.DOWNLOAD_CHUNK_WORKERS)
+
+
+def _download_ranges(blob, size, chunk, max_workers):
+    """Tải blob theo các đoạn [start, start + chunk) song song rồi ghép vào một buffer"""
+    buffer = bytearray(size)
+    
+    def fetch(start):
+        # GCS dùng end inclusive
+        end = min(size, start + chunk)
+        data = blob.download_as_bytes(start=start, end=end - 1)
+        if len(data) != end - start:
+            raise IOError(f"Đoạn {start}-{end} của {blob.name} bị thiếu dữ liệu ({len(data)} bytes)")
+        buffer[start:end] = data
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # list() để lỗi của đoạn bất kỳ được raise ra ngoài
+        list(pool.map(fetch, range(0, size, chunk)))
+    # Không bytes(buffer): tránh giữ hai bản blob cùng lúc trong memory
+    return memoryview(buffer)
+
+
+def fetch_parquet_from_gcs(bucket_name, blob_name, client=None, generation=None):
+    """
+    Đọc file parquet trực tiếp từ GCS (không cache)
+    
+    Args:
+        bucket_name (str): Tên GCS bucket
+        blob_name (str): Tên file trong bucket
+        client: GCS client (mặc định get_gcs_client())
+        generation: Generation cần tải (mặc định bản mới nhất)
         
     Returns:
         pd.DataFrame: DataFrame đã load
     """
     try:
-        # Khởi tạo GCS client
-        client = get_gcs_client()
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(blob_name)
-        
         # Download file content vào memory
-        content = blob.download_as_bytes()
+        content = download_blob_bytes(bucket_name, blob_name, client=client, generation=generation)
         
-        # Load parquet từ bytes
-        df = pd.read_parquet(BytesIO(content))
+        # Load parquet từ buffer (BufferReader không copy như BytesIO)
+        df = pd.read_parquet(pa.BufferReader(content))
         
         return df
         
@@ -75,29 +234,311 @@ def load_parquet_from_gcs(bucket_name, blob_name):
         raise
 
 
-@st.cache_data(ttl=3600)  # Cache 1 giờ
-def load_all_data():
+def _cache_key(bucket_name, blob_name):
+    """Key của blob trong cache đĩa"""
+    return f"{bucket_name}/{blob_name}"
+
+
+def fetch_parquet_cached(bucket_name, blob_name, token, client=None):
     """
-    Load tất cả dữ liệu từ GCS
+    Đọc parquet của đúng phiên bản token, ưu tiên cache đĩa
     
+    Bản đã có trên đĩa được đọc bằng memory map, không cần mạng; nếu chưa có
+    thì tải từ GCS (đúng generation) rồi ghi vào cache cho lần khởi động sau.
+    
+    Args:
+        bucket_name (str): Tên GCS bucket
+        blob_name (str): Tên file trong bucket
+        token: Token từ get_blob_token/read_dataset_tokens (None = bỏ qua cache)
+        client: GCS client (chỉ khởi tạo khi phải tải)
+        
     Returns:
-        tuple: (market_df, industry_df, ticker_df)
+        pd.DataFrame: DataFrame đã load
+    """
+    cache = get_parquet_cache()
+    if cache is None or token is None:
+        return fetch_parquet_from_gcs(
+            bucket_name, blob_name, client=client, generation=_token_generation(token)
+        )
+    
+    key = _cache_key(bucket_name, blob_name)
+    path = cache.get(key, token)
+    if path is None:
+        try:
+            content = download_blob_bytes(
+                bucket_name, blob_name, client=client, generation=_token_generation(token)
+            )
+        except Exception as e:
+            st.error(f"❌ Lỗi khi load file {blob_name} từ GCS: {str(e)}")
+            raise
+        path = cache.put(key, token, content)
+    return read_cached_parquet(path)
+
+
+def read_cached_tokens():
+    """
+    Token của bản dùng gần nhất trong cache đĩa cho từng dataset
+    
+    Dùng khi không kết nối được GCS lúc khởi động: read_dataset với các
+    token này đọc thẳng từ đĩa.
+    
+    Returns:
+        dict: {tên dataset: token}
+    """
+    cache = get_parquet_cache()
+    if cache is None:
+        raise FileNotFoundError("Cache đĩa đang tắt (config.PARQUET_CACHE_DIR = None)")
+    
+    tokens = {}
+    for name, blob_name in GCS_DATASETS.items():
+        found = cache.latest(_cache_key(GCS_BUCKET_NAME, blob_name))
+        if found is None:
+            raise FileNotFoundError(f"Chưa có bản cache của {blob_name} trong {cache.cache_dir}")
+        tokens[name] = found[0]
+    return tokens
+
+
+@st.cache_data(max_entries=2 * len(GCS_DATASETS))
+def _load_parquet_version(bucket_name, blob_name, token):
+    """Cache nội dung blob theo token: token không đổi thì không tải lại"""
+    return fetch_parquet_cached(bucket_name, blob_name, token)
+
+
+def load_parquet_from_gcs(bucket_name, blob_name):
     """
+    Load file parquet trực tiếp từ GCS (cached theo generation)
+    
+    Metadata của blob được kiểm tra tối đa một lần mỗi
+    config.DATA_REFRESH_CHECK_SECONDS; nội dung chỉ được tải lại khi
+    generation/md5 thay đổi.
+    
+    Args:
+        bucket_name (str): Tên GCS bucket
+        blob_name (str): Tên file trong bucket
+        
+    Returns:
+        pd.DataFrame: DataFrame đã load
+    """
+    token = get_recent_blob_token(bucket_name, blob_name)
+    return _load_parquet_version(bucket_name, blob_name, token)
+
+
+class GCSRangeReader(io.RawIOBase):
+    """
+    File-like object đọc blob GCS theo từng đoạn byte (HTTP Range)
+    
+    pyarrow chỉ seek/read footer parquet và các column chunk cần thiết,
+    nên chỉ phần dữ liệu đó được tải về thay vì toàn bộ blob.
+    """
+    
+    def __init__(self, blob, tail_bytes=PARQUET_TAIL_BYTES):
+        """
+        Args:
+            blob: storage.Blob cần đọc
+            tail_bytes: Số byte cuối file đọc trước một lần (footer)
+        """
+        super().__init__()
+        if blob.size is None:
+            blob.reload()
+        self.blob = blob
+        self.size = blob.size
+        self.position = 0
+        self.bytes_downloaded = 0
+        
+        # Footer nằm ở cuối file - tải 1 lần để các lần đọc metadata không tốn request
+        self._tail_start = max(0, self.size - tail_bytes)
+        self._tail = self._download(self._tail_start, self.size)
+    
+    def _download(self, start, end):
+        """Tải đoạn [start, end) của blob"""
+        if end <= start:
+            return b''
+        # GCS dùng end inclusive
+        data = self.blob.download_as_bytes(start=start, end=end - 1)
+        self.bytes_downloaded += len(data)
+        return data
+    
+    def readable(self):
+        return True
+    
+    def seekable(self):
+        return True
+    
+    def tell(self):
+        return self.position
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"whence không hợp lệ: {whence}")
+        return self.position
+    
+    def read(self, size=-1):
+        start = self.position
+        end = self.size if size is None or size < 0 else min(self.size, start + size)
+        
+        if start >= self._tail_start:
+            data = self._tail[start - self._tail_start:end - self._tail_start]
+        else:
+            data = self._download(start, end)
+        
+        self.position += len(data)
+        return data
+    
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _normalize_filters(filters):
+    """
+    Chuẩn hóa filters về dạng list tuple của pyarrow
+    
+    Args:
+        filters: None, list [(col, op, value), ...] hoặc dict {col: value}
+                 (value là list/set -> 'in', còn lại -> '==')
+        
+    Returns:
+        list hoặc None
+    """
+    if not filters:
+        return None
+    
+    if isinstance(filters, dict):
+        normalized = []
+        for col, value in filters.items():
+            if isinstance(value, (list, set)):
+                normalized.append((col, 'in', list(value)))
+            else:
+                normalized.append((col, '==', value))
+        return normalized
+    
+    return list(filters)
+
+
+def load_columns(dataset, columns, filters=None):
+    """
+    Load một số cột của dataset từ GCS (projection + row-group pushdown)
+    
+    Chỉ đọc footer parquet và các column chunk cần thiết qua ranged read,
+    các row group không khớp filter YEAR/QUARTER được bỏ qua nhờ statistics.
+    
+    Args:
+        dataset: 'market', 'industry' hoặc 'ticker'
+        columns: List các cột cần lấy (SYMBOL/YEAR/QUARTER tự động được thêm)
+        filters: Điều kiện lọc, VD {'YEAR': 2024, 'QUARTER': 'Q3'}
+                 hoặc [('YEAR', '>=', 2022)]
+        
+    Returns:
+        pd.DataFrame: DataFrame chỉ gồm các cột yêu cầu, đã sắp xếp
+    """
+    if dataset not in GCS_DATASETS:
+        raise ValueError(f"Dataset không hợp lệ: {dataset}. Chọn một trong {list(GCS_DATASETS)}")
+    
+    # Cache theo generation của blob thay vì ttl cố định
+    token = get_recent_blob_token(GCS_BUCKET_NAME, GCS_DATASETS[dataset])
+    return _load_columns_version(dataset, columns, filters, token)
+
+
+# Mỗi tổ hợp cột/filter là một entry: giới hạn số entry và thời gian giữ
+@st.cache_data(max_entries=32, ttl=3600)
+def _load_columns_version(dataset, columns, filters, token):
+    """load_columns cho đúng phiên bản blob (token)"""
+    blob_name = GCS_DATASETS[dataset]
+    
     try:
-        with st.spinner("⏳ Đang tải dữ liệu từ Google Cloud Storage..."):
-            # Load từng file từ GCS
-            market_df = load_parquet_from_gcs(GCS_BUCKET_NAME, GCS_MARKET_FILE)
-            industry_df = load_parquet_from_gcs(GCS_BUCKET_NAME, GCS_INDUSTRY_FILE)
-            ticker_df = load_parquet_from_gcs(GCS_BUCKET_NAME, GCS_TICKER_FILE)
-            
-            # Sắp xếp theo thời gian
-            market_df = market_df.sort_values(['YEAR', 'QUARTER'])
-            industry_df = industry_df.sort_values(['SYMBOL', 'YEAR', 'QUARTER'])
-            ticker_df = ticker_df.sort_values(['SYMBOL', 'YEAR', 'QUARTER'])
-            
-            st.success("✅ Đã tải xong dữ liệu từ GCS!")
+        # Đã có bản đầy đủ trên đĩa thì đọc cục bộ thay vì ranged read qua mạng
+        cache = get_parquet_cache()
+        path = cache.get(_cache_key(GCS_BUCKET_NAME, blob_name), token) if cache is not None else None
+        
+        if path is not None:
+            available = pq.read_schema(path).names
+        else:
+            client = get_gcs_client()
+            blob = client.bucket(GCS_BUCKET_NAME).blob(blob_name, generation=_token_generation(token))
+            reader = GCSRangeReader(blob)
             
-            return market_df, industry_df, ticker_df
+            # Schema lấy từ footer (đã nằm trong tail buffer)
+            available = pq.read_schema(reader).names
+        
+        key_cols = [c for c in KEY_COLUMNS if c in available]
+        selected = key_cols + [c for c in columns if c in available and c not in key_cols]
+        
+        if path is not None:
+            df = read_cached_parquet(path, columns=selected, filters=_normalize_filters(filters))
+        else:
+            reader.seek(0)
+            df = pd.read_parquet(reader, columns=selected, filters=_normalize_filters(filters))
+        
+        df, _ = compact_frame(sort_by_period(df, by_symbol=dataset != 'market'))
+        return df
+        
+    except Exception as e:
+        st.error(f"❌ Lỗi khi load cột từ {blob_name}: {str(e)}")
+        raise
+
+
+def read_dataset(name, token=None, client=None):
+    """
+    Đọc một dataset, sắp xếp và thu gọn kiểu dữ liệu (không cache trong memory)
+    
+    Có token thì đọc qua cache đĩa (utils.parquet_cache), chỉ tải từ GCS
+    khi phiên bản đó chưa có trên đĩa.
+    
+    Args:
+        name: 'market', 'industry' hoặc 'ticker'
+        token: Token từ read_dataset_tokens để tải đúng generation đã kiểm tra
+        client: GCS client (mặc định get_gcs_client())
+        
+    Returns:
+        tuple: (DataFrame, báo cáo compact_frame)
+    """
+    df = fetch_parquet_cached(GCS_BUCKET_NAME, GCS_DATASETS[name], token, client=client)
+    df = sort_by_period(df, by_symbol=name != 'market')
+    return compact_frame(df)
+
+
+def read_all_data(return_reports=False, client=None):
+    """
+    Đọc tất cả dữ liệu từ GCS (không cache)
+    
+    Dùng cho kho dữ liệu dùng chung (utils.data_store) để tránh giữ
+    thêm một bản sao trong cache của st.cache_data.
+    
+    Args:
+        return_reports: Trả thêm báo cáo compact_frame của từng dataset
+        client: GCS client (mặc định get_gcs_client())
+    
+    Returns:
+        tuple: (market_df, industry_df, ticker_df)
+               hoặc (market_df, industry_df, ticker_df, reports)
+    """
+    try:
+        client = client or get_gcs_client()
+        tokens = read_dataset_tokens(client=client)
+        
+        # Load song song ba file (cache đĩa hoặc GCS, đã sắp xếp theo thời gian và thu gọn kiểu dữ liệu)
+        with ThreadPoolExecutor(max_workers=config.DATASET_LOAD_WORKERS) as pool:
+            futures = {
+                name: pool.submit(read_dataset, name, tokens[name], client=client)
+                for name in GCS_DATASETS
+            }
+            results = {name: future.result() for name, future in futures.items()}
+        
+        market_df, market_report = results['market']
+        industry_df, industry_report = results['industry']
+        ticker_df, ticker_report = results['ticker']
+        
+        if return_reports:
+            reports = {'market': market_report, 'industry': industry_report, 'ticker': ticker_report}
+            return market_df, industry_df, ticker_df, reports
+        return market_df, industry_df, ticker_df
             
     except Exception as e:
         st.error(f"""
@@ -116,25 +557,49 @@ def load_all_data():
         raise
 
 
-@st.cache_data(ttl=3600)
+def load_all_data():
+    """
+    Load tất cả dữ liệu từ GCS
+    
+    Chỉ tải lại khi generation/md5 của một trong các blob thay đổi (metadata
+    được kiểm tra tối đa một lần mỗi config.DATA_REFRESH_CHECK_SECONDS).
+    
+    Returns:
+        tuple: (market_df, industry_df, ticker_df)
+    """
+    tokens = {name: get_recent_blob_token(GCS_BUCKET_NAME, blob_name) for name, blob_name in GCS_DATASETS.items()}
+    return _load_all_data_version(tuple(sorted(tokens.items())))
+
+
+@st.cache_data(max_entries=1)
+def _load_all_data_version(tokens):
+    """load_all_data cho một bộ token (tokens chỉ dùng làm cache key)"""
+    with st.spinner("⏳ Đang tải dữ liệu từ Google Cloud Storage..."):
+        market_df, industry_df, ticker_df = read_all_data()
+        st.success("✅ Đã tải xong dữ liệu từ GCS!")
+        return market_df, industry_df, ticker_df
+
+
 def get_market_data():
     """Load dữ liệu thị trường từ GCS"""
-    df = load_parquet_from_gcs(GCS_BUCKET_NAME, GCS_MARKET_FILE)
-    return df.sort_values(['YEAR', 'QUARTER'])
+    return _sorted_dataset_version('market', get_recent_blob_token(GCS_BUCKET_NAME, GCS_MARKET_FILE))
 
 
-@st.cache_data(ttl=3600)
 def get_industry_data():
     """Load dữ liệu ngành từ GCS"""
-    df = load_parquet_from_gcs(GCS_BUCKET_NAME, GCS_INDUSTRY_FILE)
-    return df.sort_values(['SYMBOL', 'YEAR', 'QUARTER'])
+    return _sorted_dataset_version('industry', get_recent_blob_token(GCS_BUCKET_NAME, GCS_INDUSTRY_FILE))
 
 
-@st.cache_data(ttl=3600)
 def get_ticker_data():
     """Load dữ liệu ticker từ GCS"""
-    df = load_parquet_from_gcs(GCS_BUCKET_NAME, GCS_TICKER_FILE)
-    return df.sort_values(['SYMBOL', 'YEAR', 'QUARTER'])
+    return _sorted_dataset_version('ticker', get_recent_blob_token(GCS_BUCKET_NAME, GCS_TICKER_FILE))
+
+
+@st.cache_data(max_entries=2 * len(GCS_DATASETS))
+def _sorted_dataset_version(dataset, token):
+    """Dataset đã sắp theo kỳ cho một phiên bản blob: đọc và sắp một lần mỗi token"""
+    df = fetch_parquet_cached(GCS_BUCKET_NAME, GCS_DATASETS[dataset], token)
+    return sort_by_period(df, by_symbol=dataset != 'market')
 
 
 def list_available_files_in_gcs():
@@ -165,7 +630,7 @@ def get_available_quarters(df):
         list: Danh sách các quarter theo format 'YYYYQX'
     """
     quarters = df[['YEAR', 'QUARTER']].drop_duplicates()
-    quarters['KEY'] = quarters['YEAR'].astype(str) + quarters['QUARTER']
+    quarters['KEY'] = quarters['YEAR'].astype(str) + quarters['QUARTER'].astype(str)
     return sorted(quarters['KEY'].unique())
 
 
@@ -206,7 +671,7 @@ def get_ticker_info(ticker_df, symbol):
     Returns:
         dict: Thông tin ticker hoặc None nếu không tìm thấy
     """
-    ticker_data = ticker_df[ticker_df['SYMBOL'] == symbol]
+    ticker_data = get_symbol_rows(ticker_df, symbol)
     if ticker_data.empty:
         return None
     
@@ -234,17 +699,8 @@ def filter_data_by_date_range(df, start_quarter, end_quarter):
     Returns:
         DataFrame: Dữ liệu đã được lọc
     """
-    start_year = int(start_quarter[:4])
-    start_q = int(start_quarter[-1])
-    end_year = int(end_quarter[:4])
-    end_q = int(end_quarter[-1])
-    
-    mask = (
-        ((df['YEAR'] > start_year) | ((df['YEAR'] == start_year) & (df['QUARTER'].str[-1].astype(int) >= start_q))) &
-        ((df['YEAR'] < end_year) | ((df['YEAR'] == end_year) & (df['QUARTER'].str[-1].astype(int) <= end_q)))
-    )
-    
-    return df[mask]
+    # So sánh trên key số nguyên PERIOD_ID thay vì cắt chuỗi QUARTER
+    return filter_period_range(df, parse_period(start_quarter), parse_period(end_quarter))
 
 
 def get_latest_data(df, symbol=None):
@@ -259,14 +715,13 @@ def get_latest_data(df, symbol=None):
         Series hoặc DataFrame: Dữ liệu quý gần nhất
     """
     if symbol:
-        df = df[df['SYMBOL'] == symbol]
+        return latest_snapshot(df).get(symbol)
     
     if df.empty:
         return None
     
-    # Lấy quý gần nhất
-    latest_idx = df[['YEAR', 'QUARTER']].apply(lambda x: (x['YEAR'], x['QUARTER']), axis=1).idxmax()
-    return df.loc[latest_idx]
+    # Lấy quý gần nhất (vector hóa, không duyệt từng dòng)
+    return df.iloc[int(np.argmax(period_keys(df)))]
 
 
 def get_metrics_for_tickers(ticker_df, symbols, metrics):
@@ -281,17 +736,13 @@ def get_metrics_for_tickers(ticker_df, symbols, metrics):
     Returns:
         DataFrame: Bảng so sánh các chỉ số
     """
-    result = []
+    # Một lần lấy dòng gần nhất cho tất cả các mã
+    latest = latest_snapshot(ticker_df).get_many(symbols)
     
-    for symbol in symbols:
-        latest = get_latest_data(ticker_df, symbol)
-        if latest is not None:
-            row = {'Mã CK': symbol}
-            for metric in metrics:
-                row[metric] = latest.get(metric, None)
-            result.append(row)
+    result = latest.reindex(columns=list(metrics)).reset_index(drop=True)
+    result.insert(0, 'Mã CK', latest['SYMBOL'].to_numpy())
     
-    return pd.DataFrame(result)
+    return result
 
 
 def search_tickers(ticker_df, keyword):
@@ -3,48 +3,165 @@ Data Loader Module
 Load và cache dữ liệu từ các file parquet
 """
 
+import os
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow.parquet as pq
 from pathlib import Path
 import config
+from utils.data_compact import compact_frame
+from utils.data_index import (
+    get_symbol_rows, latest_snapshot, period_keys, filter_period_range, parse_period, sort_by_period
+)
+
+# Map tên dataset -> file parquet, dùng cho load_columns
+DATASET_FILES = {
+    'market': config.MARKET_DATA_FILE,
+    'industry': config.INDUSTRY_DATA_FILE,
+    'ticker': config.TICKER_DATA_FILE,
+}
+
+# Cột khóa luôn được load kèm để sort/lọc theo kỳ
+KEY_COLUMNS = ['SYMBOL', 'YEAR', 'QUARTER']
+
+
+def _file_token(path):
+    """Token phiên bản của file: mtime (ns) + size"""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def read_dataset_tokens():
+    """
+    Lấy token của cả ba dataset từ metadata file (mtime + size, không đọc nội dung)
+    
+    Returns:
+        dict: {tên dataset: token}
+    """
+    return {name: _file_token(path) for name, path in DATASET_FILES.items()}
+
+
+def read_dataset(name, token=None):
+    """
+    Đọc một dataset, sắp xếp và thu gọn kiểu dữ liệu (không cache)
+    
+    Args:
+        name: 'market', 'industry' hoặc 'ticker'
+        token: Token từ read_dataset_tokens (file local luôn đọc bản hiện tại)
+        
+    Returns:
+        tuple: (DataFrame, báo cáo compact_frame)
+    """
+    df = pd.read_parquet(DATASET_FILES[name])
+    df = sort_by_period(df, by_symbol=name != 'market')
+    return compact_frame(df)
+
+
+def read_all_data(return_reports=False):
+    """
+    Đọc tất cả dữ liệu từ các file parquet (không cache)
+    
+    Dùng cho kho dữ liệu dùng chung (utils.data_store) để tránh giữ
+    thêm một bản sao trong cache của st.cache_data.
+    
+    Args:
+        return_reports: Trả thêm báo cáo compact_frame của từng dataset
+    
+    Returns:
+        tuple: (market_df, industry_df, ticker_df)
+               hoặc (market_df, industry_df, ticker_df, reports)
+    """
+    # Đọc, sắp xếp theo thời gian và thu gọn kiểu dữ liệu
+    market_df, market_report = read_dataset('market')
+    industry_df, industry_report = read_dataset('industry')
+    ticker_df, ticker_report = read_dataset('ticker')
+    
+    if return_reports:
+        reports = {'market': market_report, 'industry': industry_report, 'ticker': ticker_report}
+        return market_df, industry_df, ticker_df, reports
+    return market_df, industry_df, ticker_df
 
 
-@st.cache_data(ttl=3600)  # Cache 1 giờ
 def load_all_data():
     """
     Load tất cả dữ liệu từ các file parquet
     
+    Chỉ đọc lại khi một trong các file thay đổi (mtime/size).
+    
     Returns:
         tuple: (market_df, industry_df, ticker_df)
     """
-    market_df = pd.read_parquet(config.MARKET_DATA_FILE)
-    industry_df = pd.read_parquet(config.INDUSTRY_DATA_FILE)
-    ticker_df = pd.read_parquet(config.TICKER_DATA_FILE)
+    tokens = read_dataset_tokens()
+    return _load_all_data_version(tuple(sorted(tokens.items())))
+
+
+@st.cache_data(max_entries=1)
+def _load_all_data_version(tokens):
+    """load_all_data cho một bộ token (tokens chỉ dùng làm cache key)"""
+    return read_all_data()
+
+
+def load_columns(dataset, columns, filters=None):
+    """
+    Load một số cột của dataset (projection + row-group pushdown)
     
-    # Sắp xếp theo thời gian
-    market_df = market_df.sort_values(['YEAR', 'QUARTER'])
-    industry_df = industry_df.sort_values(['SYMBOL', 'YEAR', 'QUARTER'])
-    ticker_df = ticker_df.sort_values(['SYMBOL', 'YEAR', 'QUARTER'])
+    Args:
+        dataset: 'market', 'industry' hoặc 'ticker'
+        columns: List các cột cần lấy (SYMBOL/YEAR/QUARTER tự động được thêm)
+        filters: Điều kiện lọc, VD {'YEAR': 2024, 'QUARTER': 'Q3'}
+                 hoặc [('YEAR', '>=', 2022)]
+        
+    Returns:
+        pd.DataFrame: DataFrame chỉ gồm các cột yêu cầu, đã sắp xếp
+    """
+    if dataset not in DATASET_FILES:
+        raise ValueError(f"Dataset không hợp lệ: {dataset}. Chọn một trong {list(DATASET_FILES)}")
     
-    return market_df, industry_df, ticker_df
+    # Cache theo mtime/size của file thay vì ttl cố định
+    return _load_columns_version(dataset, columns, filters, _file_token(DATASET_FILES[dataset]))
+
+
+# Mỗi tổ hợp cột/filter là một entry: giới hạn số entry và thời gian giữ
+@st.cache_data(max_entries=32, ttl=3600)
+def _load_columns_version(dataset, columns, filters, token):
+    """load_columns cho đúng phiên bản file (token)"""
+    path = DATASET_FILES[dataset]
+    available = pq.read_schema(path).names
+    key_cols = [c for c in KEY_COLUMNS if c in available]
+    selected = key_cols + [c for c in columns if c in available and c not in key_cols]
+    
+    if isinstance(filters, dict):
+        filters = [
+            (col, 'in', list(value)) if isinstance(value, (list, set)) else (col, '==', value)
+            for col, value in filters.items()
+        ]
+    
+    df = pd.read_parquet(path, columns=selected, filters=filters or None)
+    
+    df, _ = compact_frame(sort_by_period(df, by_symbol=dataset != 'market'))
+    return df
 
 
-@st.cache_data(ttl=3600)
 def get_market_data():
     """Load dữ liệu thị trường"""
-    return pd.read_parquet(config.MARKET_DATA_FILE).sort_values(['YEAR', 'QUARTER'])
+    return _sorted_dataset_version('market', _file_token(config.MARKET_DATA_FILE))
 
 
-@st.cache_data(ttl=3600)
 def get_industry_data():
     """Load dữ liệu ngành"""
-    return pd.read_parquet(config.INDUSTRY_DATA_FILE).sort_values(['SYMBOL', 'YEAR', 'QUARTER'])
+    return _sorted_dataset_version('industry', _file_token(config.INDUSTRY_DATA_FILE))
 
 
-@st.cache_data(ttl=3600)
 def get_ticker_data():
     """Load dữ liệu ticker"""
-    return pd.read_parquet(config.TICKER_DATA_FILE).sort_values(['SYMBOL', 'YEAR', 'QUARTER'])
+    return _sorted_dataset_version('ticker', _file_token(config.TICKER_DATA_FILE))
+
+
+@st.cache_data(max_entries=2 * len(DATASET_FILES))
+def _sorted_dataset_version(dataset, token):
+    """Dataset đã sắp theo kỳ cho một phiên bản file: đọc và sắp một lần mỗi token"""
+    return sort_by_period(pd.read_parquet(DATASET_FILES[dataset]), by_symbol=dataset != 'market')
 
 
 def get_available_quarters(df):
@@ -58,7 +175,7 @@ def get_available_quarters(df):
         list: Danh sách các quarter theo format 'YYYYQX'
     """
     quarters = df[['YEAR', 'QUARTER']].drop_duplicates()
-    quarters['KEY'] = quarters['YEAR'].astype(str) + quarters['QUARTER']
+    quarters['KEY'] = quarters['YEAR'].astype(str) + quarters['QUARTER'].astype(str)
     return sorted(quarters['KEY'].unique())
 
 
@@ -99,7 +216,7 @@ def get_ticker_info(ticker_df, symbol):
     Returns:
         dict: Thông tin ticker hoặc None nếu không tìm thấy
     """
-    ticker_data = ticker_df[ticker_df['SYMBOL'] == symbol]
+    ticker_data = get_symbol_rows(ticker_df, symbol)
     if ticker_data.empty:
         return None
     
@@ -127,17 +244,8 @@ def filter_data_by_date_range(df, start_quarter, end_quarter):
     Returns:
         DataFrame: Dữ liệu đã được lọc
     """
-    start_year = int(start_quarter[:4])
-    start_q = int(start_quarter[-1])
-    end_year = int(end_quarter[:4])
-    end_q = int(end_quarter[-1])
-    
-    mask = (
-        ((df['YEAR'] > start_year) | ((df['YEAR'] == start_year) & (df['QUARTER'].str[-1].astype(int) >= start_q))) &
-        ((df['YEAR'] < end_year) | ((df['YEAR'] == end_year) & (df['QUARTER'].str[-1].astype(int) <= end_q)))
-    )
-    
-    return df[mask]
+    # So sánh trên key số nguyên PERIOD_ID thay vì cắt chuỗi QUARTER
+    return filter_period_range(df, parse_period(start_quarter), parse_period(end_quarter))
 
 
 def get_latest_data(df, symbol=None):
@@ -152,14 +260,13 @@ def get_latest_data(df, symbol=None):
         Series hoặc DataFrame: Dữ liệu quý gần nhất
     """
     if symbol:
-        df = df[df['SYMBOL'] == symbol]
+        return latest_snapshot(df).get(symbol)
     
     if df.empty:
         return None
     
-    # Lấy quý gần nhất
-    latest_idx = df[['YEAR', 'QUARTER']].apply(lambda x: (x['YEAR'], x['QUARTER']), axis=1).idxmax()
-    return df.loc[latest_idx]
+    # Lấy quý gần nhất (vector hóa, không duyệt từng dòng)
+    return df.iloc[int(np.argmax(period_keys(df)))]
 
 
 def get_metrics_for_tickers(ticker_df, symbols, metrics):
@@ -174,17 +281,13 @@ def get_metrics_for_tickers(ticker_df, symbols, metrics):
     Returns:
         DataFrame: Bảng so sánh các chỉ số
     """
-    result = []
+    # Một lần lấy dòng gần nhất cho tất cả các mã
+    latest = latest_snapshot(ticker_df).get_many(symbols)
     
-    for symbol in symbols:
-        latest = get_latest_data(ticker_df, symbol)
-        if latest is not None:
-            row = {'Mã CK': symbol}
-            for metric in metrics:
-                row[metric] = latest.get(metric, None)
-            result.append(row)
+    result = latest.reindex(columns=list(metrics)).reset_index(drop=True)
+    result.insert(0, 'Mã CK', latest['SYMBOL'].to_numpy())
     
-    return pd.DataFrame(result)
+    return result
 
 
 def search_tickers(ticker_df, keyword):
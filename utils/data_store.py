@@ -0,0 +1,640 @@
+"""
+Data Store Module
+Kho dữ liệu dùng chung cho toàn process (st.cache_resource)
+
+Các DataFrame chỉ được load một lần cho mỗi process và được mọi session
+dùng chung (không copy vào st.session_state). Các trang phải coi frame
+trong kho là read-only: mọi thao tác lọc/tính toán tạo ra frame mới, frame
+dẫn xuất cần sửa thì .copy() trước (SymbolIndex.get và get_symbol_rows trả
+về lát cắt iloc, là view của frame trong kho khi chưa có copy-on-write).
+"""
+
+import sys
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+import pandas as pd
+import config
+from utils.data_compact import format_compaction_report
+from utils.data_index import (
+    QuarterIndex, SymbolIndex, LatestSnapshot, ScreeningIndex, PeriodPanel, PercentileRanks,
+    register_index, register_index_owner
+)
+from utils.scoring import composite_scores, score_frame
+
+DATASET_NAMES = ('market', 'industry', 'ticker')
+
+# Cột cần có để dựng từng loại chỉ mục cho một dataset
+INDEX_COLUMNS = {
+    QuarterIndex: {'YEAR', 'QUARTER'},
+    SymbolIndex: {'SYMBOL'},
+    LatestSnapshot: {'SYMBOL', 'YEAR', 'QUARTER'},
+    ScreeningIndex: {'YEAR', 'QUARTER'},
+    PeriodPanel: {'SYMBOL', 'YEAR', 'QUARTER'},
+    PercentileRanks: {'SYMBOL', 'YEAR', 'QUARTER'},
+}
+
+# Session không hoạt động quá thời gian này sẽ không còn được tính
+SESSION_TTL_SECONDS = 30 * 60
+
+
+def _current_session_id():
+    """Lấy id của session Streamlit hiện tại (None nếu chạy ngoài runtime)"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx is not None else None
+    except Exception:
+        return None
+
+
+def _attach_script_context(ctx):
+    """Gắn ScriptRunContext của session vào thread worker (để st.error hiển thị được)"""
+    if ctx is None:
+        return
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+        add_script_run_ctx(threading.current_thread(), ctx)
+    except Exception:
+        pass
+
+
+def read_datasets(read_dataset, tokens, names=DATASET_NAMES, max_workers=None):
+    """
+    Đọc song song nhiều dataset và đo thời gian của từng dataset
+
+    Args:
+        read_dataset: Hàm (name, token) -> (DataFrame, báo cáo compact_frame)
+        tokens: Dict {tên dataset: token}
+        names: Các dataset cần đọc
+        max_workers: Số thread (mặc định config.DATASET_LOAD_WORKERS)
+
+    Returns:
+        tuple: (frames, reports, timings) - các dict theo tên dataset,
+               timings[name] là số giây đọc dataset đó
+    """
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except Exception:
+        ctx = None
+
+    def timed(name):
+        started = time.perf_counter()
+        df, report = read_dataset(name, tokens[name])
+        return df, report, time.perf_counter() - started
+
+    workers = max_workers or config.DATASET_LOAD_WORKERS
+    with ThreadPoolExecutor(max_workers=max(1, workers), initializer=_attach_script_context,
+                            initargs=(ctx,)) as pool:
+        futures = {name: pool.submit(timed, name) for name in names}
+        results = {name: future.result() for name, future in futures.items()}
+
+    frames = {name: result[0] for name, result in results.items()}
+    reports = {name: result[1] for name, result in results.items()}
+    timings = {name: result[2] for name, result in results.items()}
+    return frames, reports, timings
+
+
+def _session_state_bytes():
+    """Ước lượng bộ nhớ của st.session_state của session hiện tại"""
+    total = 0
+    for value in st.session_state.to_dict().values():
+        if isinstance(value, pd.DataFrame):
+            total += int(value.memory_usage(deep=False).sum())
+        elif isinstance(value, pd.Series):
+            total += int(value.memory_usage(deep=False))
+        else:
+            total += sys.getsizeof(value)
+    return total
+
+
+def _process_rss_bytes():
+    """Resident memory của process hiện tại (bytes), None nếu không đọc được"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        # ru_maxrss: KB trên Linux, bytes trên macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == 'darwin' else rss * 1024
+    except Exception:
+        return None
+
+
+class DatasetStore:
+    """Kho read-only chứa market/industry/ticker DataFrame dùng chung"""
+
+    def __init__(self, frames, source, version=None, compaction=None, tokens=None, load_timings=None):
+        """
+        Args:
+            frames: Dict {tên dataset: DataFrame}
+            source: Nguồn dữ liệu ('gcs' hoặc 'local')
+            version: Token phiên bản dữ liệu (mặc định tính từ tokens,
+                     hoặc theo thời điểm load nếu không có tokens)
+            compaction: Dict {tên dataset: báo cáo compact_frame} từ loader
+            tokens: Dict {tên dataset: token generation/md5 hoặc mtime/size}
+            load_timings: Dict {tên dataset: số giây đọc} và 'total' (thời gian thực của cả lượt load)
+        """
+        self._frames = dict(frames)
+        self.source = source
+        self.tokens = dict(tokens or {})
+        self.loaded_at = time.time()
+        self.version = version or (
+            make_data_version(source, self.tokens) if self.tokens else f"{source}-{int(self.loaded_at)}"
+        )
+
+        # Lần kiểm tra phiên bản gần nhất (thành công hoặc không) và lỗi nếu có
+        self.last_refreshed = self.loaded_at
+        self.last_error = None
+        self.compaction = dict(compaction or {})
+        self.load_timings = dict(load_timings or {})
+
+        # Frame bất biến nên chỉ cần đo bộ nhớ một lần
+        self._frame_bytes = {
+            name: int(df.memory_usage(deep=True).sum()) for name, df in self._frames.items()
+        }
+
+        # Chỉ mục của từng dataset, dựng lần đầu khi được dùng (qua accessor
+        # hoặc find_index) rồi giữ đến hết phiên bản dữ liệu
+        self._indexes = {}
+        self._index_lock = threading.RLock()
+        for name, df in self._frames.items():
+            for index_class, columns in INDEX_COLUMNS.items():
+                if columns.issubset(df.columns):
+                    register_index_owner(df, index_class, self)
+
+        # Cột điểm tổng hợp (utils/scoring.py), tính lần đầu khi được dùng
+        self._scores = {}
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """
+        Lấy DataFrame dùng chung (không copy)
+
+        Args:
+            name: 'market', 'industry' hoặc 'ticker'
+
+        Returns:
+            pd.DataFrame: Frame read-only
+        """
+        if name not in self._frames:
+            raise KeyError(f"Dataset không tồn tại: {name}")
+        return self._frames[name]
+
+    @property
+    def market_df(self):
+        return self._frames['market']
+
+    @property
+    def industry_df(self):
+        return self._frames['industry']
+
+    @property
+    def ticker_df(self):
+        return self._frames['ticker']
+
+    def quarter_index(self, name):
+        """
+        Lấy QuarterIndex của dataset
+
+        Args:
+            name: 'market', 'industry' hoặc 'ticker'
+
+        Returns:
+            QuarterIndex
+        """
+        return self._index(name, QuarterIndex)
+
+    def symbol_index(self, name):
+        """
+        Lấy SymbolIndex của dataset
+
+        Args:
+            name: 'market', 'industry' hoặc 'ticker'
+
+        Returns:
+            SymbolIndex
+        """
+        return self._index(name, SymbolIndex)
+
+    def latest_snapshot(self, name):
+        """
+        Lấy LatestSnapshot (dòng gần nhất của mỗi mã) của dataset
+
+        Args:
+            name: 'market', 'industry' hoặc 'ticker'
+
+        Returns:
+            LatestSnapshot
+        """
+        return self._index(name, LatestSnapshot)
+
+    def screening_index(self, name):
+        """
+        Lấy ScreeningIndex (sàng lọc theo khoảng giá trị từng kỳ) của dataset
+
+        Args:
+            name: 'market', 'industry' hoặc 'ticker'
+
+        Returns:
+            ScreeningIndex
+        """
+        return self._index(name, ScreeningIndex)
+
+    def period_panel(self, name):
+        """
+        Lấy PeriodPanel (bố cục kỳ x mã) của dataset
+
+        Args:
+            name: 'market', 'industry' hoặc 'ticker'
+
+        Returns:
+            PeriodPanel
+        """
+        return self._index(name, PeriodPanel)
+
+    def percentile_ranks(self, name):
+        """
+        Lấy PercentileRanks (percentile/thứ hạng theo kỳ, thị trường và ngành) của dataset
+
+        Args:
+            name: 'market', 'industry' hoặc 'ticker'
+
+        Returns:
+            PercentileRanks
+        """
+        return self._index(name, PercentileRanks)
+
+    def _index(self, name, index_class):
+        """
+        Lấy chỉ mục của dataset, dựng và đăng ký ở lần gọi đầu tiên
+
+        Args:
+            name: 'market', 'industry' hoặc 'ticker'
+            index_class: Class chỉ mục trong INDEX_COLUMNS
+
+        Returns:
+            Chỉ mục của dataset
+        """
+        key = (name, index_class.__name__)
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+
+        df = self.get(name)
+        if not INDEX_COLUMNS[index_class].issubset(df.columns):
+            raise KeyError(f"Dataset {name} không có cột cho {index_class.__name__}")
+
+        # Khoá chung để mỗi chỉ mục chỉ dựng một lần khi nhiều session cùng truy cập
+        # (RLock: PercentileRanks dựng từ PeriodPanel của cùng dataset)
+        with self._index_lock:
+            index = self._indexes.get(key)
+            if index is None:
+                if index_class is PercentileRanks:
+                    index = PercentileRanks(self._index(name, PeriodPanel))
+                else:
+                    index = index_class(df)
+                self._indexes[key] = register_index(index)
+        return index
+
+    def build_index(self, df, index_class):
+        """
+        Dựng chỉ mục cho frame của kho khi find_index tra lần đầu
+
+        Args:
+            df: DataFrame
+            index_class: Class chỉ mục
+
+        Returns:
+            Chỉ mục, hoặc None nếu df không phải frame của kho
+        """
+        for name, frame in self._frames.items():
+            if frame is df and INDEX_COLUMNS[index_class].issubset(df.columns):
+                return self._index(name, index_class)
+        return None
+
+    def precompute_percentile_ranks(self, columns):
+        """
+        Xếp hạng percentile trước cho các cột hiển thị (lúc dựng kho)
+
+        Args:
+            columns: Dict {tên dataset: danh sách cột}
+        """
+        for name, names in columns.items():
+            df = self._frames.get(name)
+            if df is not None and INDEX_COLUMNS[PercentileRanks].issubset(df.columns):
+                self.percentile_ranks(name).precompute(names)
+
+    def scores(self, name):
+        """
+        Điểm tổng hợp cho mọi dòng/kỳ của dataset
+
+        Tính vector một lần cho mỗi phiên bản dữ liệu, cùng index với frame.
+
+        Args:
+            name: 'market', 'industry' hoặc 'ticker'
+
+        Returns:
+            DataFrame: Cột LIQUIDITY_SCORE, PROFITABILITY_SCORE, Z_SCORE_CALC, DUPONT_ROE
+            và các điểm trong config.COMPOSITE_SCORES (VD Banking_Score)
+        """
+        scores = self._scores.get(name)
+        if scores is None:
+            df = self.get(name)
+            scores = pd.concat([score_frame(df), composite_scores(df)], axis=1)
+            with self._lock:
+                scores = self._scores.setdefault(name, scores)
+        return scores
+
+    def touch_session(self, session_id, state_bytes=0):
+        """
+        Ghi nhận một session đang dùng kho
+
+        Args:
+            session_id: Id session Streamlit
+            state_bytes: Bộ nhớ riêng của session (st.session_state)
+        """
+        if session_id is None:
+            return
+        with self._lock:
+            self._sessions[session_id] = (time.time(), state_bytes)
+
+    def memory_report(self):
+        """
+        Thống kê bộ nhớ của kho và các session
+
+        Returns:
+            dict: shared_bytes, frame_bytes, sessions, session_bytes,
+                  bytes_per_session, rss_bytes, compaction, load_timings,
+                  data_version, last_refreshed, last_error
+        """
+        now = time.time()
+        with self._lock:
+            self._sessions = {
+                sid: (seen, size) for sid, (seen, size) in self._sessions.items()
+                if now - seen <= SESSION_TTL_SECONDS
+            }
+            sessions = len(self._sessions)
+            session_bytes = sum(size for _, size in self._sessions.values())
+
+        shared_bytes = sum(self._frame_bytes.values())
+
+        return {
+            'shared_bytes': shared_bytes,
+            'frame_bytes': dict(self._frame_bytes),
+            'sessions': sessions,
+            'session_bytes': session_bytes,
+            'bytes_per_session': (shared_bytes + session_bytes) / sessions if sessions else shared_bytes,
+            'rss_bytes': _process_rss_bytes(),
+            'compaction': self.compaction,
+            'load_timings': self.load_timings,
+            'data_version': self.version,
+            'last_refreshed': self.last_refreshed,
+            'last_error': self.last_error,
+        }
+
+
+def make_data_version(source, tokens):
+    """
+    Token phiên bản của cả bộ dữ liệu, đổi khi bất kỳ dataset nào đổi
+
+    Args:
+        source: 'gcs' hoặc 'local'
+        tokens: Dict {tên dataset: token}
+
+    Returns:
+        str: VD 'gcs-3f2a9c1b7d0e'
+    """
+    digest = hashlib.sha1(repr(sorted(tokens.items())).encode()).hexdigest()[:12]
+    return f"{source}-{digest}"
+
+
+def _get_loader(source):
+    """Module loader của nguồn dữ liệu"""
+    if source == 'gcs':
+        from utils import data_loader as loader
+    elif source == 'local':
+        from utils import data_loader_local as loader
+    else:
+        raise ValueError(f"Nguồn dữ liệu không hợp lệ: {source}")
+    return loader
+
+
+class DatasetStoreManager:
+    """
+    Giữ kho dữ liệu hiện tại của một nguồn và làm mới theo phiên bản
+
+    Định kỳ (config.DATA_REFRESH_CHECK_SECONDS) chỉ đọc metadata của các
+    dataset; dataset nào có token đổi mới được tải lại, các dataset còn lại
+    dùng lại frame của kho cũ. Lỗi khi kiểm tra (mất mạng) thì giữ kho hiện tại;
+    nếu lỗi ngay lần load đầu, dùng bản cuối cùng trong cache đĩa của loader
+    (read_cached_tokens) nếu có.
+    """
+
+    def __init__(self, source, loader=None, client=None, check_interval=None):
+        """
+        Args:
+            source: 'gcs' hoặc 'local'
+            loader: Module có read_dataset_tokens() và read_dataset(name, token)
+                    (mặc định loader của nguồn)
+            client: GCS client truyền cho loader (VD client giả khi test)
+            check_interval: Số giây giữa hai lần kiểm tra (mặc định theo config)
+        """
+        self.source = source
+        self.loader = loader or _get_loader(source)
+        self._loader_kwargs = {'client': client} if client is not None else {}
+        self.check_interval = (
+            config.DATA_REFRESH_CHECK_SECONDS if check_interval is None else check_interval
+        )
+        self._store = None
+        # _lock chỉ giữ khi đổi self._store; _build_lock cho một thread kiểm tra/tải
+        # tại một thời điểm, các session khác vẫn đọc kho hiện tại trong lúc tải
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _read_tokens(self):
+        return self.loader.read_dataset_tokens(**self._loader_kwargs)
+
+    def _read_dataset(self, name, token):
+        return self.loader.read_dataset(name, token, **self._loader_kwargs)
+
+    def _build(self, tokens, previous=None, changed=DATASET_NAMES):
+        """Dựng kho mới, chỉ đọc lại (song song) các dataset trong changed"""
+        to_read = [name for name in DATASET_NAMES if previous is None or name in changed]
+
+        started = time.perf_counter()
+        frames, reports, timings = read_datasets(self._read_dataset, tokens, names=to_read)
+        timings['total'] = time.perf_counter() - started
+
+        for name in DATASET_NAMES:
+            if name not in frames:
+                frames[name] = previous.get(name)
+                reports[name] = previous.compaction.get(name)
+
+        store = DatasetStore(frames, self.source, compaction=reports, tokens=tokens, load_timings=timings)
+        store.precompute_percentile_ranks(config.PERCENTILE_RANK_COLUMNS)
+        if previous is not None:
+            with previous._lock:
+                store._sessions.update(previous._sessions)
+        return store
+
+    def _build_initial(self):
+        """Dựng kho lần đầu; mất mạng thì dựng từ bản cache đĩa gần nhất"""
+        try:
+            return self._build(self._read_tokens())
+        except Exception as e:
+            read_cached_tokens = getattr(self.loader, 'read_cached_tokens', None)
+            if read_cached_tokens is None:
+                raise
+            try:
+                tokens = read_cached_tokens()
+            except Exception:
+                raise e
+            store = self._build(tokens)
+            # Lần kiểm tra sau sẽ so token thật với token cache và tải bản mới nếu có
+            store.last_error = f"Đang dùng bản cache trên đĩa: {e}"
+            return store
+
+    def current(self, force=False):
+        """
+        Kho dữ liệu hiện tại, kiểm tra phiên bản nếu đã quá hạn
+
+        Args:
+            force: Kiểm tra phiên bản ngay (bỏ qua check_interval)
+
+        Returns:
+            DatasetStore
+        """
+        store = self._store
+        if store is None:
+            # Lần đầu chưa có gì để phục vụ: các session chờ một lần dựng
+            with self._build_lock:
+                if self._store is None:
+                    self._swap(self._build_initial())
+            return self._store
+
+        if force or time.time() - store.last_refreshed >= self.check_interval:
+            # Đang có thread khác kiểm tra/tải thì dùng kho hiện tại (force thì chờ)
+            if self._build_lock.acquire(blocking=force):
+                try:
+                    if force or self._store.last_refreshed == store.last_refreshed:
+                        self._refresh()
+                finally:
+                    self._build_lock.release()
+        return self._store
+
+    def _swap(self, store):
+        with self._lock:
+            self._store = store
+
+    def _refresh(self):
+        """Tải lại các dataset có token thay đổi (không giữ _lock trong lúc tải)"""
+        store = self._store
+        try:
+            tokens = self._read_tokens()
+            changed = [name for name in DATASET_NAMES if tokens.get(name) != store.tokens.get(name)]
+            if changed:
+                self._swap(self._build(tokens, previous=store, changed=changed))
+                return
+            store.last_error = None
+        except Exception as e:
+            # Lỗi mạng/GCS: tiếp tục phục vụ dữ liệu hiện có, thử lại ở lần kiểm tra sau
+            store.last_error = str(e)
+        store.last_refreshed = time.time()
+
+
+@st.cache_resource(show_spinner=False)
+def get_store_manager(source='gcs'):
+    """
+    Lấy DatasetStoreManager dùng chung (singleton cho mỗi process)
+
+    Args:
+        source: 'gcs' (utils.data_loader) hoặc 'local' (utils.data_loader_local)
+
+    Returns:
+        DatasetStoreManager
+    """
+    return DatasetStoreManager(source)
+
+
+def get_dataset_store(source='gcs', force_refresh=False):
+    """
+    Lấy kho dữ liệu dùng chung của process
+
+    Args:
+        source: 'gcs' (utils.data_loader) hoặc 'local' (utils.data_loader_local)
+        force_refresh: Kiểm tra phiên bản dữ liệu ngay
+
+    Returns:
+        DatasetStore
+    """
+    return get_store_manager(source).current(force=force_refresh)
+
+
+def attach_session(store):
+    """Ghi nhận session hiện tại vào kho kèm bộ nhớ riêng của session"""
+    store.touch_session(_current_session_id(), _session_state_bytes())
+
+
+def require_dataset_store():
+    """
+    Lấy kho dữ liệu cho các trang con
+
+    Dừng trang nếu người dùng chưa qua trang chủ (chưa chọn nguồn dữ liệu).
+
+    Returns:
+        DatasetStore
+    """
+    source = st.session_state.get('data_source')
+    if source is None:
+        st.error("Vui lòng quay lại trang chủ để load dữ liệu!")
+        st.stop()
+
+    store = get_dataset_store(source)
+    attach_session(store)
+    return store
+
+
+def format_memory_report(report):
+    """
+    Format memory_report để hiển thị trong sidebar
+
+    Args:
+        report: Dict từ DatasetStore.memory_report()
+
+    Returns:
+        str: Markdown
+    """
+    mb = 1024 * 1024
+    rss = report['rss_bytes']
+    lines = [
+        f"**Dữ liệu dùng chung**: {report['shared_bytes'] / mb:,.1f} MB",
+        f"**Số session**: {report['sessions']}",
+        f"**Bộ nhớ riêng các session**: {report['session_bytes'] / mb:,.2f} MB",
+        f"**Trung bình / session**: {report['bytes_per_session'] / mb:,.1f} MB",
+        f"**RSS process**: {rss / mb:,.1f} MB" if rss else "**RSS process**: N/A",
+    ]
+    if report.get('data_version'):
+        refreshed = time.strftime('%H:%M:%S %d/%m/%Y', time.localtime(report['last_refreshed']))
+        lines.append(f"**Phiên bản dữ liệu**: `{report['data_version']}` (kiểm tra lúc {refreshed})")
+    if report.get('last_error'):
+        lines.append(f"⚠️ **Lần kiểm tra gần nhất lỗi**: {report['last_error']}")
+    if report.get('load_timings'):
+        timings = report['load_timings']
+        parts = [f"{name} {timings[name]:.2f}s" for name in DATASET_NAMES if name in timings]
+        total = f" (tổng {timings['total']:.2f}s)" if 'total' in timings else ""
+        lines.append(f"**Thời gian load lần gần nhất**: {' · '.join(parts)}{total}")
+    if report.get('compaction'):
+        lines.append("**Thu gọn kiểu dữ liệu lúc load**:")
+        lines.append(format_compaction_report(report['compaction']))
+    return "  \n".join(lines)
@@ -0,0 +1,231 @@
+"""
+Filter Engine Module
+Biên dịch điều kiện lọc dạng dict thành predicate NumPy, dùng lại giữa các lần lọc
+
+Cú pháp (giống ExcelProcessorAdvanced._apply_filters):
+    - Giá trị đơn: so sánh bằng                 {'CAL_GROUP': 'bank'}
+    - List/tuple/set: isin                      {'CATEGORY': ['BS', 'IS']}
+    - Callable: hàm nhận từng giá trị; hàm đánh dấu @vectorized nhận cả Series
+    - Dict operator: {'>=': 10, '<': 100}, 'in', 'not_in', 'contains',
+      'startswith', 'endswith', 'between', 'isnull', '==', '!='
+
+Mask được tính theo vị trí (mảng bool NumPy) nên không phụ thuộc index của
+frame (VD frame sau pd.concat có index trùng).
+"""
+
+import operator
+import threading
+import warnings
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Số bộ filter đã biên dịch được giữ lại
+COMPILED_CACHE_SIZE = 256
+
+_COMPARISONS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+}
+
+_compiled_cache = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def _as_bool_array(result):
+    """Chuyển kết quả so sánh thành mảng bool (NA -> False)"""
+    if isinstance(result, pd.Series):
+        return result.to_numpy(dtype=bool, na_value=False)
+    return np.asarray(result, dtype=bool)
+
+
+def vectorized(func):
+    """
+    Đánh dấu callable điều kiện nhận cả Series và trả mask bool cùng độ dài
+
+    VD {'ROAE': vectorized(lambda s: s > s.median())}
+    """
+    func.__filter_vectorized__ = True
+    return func
+
+
+def _callable_predicate(func):
+    """Predicate cho callable: gọi trên cả Series nếu hàm được đánh dấu @vectorized, ngược lại từng giá trị"""
+    if getattr(func, '__filter_vectorized__', False):
+        return lambda series: _as_bool_array(func(series))
+    return lambda series: np.fromiter((bool(func(v)) for v in series), dtype=bool, count=len(series))
+
+
+def _operator_predicate(op, value):
+    """Predicate cho một operator trong dict điều kiện, None nếu operator không hỗ trợ"""
+    if op in _COMPARISONS:
+        compare = _COMPARISONS[op]
+        return lambda s: _as_bool_array(compare(s, value))
+    if op == 'in':
+        values = list(value)
+        return lambda s: s.isin(values).to_numpy()
+    if op == 'not_in':
+        values = list(value)
+        return lambda s: ~s.isin(values).to_numpy()
+    if op == 'contains':
+        return lambda s: s.astype(str).str.contains(value, na=False).to_numpy(dtype=bool)
+    if op == 'startswith':
+        return lambda s: s.astype(str).str.startswith(value, na=False).to_numpy(dtype=bool)
+    if op == 'endswith':
+        return lambda s: s.astype(str).str.endswith(value, na=False).to_numpy(dtype=bool)
+    if op == 'between':
+        low, high = value
+        return lambda s: s.between(low, high).to_numpy(dtype=bool)
+    if op == 'isnull':
+        return (lambda s: s.isna().to_numpy()) if value else (lambda s: s.notna().to_numpy())
+    return None
+
+
+class CompiledFilter:
+    """Bộ điều kiện lọc đã biên dịch: list (cột, predicate)"""
+
+    def __init__(self, filters):
+        """
+        Args:
+            filters: Dict {cột: điều kiện} (xem docstring module)
+        """
+        self.predicates = []
+        for col, condition in (filters or {}).items():
+            if callable(condition):
+                self.predicates.append((col, _callable_predicate(condition)))
+            elif isinstance(condition, (list, tuple, set, frozenset)):
+                self.predicates.append((col, _operator_predicate('in', condition)))
+            elif isinstance(condition, dict):
+                for op, value in condition.items():
+                    predicate = _operator_predicate(op, value)
+                    if predicate is None:
+                        warnings.warn(f"Operator '{op}' không được hỗ trợ", stacklevel=2)
+                        continue
+                    self.predicates.append((col, predicate))
+            else:
+                self.predicates.append((col, _operator_predicate('==', condition)))
+
+    @property
+    def columns(self):
+        """Các cột được dùng trong điều kiện"""
+        return list(dict.fromkeys(col for col, _ in self.predicates))
+
+    def mask(self, df):
+        """
+        Mask bool theo vị trí dòng
+
+        Args:
+            df: DataFrame cần lọc
+
+        Returns:
+            np.ndarray: Mảng bool độ dài len(df)
+        """
+        mask = np.ones(len(df), dtype=bool)
+        warned = set()
+        for col, predicate in self.predicates:
+            if col not in df.columns:
+                if col not in warned:
+                    warnings.warn(f"Cột '{col}' không tồn tại", stacklevel=2)
+                    warned.add(col)
+                continue
+            if not mask.any():
+                break
+            mask &= predicate(df[col])
+        return mask
+
+    def apply(self, df):
+        """
+        Lọc DataFrame
+
+        Args:
+            df: DataFrame cần lọc
+
+        Returns:
+            DataFrame: Các dòng thỏa mãn (giữ nguyên index gốc)
+        """
+        if not self.predicates:
+            return df
+        return df[self.mask(df)]
+
+
+def _freeze(value):
+    """Chuyển điều kiện thành key hashable cho cache (raise TypeError nếu không được)"""
+    if isinstance(value, dict):
+        return ('dict', tuple((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_freeze(v) for v in value))
+    if isinstance(value, (set, frozenset)):
+        return ('set', frozenset(_freeze(v) for v in value))
+    hash(value)
+    return value
+
+
+def compile_filters(filters):
+    """
+    Biên dịch điều kiện lọc (có cache theo nội dung điều kiện)
+
+    Args:
+        filters: Dict {cột: điều kiện}
+
+    Returns:
+        CompiledFilter
+    """
+    try:
+        key = _freeze(filters or {})
+    except TypeError:
+        return CompiledFilter(filters)
+
+    with _compiled_lock:
+        compiled = _compiled_cache.get(key)
+        if compiled is not None:
+            _compiled_cache.move_to_end(key)
+            return compiled
+
+    compiled = CompiledFilter(filters)
+
+    with _compiled_lock:
+        compiled = _compiled_cache.setdefault(key, compiled)
+        _compiled_cache.move_to_end(key)
+        while len(_compiled_cache) > COMPILED_CACHE_SIZE:
+            _compiled_cache.popitem(last=False)
+    return compiled
+
+
+def apply_filters(df, filters):
+    """
+    Lọc DataFrame theo điều kiện dạng dict
+
+    Args:
+        df: DataFrame cần lọc
+        filters: Dict {cột: điều kiện} (xem docstring module)
+
+    Returns:
+        DataFrame: Các dòng thỏa mãn
+    """
+    return compile_filters(filters).apply(df)
+
+
+def range_filters(criteria):
+    """
+    Chuyển tiêu chí sàng lọc {cột: (min, max)} sang cú pháp filter
+
+    Args:
+        criteria: Dict {cột: (min, max)}, min/max là None thì bỏ qua cận đó
+
+    Returns:
+        dict: VD {'PE_EOQ': {'>=': 0, '<=': 20}}
+    """
+    filters = {}
+    for column, (min_val, max_val) in criteria.items():
+        condition = {}
+        if min_val is not None:
+            condition['>='] = min_val
+        if max_val is not None:
+            condition['<='] = max_val
+        if condition:
+            filters[column] = condition
+    return filters
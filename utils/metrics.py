@@ -5,6 +5,10 @@ Tính toán các chỉ số tài chính và thống kê
 
 import pandas as pd
 import numpy as np
+import config
+from utils.filter_engine import compile_filters, range_filters
+from utils.data_index import PercentileRanks, PeriodPanel, ScreeningIndex, find_index
+from utils.scoring import dupont_arrays, threshold_score, z_score_arrays
 
 
 def calculate_summary_stats(df, column):
@@ -113,6 +117,31 @@ def calculate_percentile(df, column, value):
     return percentile
 
 
+def metric_percentiles(df, symbol, columns, period=None):
+    """
+    Percentile và thứ hạng của một mã so với thị trường và trong ngành
+
+    Cùng cách tính với calculate_percentile trên frame của kỳ, nhưng frame
+    trong kho tra bảng xếp hạng đã tính sẵn (DatasetStore.percentile_ranks)
+    thay cho quét toàn bộ kỳ ở mỗi lần gọi.
+
+    Args:
+        df: DataFrame ticker nhiều kỳ (frame trong kho dùng PercentileRanks dựng sẵn)
+        symbol: Mã
+        columns: Danh sách chỉ tiêu
+        period: (year, quarter) (mặc định kỳ gần nhất)
+
+    Returns:
+        DataFrame: Index chỉ tiêu, cột PERCENTILE_MARKET, RANK_MARKET, COUNT_MARKET,
+        PERCENTILE_INDUSTRY, RANK_INDUSTRY, COUNT_INDUSTRY (hạng 1 = giá trị lớn nhất)
+    """
+    ranks = find_index(df, PercentileRanks)
+    if ranks is None:
+        panel = find_index(df, PeriodPanel)
+        ranks = PercentileRanks(panel if panel is not None else PeriodPanel(df))
+    return ranks.lookup(symbol, columns, *(period or (None, None)))
+
+
 def calculate_z_score_components(row):
     """
     Tính các thành phần của Altman Z-Score
@@ -123,47 +152,8 @@ def calculate_z_score_components(row):
     Returns:
         dict: Dictionary chứa các thành phần Z-Score
     """
-    components = {}
-    
-    # Z1 = Working Capital / Total Assets
-    if pd.notna(row.get('WORKING_CAPITAL_AVG4Q')) and pd.notna(row.get('TOTAL_ASSETS')):
-        wc = row.get('WORKING_CAPITAL_AVG4Q', 0)
-        ta = row.get('TOTAL_ASSETS', 1)
-        components['Z1'] = wc / ta if ta != 0 else 0
-    
-    # Z2 = Retained Earnings / Total Assets
-    if 'Z2' in row:
-        components['Z2'] = row['Z2']
-    
-    # Z3 = EBIT / Total Assets
-    if pd.notna(row.get('EBIT_12M')) and pd.notna(row.get('TOTAL_ASSETS')):
-        ebit = row.get('EBIT_12M', 0)
-        ta = row.get('TOTAL_ASSETS', 1)
-        components['Z3'] = ebit / ta if ta != 0 else 0
-    
-    # Z4 = Market Value of Equity / Book Value of Total Liabilities
-    if pd.notna(row.get('MARKET_CAP_EOQ')) and pd.notna(row.get('TOTAL_LIABILITIES')):
-        mve = row.get('MARKET_CAP_EOQ', 0)
-        tl = row.get('TOTAL_LIABILITIES', 1)
-        components['Z4'] = mve / tl if tl != 0 else 0
-    
-    # Z5 = Sales / Total Assets
-    if pd.notna(row.get('NET_SALES_12M')) and pd.notna(row.get('TOTAL_ASSETS')):
-        sales = row.get('NET_SALES_12M', 0)
-        ta = row.get('TOTAL_ASSETS', 1)
-        components['Z5'] = sales / ta if ta != 0 else 0
-    
-    # Total Z-Score
-    if all(k in components for k in ['Z1', 'Z2', 'Z3', 'Z4', 'Z5']):
-        components['Z_SCORE'] = (
-            1.2 * components['Z1'] +
-            1.4 * components['Z2'] +
-            3.3 * components['Z3'] +
-            0.6 * components['Z4'] +
-            1.0 * components['Z5']
-        )
-    
-    return components
+    values, present = z_score_arrays(row)
+    return {name: values[name][0].item() for name in values if present[name][0]}
 
 
 def interpret_z_score(z_score):
@@ -197,39 +187,7 @@ def calculate_dupont_analysis(row):
     Returns:
         dict: Các thành phần DuPont
     """
-    components = {}
-    
-    # Tax Burden = Net Income / PBT
-    if 'DU1_TAX_BURDEN' in row:
-        components['tax_burden'] = row['DU1_TAX_BURDEN']
-    
-    # Interest Burden = PBT / EBIT
-    if 'DU2_INTEREST_BURDEN' in row:
-        components['interest_burden'] = row['DU2_INTEREST_BURDEN']
-    
-    # Profit Margin = EBIT / Sales
-    if 'DU3_PROFIT_MARGIN' in row:
-        components['profit_margin'] = row['DU3_PROFIT_MARGIN']
-    
-    # Asset Turnover = Sales / Assets
-    if 'DU4_ASSETS_TURNOVER' in row:
-        components['asset_turnover'] = row['DU4_ASSETS_TURNOVER']
-    
-    # Leverage = Assets / Equity
-    if 'DU5_LEVERAGE' in row:
-        components['leverage'] = row['DU5_LEVERAGE']
-    
-    # ROE
-    if all(k in components for k in ['tax_burden', 'interest_burden', 'profit_margin', 'asset_turnover', 'leverage']):
-        components['roe'] = (
-            components['tax_burden'] *
-            components['interest_burden'] *
-            components['profit_margin'] *
-            components['asset_turnover'] *
-            components['leverage']
-        )
-    
-    return components
+    return {name: values[0].item() for name, values in dupont_arrays(row).items()}
 
 
 def calculate_liquidity_score(row):
@@ -242,52 +200,7 @@ def calculate_liquidity_score(row):
     Returns:
         float: Điểm thanh khoản (0-100)
     """
-    score = 0
-    count = 0
-    
-    # Current Ratio (ideal: > 2)
-    if pd.notna(row.get('CURRENT_RATIO_Q')):
-        cr = row.get('CURRENT_RATIO_Q', 0)
-        if cr >= 2:
-            score += 30
-        elif cr >= 1.5:
-            score += 20
-        elif cr >= 1:
-            score += 10
-        count += 30
-    
-    # Quick Ratio (ideal: > 1)
-    if pd.notna(row.get('QUICK_RATIO_Q')):
-        qr = row.get('QUICK_RATIO_Q', 0)
-        if qr >= 1:
-            score += 25
-        elif qr >= 0.8:
-            score += 15
-        elif qr >= 0.5:
-            score += 5
-        count += 25
-    
-    # Cash Ratio (ideal: > 0.5)
-    if pd.notna(row.get('CASH_PLUS_EQUIVALENTS')) and pd.notna(row.get('CURRENT_LIABILITIES')):
-        cash = row.get('CASH_PLUS_EQUIVALENTS', 0)
-        cl = row.get('CURRENT_LIABILITIES', 1)
-        cash_ratio = cash / cl if cl != 0 else 0
-        if cash_ratio >= 0.5:
-            score += 25
-        elif cash_ratio >= 0.3:
-            score += 15
-        elif cash_ratio >= 0.1:
-            score += 5
-        count += 25
-    
-    # Working Capital positive
-    if pd.notna(row.get('WORKING_CAPITAL_AVG4Q')):
-        wc = row.get('WORKING_CAPITAL_AVG4Q', 0)
-        if wc > 0:
-            score += 20
-        count += 20
-    
-    return (score / count * 100) if count > 0 else 0
+    return threshold_score(row, config.LIQUIDITY_SCORE_RULES)[0].item()
 
 
 def calculate_profitability_score(row):
@@ -300,74 +213,101 @@ def calculate_profitability_score(row):
     Returns:
         float: Điểm sinh lời (0-100)
     """
-    score = 0
-    count = 0
-    
-    # ROE (ideal: > 15%)
-    if pd.notna(row.get('ROAE')):
-        roe = row.get('ROAE', 0)
-        if roe >= 20:
-            score += 30
-        elif roe >= 15:
-            score += 20
-        elif roe >= 10:
-            score += 10
-        count += 30
-    
-    # ROA (ideal: > 5%)
-    if pd.notna(row.get('ROAA')):
-        roa = row.get('ROAA', 0)
-        if roa >= 8:
-            score += 25
-        elif roa >= 5:
-            score += 15
-        elif roa >= 3:
-            score += 5
-        count += 25
-    
-    # Net Margin (ideal: > 10%)
-    if pd.notna(row.get('NET_INCOME_MARGIN_12M')):
-        margin = row.get('NET_INCOME_MARGIN_12M', 0)
-        if margin >= 15:
-            score += 25
-        elif margin >= 10:
-            score += 15
-        elif margin >= 5:
-            score += 5
-        count += 25
-    
-    # ROIC (ideal: > 10%)
-    if pd.notna(row.get('ROIC')):
-        roic = row.get('ROIC', 0)
-        if roic >= 15:
-            score += 20
-        elif roic >= 10:
-            score += 10
-        elif roic >= 5:
-            score += 5
-        count += 20
-    
-    return (score / count * 100) if count > 0 else 0
+    return threshold_score(row, config.PROFITABILITY_SCORE_RULES)[0].item()
 
 
-def screen_stocks(df, criteria):
+def screen_stocks(df, criteria, period=None):
     """
     Lọc cổ phiếu theo tiêu chí
     
     Args:
         df: DataFrame ticker
         criteria: Dict chứa các tiêu chí {column: (min, max)}
+        period: None lọc tất cả các dòng; (year, quarter) hoặc 'latest' chỉ
+            lọc các dòng của kỳ đó trên frame nhiều kỳ (tra ScreeningIndex
+            dựng sẵn nếu df là frame trong kho)
         
     Returns:
         DataFrame: Cổ phiếu đã lọc
     """
-    result = df.copy()
-    
-    for column, (min_val, max_val) in criteria.items():
-        if column in result.columns:
-            if min_val is not None:
-                result = result[result[column] >= min_val]
-            if max_val is not None:
-                result = result[result[column] <= max_val]
-    
-    return result
+    criteria = {column: bounds for column, bounds in criteria.items() if column in df.columns}
+
+    if period is None:
+        # Một mask cho tất cả tiêu chí (bộ lọc đã biên dịch được cache theo tiêu chí)
+        return compile_filters(range_filters(criteria)).apply(df).copy()
+
+    # Lọc một kỳ: tra chỉ mục sắp sẵn theo kỳ (searchsorted + bitmap)
+    index = find_index(df, ScreeningIndex)
+    if index is None:
+        index = ScreeningIndex(df)
+    if period == 'latest':
+        return index.screen(criteria)
+    return index.screen(criteria, *period)
+
+
+def screen_history(df, criteria, last_n=None, period=None, min_passes=None, min_streak=None):
+    """
+    Sàng lọc lịch sử: đánh giá tiêu chí trên mọi kỳ trong một lần
+
+    Tiêu chí được tính một lần trên tất cả các dòng rồi trải theo bố cục
+    kỳ x mã (PeriodPanel); số kỳ đạt và chuỗi kỳ đạt liên tiếp được tính theo
+    trục kỳ cho mọi mã cùng lúc. Kỳ mã không có dữ liệu tính là không đạt.
+
+    VD "ROE >= 15% trong 8 quý liên tiếp":
+        screen_history(ticker_df, {'ROAE': (15, None)}, min_streak=8)
+    VD "đạt tiêu chí ở ít nhất 6 trong 8 quý gần nhất":
+        screen_history(ticker_df, criteria, last_n=8, min_passes=6)
+
+    Args:
+        df: DataFrame ticker nhiều kỳ (frame trong kho dùng PeriodPanel dựng sẵn)
+        criteria: Dict chứa các tiêu chí {column: (min, max)}
+        last_n: Chỉ xét last_n kỳ gần nhất (mặc định tất cả)
+        period: (year, quarter) kỳ cuối của cửa sổ (mặc định kỳ gần nhất)
+        min_passes: Chỉ giữ mã có số kỳ đạt >= min_passes
+        min_streak: Chỉ giữ mã có chuỗi đạt hiện tại (tính đến kỳ cuối) >= min_streak
+
+    Returns:
+        DataFrame: Index SYMBOL, cột PERIODS (số kỳ có dữ liệu), PASS_COUNT,
+        PASS_RATIO, CURRENT_STREAK, MAX_STREAK, FIRST_PASS, LAST_PASS ('YYYYQX');
+        sắp theo CURRENT_STREAK rồi PASS_COUNT giảm dần
+    """
+    panel = find_index(df, PeriodPanel)
+    if panel is None:
+        panel = PeriodPanel(df)
+
+    criteria = {column: bounds for column, bounds in criteria.items() if column in df.columns}
+    row_passed = compile_filters(range_filters(criteria)).mask(df)
+
+    start, stop = panel.window(last_n, period)
+    passed = panel.gather(row_passed, fill=False)[start:stop]
+    present = panel.present[start:stop]
+    n_periods = stop - start
+
+    # Độ dài chuỗi đạt kết thúc tại mỗi kỳ: kỳ hiện tại - kỳ không đạt gần nhất
+    steps = np.arange(n_periods)[:, None]
+    last_failed = np.maximum.accumulate(np.where(passed, -1, steps), axis=0)
+    runs = np.where(passed, steps - last_failed, 0)
+
+    pass_count = passed.sum(axis=0)
+    n_present = present.sum(axis=0)
+    any_passed = pass_count > 0
+    labels = np.array(panel.periods[start:stop] or [None], dtype=object)
+    first = np.argmax(passed, axis=0) if n_periods else np.zeros(len(panel.symbols), dtype=int)
+    last = n_periods - 1 - np.argmax(passed[::-1], axis=0) if n_periods else first
+
+    result = pd.DataFrame({
+        'PERIODS': n_present,
+        'PASS_COUNT': pass_count,
+        'PASS_RATIO': np.divide(pass_count, n_present, out=np.zeros(len(n_present)), where=n_present > 0),
+        'CURRENT_STREAK': runs[-1] if n_periods else np.zeros(len(panel.symbols), dtype=int),
+        'MAX_STREAK': runs.max(axis=0) if n_periods else np.zeros(len(panel.symbols), dtype=int),
+        'FIRST_PASS': np.where(any_passed, labels[first], None),
+        'LAST_PASS': np.where(any_passed, labels[last], None),
+    }, index=pd.Index(panel.symbols, name='SYMBOL'))
+
+    keep = n_present > 0
+    if min_passes is not None:
+        keep &= pass_count >= min_passes
+    if min_streak is not None:
+        keep &= result['CURRENT_STREAK'].to_numpy() >= min_streak
+    return result[keep].sort_values(['CURRENT_STREAK', 'PASS_COUNT'], ascending=False, kind='stable')
@@ -0,0 +1,211 @@
+"""
+Parquet Cache Module
+Bộ nhớ đệm trên đĩa cho các blob parquet tải từ GCS
+
+Mỗi blob được lưu thành một file theo (bucket/blob, token generation/md5),
+nên bản đã tải không bao giờ bị dùng nhầm khi blob đổi. Tổng dung lượng bị
+giới hạn; khi vượt ngưỡng, các file ít được dùng gần đây nhất (mtime) bị xóa
+trước. Bản mới nhất của mỗi blob được giữ lại lâu nhất để làm bản dự phòng
+khi mất mạng.
+"""
+
+import os
+import threading
+import tempfile
+from pathlib import Path
+from urllib.parse import quote, unquote
+import pyarrow.parquet as pq
+import config
+
+CACHE_SUFFIX = '.parquet'
+
+# Ngăn cách key và token trong tên file (quote(safe='') luôn mã hóa '@')
+_TOKEN_SEP = '@'
+
+
+class ParquetDiskCache:
+    """Cache LRU trên đĩa: {(key, token): file parquet}"""
+
+    def __init__(self, cache_dir, max_bytes=None):
+        """
+        Args:
+            cache_dir: Thư mục chứa cache (tự tạo nếu chưa có)
+            max_bytes: Tổng dung lượng tối đa (None = không giới hạn)
+        """
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key, token):
+        """Đường dẫn file của (key, token)"""
+        name = f"{quote(str(key), safe='')}{_TOKEN_SEP}{quote(str(token), safe='')}{CACHE_SUFFIX}"
+        return self.cache_dir / name
+
+    def _entries(self):
+        """
+        Liệt kê các file trong cache
+
+        Returns:
+            list: [(key, token, path, stat)]
+        """
+        entries = []
+        for path in self.cache_dir.glob(f'*{CACHE_SUFFIX}'):
+            key, sep, token = path.name[:-len(CACHE_SUFFIX)].partition(_TOKEN_SEP)
+            if not sep:
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                # File vừa bị process khác xóa
+                continue
+            entries.append((unquote(key), unquote(token), path, stat))
+        return entries
+
+    def get(self, key, token):
+        """
+        Lấy file của (key, token) và đánh dấu vừa được dùng
+
+        Args:
+            key: VD 'bucket/data/ticker_analysis.parquet'
+            token: Token generation/md5 của blob
+
+        Returns:
+            Path hoặc None nếu chưa có trong cache
+        """
+        path = self._path(key, token)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key, token, data):
+        """
+        Ghi nội dung blob vào cache (ghi file tạm rồi đổi tên, an toàn giữa các process)
+
+        Args:
+            key: Key của blob
+            token: Token generation/md5 của blob
+            data: Nội dung parquet (bytes, bytearray hoặc memoryview)
+
+        Returns:
+            Path: File vừa ghi
+        """
+        path = self._path(key, token)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        self.evict(keep=path)
+        return path
+
+    def latest(self, key):
+        """
+        Bản dùng gần nhất của một blob (dùng khi không kết nối được GCS)
+
+        Args:
+            key: Key của blob
+
+        Returns:
+            tuple: (token, Path) hoặc None nếu chưa có bản nào
+        """
+        copies = [(stat.st_mtime, token, path) for k, token, path, stat in self._entries() if k == key]
+        if not copies:
+            return None
+        _, token, path = max(copies)
+        return token, path
+
+    def size_bytes(self):
+        """Tổng dung lượng các file trong cache"""
+        return sum(stat.st_size for _, _, _, stat in self._entries())
+
+    def evict(self, keep=None):
+        """
+        Xóa file cũ nhất (LRU) cho tới khi tổng dung lượng <= max_bytes
+
+        Các bản cũ của một blob bị xóa trước bản mới nhất của nó.
+
+        Args:
+            keep: File không được xóa (VD file vừa ghi)
+
+        Returns:
+            int: Số file đã xóa
+        """
+        if self.max_bytes is None:
+            return 0
+
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[3].st_mtime)
+            total = sum(stat.st_size for _, _, _, stat in entries)
+            if total <= self.max_bytes:
+                return 0
+
+            newest = {}
+            for key, _, path, _ in entries:
+                newest[key] = path
+
+            # Lượt 1: bản cũ của từng blob; lượt 2: cả bản mới nhất
+            stale = [e for e in entries if newest[e[0]] != e[2]]
+            current = [e for e in entries if newest[e[0]] == e[2]]
+
+            removed = 0
+            for _, _, path, stat in stale + current:
+                if total <= self.max_bytes:
+                    break
+                if keep is not None and path == keep:
+                    continue
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= stat.st_size
+                removed += 1
+            return removed
+
+
+def read_cached_parquet(path, columns=None, filters=None):
+    """
+    Đọc file parquet trong cache bằng memory map (không copy cả file vào RAM)
+
+    Args:
+        path: File trong cache
+        columns: Các cột cần đọc (mặc định tất cả)
+        filters: Filters dạng pyarrow
+
+    Returns:
+        pd.DataFrame
+    """
+    table = pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+    return table.to_pandas()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_parquet_cache():
+    """
+    Cache đĩa dùng chung của process theo config
+
+    Returns:
+        ParquetDiskCache hoặc None nếu bị tắt (config.PARQUET_CACHE_DIR = None)
+        hay không tạo được thư mục
+    """
+    global _cache
+    if config.PARQUET_CACHE_DIR is None:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ParquetDiskCache(config.PARQUET_CACHE_DIR, config.PARQUET_CACHE_MAX_BYTES)
+            except OSError:
+                return None
+        return _cache
@@ -0,0 +1,339 @@
+"""
+Scoring Module
+Tính các điểm/chỉ số tổng hợp theo cột cho cả DataFrame
+
+Phiên bản vector của calculate_liquidity_score, calculate_profitability_score,
+calculate_z_score_components và calculate_dupont_analysis (utils/metrics.py):
+mỗi thành phần là một mảng NumPy kèm mask "có dữ liệu", điểm theo ngưỡng được
+tính bằng np.select với bảng ngưỡng trong config. Kết quả giống hệt bản tính
+từng dòng (các hàm đó giờ gọi thẳng các hàm mảng ở đây với một dòng
+Series/dict, mỗi cột là mảng một phần tử).
+
+Điểm tổng hợp khai báo trong config.COMPOSITE_SCORES được tính trên ma trận
+kỳ x mã (PeriodPanel): chuẩn hóa theo từng kỳ cho mọi kỳ cùng lúc.
+"""
+
+import operator
+import warnings
+import numpy as np
+import pandas as pd
+import config
+from utils.data_index import PeriodPanel, find_index
+from utils.filter_engine import compile_filters
+
+_OPERATORS = {
+    '>=': operator.ge,
+    '>': operator.gt,
+}
+
+# Chỉ số dẫn xuất: tên -> (tử số, mẫu số), mẫu số bằng 0 -> 0
+DERIVED_RATIOS = {
+    'CASH_RATIO': ('CASH_PLUS_EQUIVALENTS', 'CURRENT_LIABILITIES'),
+}
+
+# Thành phần Z-Score: tên -> (tử số, mẫu số); Z2 lấy trực tiếp từ cột Z2
+Z_COMPONENT_RATIOS = {
+    'Z1': ('WORKING_CAPITAL_AVG4Q', 'TOTAL_ASSETS'),
+    'Z3': ('EBIT_12M', 'TOTAL_ASSETS'),
+    'Z4': ('MARKET_CAP_EOQ', 'TOTAL_LIABILITIES'),
+    'Z5': ('NET_SALES_12M', 'TOTAL_ASSETS'),
+}
+
+# Thành phần DuPont: tên -> cột
+DUPONT_COLUMNS = {
+    'tax_burden': 'DU1_TAX_BURDEN',
+    'interest_burden': 'DU2_INTEREST_BURDEN',
+    'profit_margin': 'DU3_PROFIT_MARGIN',
+    'asset_turnover': 'DU4_ASSETS_TURNOVER',
+    'leverage': 'DU5_LEVERAGE',
+}
+
+# Các cột điểm được tính sẵn cho mỗi dataset (DatasetStore.scores)
+SCORE_COLUMNS = ['LIQUIDITY_SCORE', 'PROFITABILITY_SCORE', 'Z_SCORE_CALC', 'DUPONT_ROE']
+
+
+def _row_count(df):
+    """Số dòng: DataFrame, hoặc 1 với một dòng (Series/dict)"""
+    return len(df) if isinstance(df, pd.DataFrame) else 1
+
+
+def _scalar_value(value):
+    """Giá trị một ô sang float (thiếu hoặc không phải số -> NaN, như pd.to_numeric coerce)"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def column_values(df, column):
+    """
+    Cột dạng mảng float64 (cột không có -> toàn NaN, giá trị không phải số -> NaN)
+
+    Args:
+        df: DataFrame, hoặc một dòng (Series/dict) -> mảng một phần tử
+        column: Tên cột
+
+    Returns:
+        np.ndarray
+    """
+    if column not in df:
+        return np.full(_row_count(df), np.nan)
+    if not isinstance(df, pd.DataFrame):
+        return np.array([_scalar_value(df[column])])
+    series = df[column]
+    if not pd.api.types.is_numeric_dtype(series.dtype):
+        series = pd.to_numeric(series, errors='coerce')
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def safe_ratio(numerator, denominator):
+    """Tỷ số từng phần tử, mẫu số bằng 0 -> 0 (như bản tính từng dòng)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, numerator / denominator, 0.0)
+
+
+def _ratio_component(df, numerator, denominator):
+    """(giá trị, mask có dữ liệu) của một tỷ số: cần cả tử và mẫu"""
+    num = column_values(df, numerator)
+    den = column_values(df, denominator)
+    present = ~np.isnan(num) & ~np.isnan(den)
+    return np.where(present, safe_ratio(num, den), np.nan), present
+
+
+def _score_input(df, name):
+    """(giá trị, mask có dữ liệu) cho một dòng của bảng ngưỡng"""
+    if name in DERIVED_RATIOS:
+        return _ratio_component(df, *DERIVED_RATIOS[name])
+    values = column_values(df, name)
+    return values, ~np.isnan(values)
+
+
+def threshold_score(df, rules):
+    """
+    Điểm 0-100 theo bảng ngưỡng, tính cho tất cả các dòng
+
+    Với mỗi cột có dữ liệu: cộng điểm của ngưỡng cao nhất đạt được và cộng
+    trọng số vào mẫu; điểm = tổng điểm / tổng trọng số * 100 (0 nếu không
+    cột nào có dữ liệu).
+
+    Args:
+        df: DataFrame, hoặc một dòng (Series/dict)
+        rules: Dict {cột: (trọng số, toán tử, [(ngưỡng, điểm), ...])},
+               VD config.LIQUIDITY_SCORE_RULES
+
+    Returns:
+        np.ndarray: Điểm float64 theo thứ tự dòng
+    """
+    score = np.zeros(_row_count(df))
+    count = np.zeros(_row_count(df))
+    for name, (weight, op, bands) in rules.items():
+        values, present = _score_input(df, name)
+        compare = _OPERATORS[op]
+        # Xét từ ngưỡng thấp lên: ngưỡng cao nhất đạt được ghi đè sau cùng
+        points = 0
+        with np.errstate(invalid='ignore'):
+            for threshold, band_points in reversed(bands):
+                points = np.where(compare(values, threshold), band_points, points)
+        score += np.where(present, points, 0)
+        count += np.where(present, weight, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count > 0, score / count * 100, 0.0)
+
+
+def liquidity_scores(df):
+    """
+    Điểm thanh khoản (0-100) cho từng dòng
+
+    Args:
+        df: DataFrame chứa dữ liệu tài chính
+
+    Returns:
+        Series: Cùng index với df
+    """
+    return pd.Series(threshold_score(df, config.LIQUIDITY_SCORE_RULES), index=df.index, name='LIQUIDITY_SCORE')
+
+
+def profitability_scores(df):
+    """
+    Điểm sinh lời (0-100) cho từng dòng
+
+    Args:
+        df: DataFrame chứa dữ liệu tài chính
+
+    Returns:
+        Series: Cùng index với df
+    """
+    return pd.Series(threshold_score(df, config.PROFITABILITY_SCORE_RULES), index=df.index,
+                     name='PROFITABILITY_SCORE')
+
+
+def z_score_arrays(df):
+    """
+    Thành phần Altman Z-Score dạng mảng
+
+    Args:
+        df: DataFrame chứa dữ liệu tài chính, hoặc một dòng (Series/dict)
+
+    Returns:
+        tuple: (values, present) - hai dict {Z1..Z5, Z_SCORE: mảng}; present
+               cho biết dòng nào có thành phần đó (Z2 có khi df có cột Z2,
+               kể cả giá trị NaN; Z_SCORE có khi đủ 5 thành phần)
+    """
+    values, present = {}, {}
+    for name in config.Z_SCORE_WEIGHTS:
+        if name in Z_COMPONENT_RATIOS:
+            values[name], present[name] = _ratio_component(df, *Z_COMPONENT_RATIOS[name])
+        else:
+            values[name] = column_values(df, name)
+            present[name] = np.full(_row_count(df), name in df)
+
+    total = np.zeros(_row_count(df))
+    for name, weight in config.Z_SCORE_WEIGHTS.items():
+        total = total + weight * values[name]
+    present['Z_SCORE'] = np.logical_and.reduce([present[name] for name in config.Z_SCORE_WEIGHTS])
+    values['Z_SCORE'] = np.where(present['Z_SCORE'], total, np.nan)
+    return values, present
+
+
+def z_score_frame(df):
+    """
+    Thành phần Altman Z-Score cho từng dòng
+
+    Args:
+        df: DataFrame chứa dữ liệu tài chính
+
+    Returns:
+        DataFrame: Cột Z1..Z5, Z_SCORE (NaN nếu thiếu dữ liệu), cùng index với df
+    """
+    values, _ = z_score_arrays(df)
+    return pd.DataFrame(values, index=df.index)
+
+
+def dupont_arrays(df):
+    """
+    Thành phần DuPont dạng mảng
+
+    Args:
+        df: DataFrame chứa dữ liệu tài chính, hoặc một dòng (Series/dict)
+
+    Returns:
+        dict: {thành phần: mảng} cho các cột có trong df, cùng 'roe' nếu đủ 5 thành phần
+    """
+    components = {
+        name: column_values(df, column) for name, column in DUPONT_COLUMNS.items() if column in df
+    }
+    if len(components) == len(DUPONT_COLUMNS):
+        names = list(DUPONT_COLUMNS)
+        roe = components[names[0]]
+        for name in names[1:]:
+            roe = roe * components[name]
+        components['roe'] = roe
+    return components
+
+
+def dupont_frame(df):
+    """
+    Phân tích DuPont cho từng dòng
+
+    Args:
+        df: DataFrame chứa dữ liệu tài chính
+
+    Returns:
+        DataFrame: Các thành phần có cột trong df, cùng 'roe' nếu đủ 5 thành phần
+    """
+    return pd.DataFrame(dupont_arrays(df), index=df.index)
+
+
+def score_frame(df):
+    """
+    Tất cả điểm tổng hợp (SCORE_COLUMNS) cho mọi dòng/kỳ trong một lần
+
+    Args:
+        df: DataFrame chứa dữ liệu tài chính
+
+    Returns:
+        DataFrame: Cột LIQUIDITY_SCORE, PROFITABILITY_SCORE, Z_SCORE_CALC, DUPONT_ROE
+    """
+    z_values, _ = z_score_arrays(df)
+    dupont = dupont_frame(df)
+    return pd.DataFrame({
+        'LIQUIDITY_SCORE': threshold_score(df, config.LIQUIDITY_SCORE_RULES),
+        'PROFITABILITY_SCORE': threshold_score(df, config.PROFITABILITY_SCORE_RULES),
+        'Z_SCORE_CALC': z_values['Z_SCORE'],
+        'DUPONT_ROE': dupont['roe'].to_numpy() if 'roe' in dupont else np.full(len(df), np.nan),
+    }, index=df.index)
+
+
+def _normalize(values, method):
+    """Chuẩn hóa theo từng kỳ (hàng) của ma trận kỳ x mã, NaN giữ nguyên"""
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        # Kỳ không có mã nào trong universe: kết quả NaN, bỏ cảnh báo All-NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if method == 'max':
+            return values / np.nanmax(values, axis=1, keepdims=True)
+        if method == 'rank':
+            return pd.DataFrame(values).rank(axis=1, pct=True).to_numpy()
+        if method == 'zscore':
+            mean = np.nanmean(values, axis=1, keepdims=True)
+            std = np.nanstd(values, axis=1, ddof=1, keepdims=True)
+            return (values - mean) / std
+        if method == 'winsor':
+            low, high = np.nanquantile(values, config.COMPOSITE_WINSOR_LIMITS, axis=1, keepdims=True)
+            return (np.clip(values, low, high) - low) / (high - low)
+    raise ValueError(f"Kiểu chuẩn hóa không hỗ trợ: {method}")
+
+
+def _component_matrix(values, component):
+    """Điểm chuẩn hóa (chưa nhân trọng số) của một thành phần"""
+    direction = component.get('direction', 'higher')
+    method = component.get('normalize', 'max')
+    if direction == 'inverse':
+        fill = component.get('fill', np.inf)
+        values = 1 / np.where((values == 0) | (values == np.inf), fill, values)
+    normalized = _normalize(values, method)
+    if direction == 'lower':
+        return -normalized if method == 'zscore' else 1 - normalized
+    return normalized
+
+
+def composite_scores(df, names=None):
+    """
+    Điểm tổng hợp khai báo trong config.COMPOSITE_SCORES cho mọi dòng/kỳ
+
+    Mỗi thành phần được chuẩn hóa trong từng kỳ trên các dòng thuộc universe
+    của điểm; điểm = tổng trọng số x điểm chuẩn hóa (NaN nếu thiếu thành phần
+    hoặc dòng không thuộc universe).
+
+    Args:
+        df: DataFrame có SYMBOL, YEAR, QUARTER (frame trong kho dùng PeriodPanel
+            dựng sẵn; frame khác, VD tập đã lọc, được chuẩn hóa trong chính nó)
+        names: Các điểm cần tính (mặc định tất cả)
+
+    Returns:
+        DataFrame: Mỗi điểm một cột, cùng index với df
+    """
+    panel = find_index(df, PeriodPanel)
+    if panel is None:
+        panel = PeriodPanel(df)
+    cells = panel.grid[panel.present]
+
+    scores = {}
+    for name in names or list(config.COMPOSITE_SCORES):
+        spec = config.COMPOSITE_SCORES[name]
+        universe = spec.get('universe') or {}
+        rows = np.full(len(df), np.nan)
+        scores[name] = rows
+        if not set(universe).issubset(df.columns):
+            continue
+
+        members = panel.gather(compile_filters(universe).mask(df), fill=False)
+        total = None
+        for component in spec['components']:
+            metric = component['metric']
+            values = panel.values(metric) if metric in df.columns else np.full(panel.shape, np.nan)
+            values = np.where(members, values, np.nan)
+            part = _component_matrix(values, component) * component['weight']
+            total = part if total is None else total + part
+        rows[cells] = total[panel.present]
+
+    return pd.DataFrame(scores, index=df.index)